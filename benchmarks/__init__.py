@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:36 2026
+
+@author: NerdyTurkey
+"""
+
+# Benchmarks of pyhandwriter. Run each from the repository root as a module,
+# e.g. python -m benchmarks.bench_tokenizer
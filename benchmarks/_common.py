@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:51 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Set up and helpers shared by the benchmarks.
+
+Importing this makes pygame run headless, unless SDL_VIDEODRIVER is already
+set, so the benchmarks can run without a display.
+"""
+
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# the repository holding the package being benchmarked
+REPO_PATH = Path(__file__).resolve().parents[1]
+
+
+def time_it(func, *args, repeats=5):
+    """
+    Returns the best time in s of repeats calls of func(*args)
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:31:18 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Benchmark of loading a hw font and getting the glyphs of a short label.
+
+eager: load every glyph of the font from its pickled path files, as fonts
+    were loaded before bundles (see hw_font_bundle.load_pth_files), and find
+    the metrics and size of all of them
+lazy: what the registry does now, read just the index of the bundle and
+    then load only the glyphs of the label, see font_registry.load_glyphs
+
+Run from the repository root with: python -m benchmarks.bench_font_loading
+"""
+
+from benchmarks._common import time_it
+from pyhandwriter import font_registry
+from pyhandwriter import glyph_metrics
+from pyhandwriter import hw_font_bundle
+from pyhandwriter.layout import get_char_key
+
+HW_FONTS = ["hw_segoescript", "my_gigi_", "futurama_"]
+LABEL = "Hello"
+
+
+def load_eager(hw_font):
+    hw_dict = hw_font_bundle.load_pth_files(
+        hw_font, font_registry.get_font_path(hw_font)
+    )
+    metrics = glyph_metrics.get_font_metrics(hw_dict)
+    return {key: glyph_metrics.get_char_size(m) for key, m in metrics.items()}
+
+
+def load_lazy(hw_font):
+    glyphs, metrics = font_registry.load_glyphs(
+        hw_font, font_registry.get_font_path(hw_font)
+    )
+    font = font_registry.SharedFont(hw_font, glyphs, metrics)
+    for key in get_label_keys(font):
+        font.char_sizes[key]
+        font.glyphs[key]
+    return font
+
+
+def get_label_keys(font):
+    return [key for key in map(get_char_key, LABEL) if key in font.glyphs]
+
+
+def main():
+    for hw_font in HW_FONTS:
+        before = time_it(load_eager, hw_font)
+        after = time_it(load_lazy, hw_font)
+        glyphs = load_lazy(hw_font).glyphs
+        print(
+            f"{hw_font:16} eager {1000 * before:7.2f} ms, lazy {1000 * after:6.2f} ms,"
+            f" speedup {before / after:5.1f}, glyphs loaded"
+            f" {glyphs.num_loaded()} of {len(glyphs)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:31:05 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Benchmark of the time taken to import pyhandwriter, each time in a fresh
+python process.
+
+Also checks that importing pyhandwriter
+    - does not import the modules only needed to render latex (matplotlib
+      and PIL, see latex_to_img.py), which would add most of a second to the
+      startup of every process,
+    - does not import the tools (Recorder, show_hw_fonts etc.), which are
+      only imported when first accessed, see __init__.py,
+    - takes no more than CORE_IMPORT_BUDGET_MS on top of importing pygame,
+      which the writer cannot do without.
+Exits with status 1 if not, so it can be run as a check.
+
+Run from the repository root with: python -m benchmarks.bench_import_time
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks._common import REPO_PATH
+
+REPEATS = 5
+
+# most time (ms) importing pyhandwriter may take beyond importing pygame
+CORE_IMPORT_BUDGET_MS = 100
+
+# modules that must not be imported along with pyhandwriter
+LAZY_MODULES = [
+    "matplotlib",
+    "PIL",
+    "pyhandwriter.recorder",
+    "pyhandwriter.show_pygame_fonts",
+    "pyhandwriter.show_pygame_colours",
+    "pyhandwriter.show_hw_fonts",
+    "pyhandwriter.show_hw_symbols",
+    "pyhandwriter.text_input",
+    "pyhandwriter.patch",
+    "pyhandwriter.text_utils",
+]
+
+# run in a fresh process: prints the time (s) to import module and the lazy
+# modules that were imported anyway
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(" ".join(name for name in {lazy_modules!r} if name in sys.modules))
+"""
+
+
+def time_import(module):
+    """
+    Returns the tuple (time in s to import module, list of lazy modules
+    imported)
+    """
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(REPO_PATH), env.get("PYTHONPATH")])
+    )
+    script = SCRIPT.format(module=module, lazy_modules=LAZY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, imported = (result.stdout.splitlines() + [""])[:2]
+    return float(elapsed), imported.split()
+
+
+def best_import_time(module):
+    """
+    Returns the tuple (best time in ms to import module, list of lazy modules
+    imported)
+    """
+    times = []
+    for _ in range(REPEATS):
+        elapsed, imported = time_import(module)
+        times.append(elapsed)
+    return 1000 * min(times), imported
+
+
+def main():
+    pygame_ms, _ = best_import_time("pygame")
+    package_ms, imported = best_import_time("pyhandwriter")
+    core_ms = package_ms - pygame_ms
+    print(f"import pygame:       best {pygame_ms:5.0f} ms of {REPEATS}")
+    print(f"import pyhandwriter: best {package_ms:5.0f} ms of {REPEATS}")
+    print(f"pyhandwriter beyond pygame: {core_ms:.0f} ms")
+
+    failed = False
+    if imported:
+        print(f"FAIL: importing pyhandwriter also imported {imported}")
+        failed = True
+    else:
+        print("OK: none of the lazy modules imported")
+    if core_ms > CORE_IMPORT_BUDGET_MS:
+        print(f"FAIL: over the budget of {CORE_IMPORT_BUDGET_MS} ms")
+        failed = True
+    else:
+        print(f"OK: within the budget of {CORE_IMPORT_BUDGET_MS} ms")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
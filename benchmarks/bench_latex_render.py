@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Benchmark of rendering latex equations to pygame surfaces.
+
+two pass: latex_to_img, which renders each equation twice with pyplot (once to
+    measure it and once at a pt_size chosen to fill the figure), saves it as
+    a png, crops that with PIL, then convert_image_to_surface copies it out
+    with tobytes
+single pass: latex_to_surf, which measures the equation, sizes the figure to
+    fit and renders it once straight into an RGBA buffer shared by the
+    surface
+
+Needs matplotlib, PIL and a latex installation. Nothing is cached, see
+latex_cache.py for that.
+
+Run from the repository root with: python -m benchmarks.bench_latex_render
+"""
+
+import pygame as pg
+
+from benchmarks._common import time_it
+from pyhandwriter.convert_image_to_surface import convert_image_to_surface
+from pyhandwriter.latex_to_img import (
+    import_matplotlib,
+    import_pil,
+    latex_to_img,
+    latex_to_surf,
+)
+
+EQUATIONS = [
+    r"x^2",
+    r"e^{i\pi} + 1 = 0",
+    r"\frac{\cos(x)}{y^2+\exp(\pi)}",
+    r"x=\frac{-b\pm\sqrt{b^2-4 a c}}{2 a}",
+    r"\sum_{n=1}^{\infty} \frac{1}{n^2} = \frac{\pi^2}{6}",
+]
+PT_SIZE = 30
+TEXT_COL = (255, 255, 255, 255)
+BG_COL = (0, 0, 0, 255)
+
+
+def render_two_pass(tex):
+    return convert_image_to_surface(latex_to_img(tex, PT_SIZE, TEXT_COL, BG_COL))
+
+
+def render_single_pass(tex):
+    return latex_to_surf(tex, PT_SIZE, TEXT_COL, BG_COL)
+
+
+def main():
+    try:
+        import_matplotlib(pyplot=True)
+        import_pil()
+    except ImportError as e:
+        print(f"cannot benchmark, {e}")
+        return
+    pg.init()
+    try:
+        # also warms up latex and matplotlib's caches of it
+        for tex in EQUATIONS:
+            render_two_pass(tex)
+            render_single_pass(tex)
+    except Exception as e:
+        print(f"cannot benchmark, latex could not be rendered: {e}")
+        return
+
+    total_before = total_after = 0
+    for tex in EQUATIONS:
+        before = time_it(render_two_pass, tex)
+        after = time_it(render_single_pass, tex)
+        total_before += before
+        total_after += after
+        size = render_single_pass(tex).get_size()
+        print(
+            f"{tex:52} two pass {1000 * before:7.1f} ms, "
+            f"single pass {1000 * after:7.1f} ms, {size}"
+        )
+    print(f"speedup: {total_before / total_after:.1f}")
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:10:41 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Benchmark of drawing handwriting segments one by one, as _draw_path used to
+(see draw_segment, which is how it drew each segment), against drawing all
+the segments due in a frame in one batch, as it does now (see
+HandWriterGen._draw_segments): lines with one pg.draw.lines, nib strokes
+with one polygon per run of segments and spray with one Surface.blits.
+
+Every glyph of each hw font is drawn as it would be animated at speed_mult at
+fps, with a display update per segment (before) or per frame batch (after).
+Prints segments/second for each font and style.
+
+Run from the repository root with: python -m benchmarks.bench_segment_drawing
+"""
+
+import pygame as pg
+
+from benchmarks._common import time_it
+from pyhandwriter.buffer_smooth import BufferSmooth
+from pyhandwriter.handwriter_gen import HandWriterGen
+from pyhandwriter.line_blit import line_blit
+from pyhandwriter.show_hw_fonts import get_hw_font_names
+
+vec = pg.math.Vector2
+
+FPS = 60
+SPEED_MULT = 20
+SCALE = 0.3
+STYLES = {
+    "line": dict(linewidth=1, nib=None, spray=None),
+    "bold": dict(linewidth=4, nib=None, spray=None),
+    "nib": dict(linewidth=1, nib={"width": 5, "angle": 45}, spray=None),
+    "spray": dict(linewidth=1, nib=None, spray={}),  # drawn with hw.spray
+}
+
+
+def get_frame_batches(hw, origin_pos=(100, 100)):
+    """
+    Returns the paths of all glyphs of hw's font, each split into lists of
+    the points drawn in the same frame when animated at SPEED_MULT and FPS.
+    """
+    frame_ms = 1000 / FPS
+    bs = BufferSmooth(0)
+    batches = []
+    for char_key in hw.hw_dict0.maps[1]:
+        _, smoothed_paths = hw._get_smoothed_paths(char_key, bs)
+        for smoothed_path in smoothed_paths:
+            if len(smoothed_path) < 2:
+                continue
+            t0 = smoothed_path[0][2]
+            batch, frame = [], 0
+            for x, y, t in smoothed_path:
+                point = vec(origin_pos) + SCALE * vec(x, y)
+                if (t - t0) / SPEED_MULT >= (frame + 1) * frame_ms:
+                    # due in a later frame, so starts a new batch
+                    batches.append(batch)
+                    batch = batch[-1:]
+                    frame = int((t - t0) / SPEED_MULT // frame_ms)
+                batch.append(point)
+            batches.append(batch)
+    return [batch for batch in batches if len(batch) > 1]
+
+
+def draw_segment(hw, surf, current_pt, next_pt, colour, linewidth, nib, spray):
+    """
+    Draws one straight segment of a path on surf, as _draw_path used to.
+    Returns the rect bounding the changed pixels.
+    """
+    if nib is not None:
+        # calligraphy type stroke
+        # parallelogram shape
+        # work out poly pts
+        offset = nib["width"] * vec(0, 1).rotate(nib["angle"])
+        current_pt2 = current_pt + offset
+        next_pt2 = next_pt + offset
+        poly_pts = [current_pt, current_pt2, next_pt2, next_pt]
+        return pg.draw.polygon(surf, colour, poly_pts)
+    if spray is not None:
+        # path point is at centre of spray
+        return line_blit(surf, current_pt, next_pt, hw.spray)
+    # regular line
+    return pg.draw.line(surf, colour, current_pt, next_pt, linewidth)
+
+
+def draw_one_by_one(hw, batches, style):
+    for batch in batches:
+        for current_pt, next_pt in zip(batch[:-1], batch[1:]):
+            rect = draw_segment(
+                hw, hw.surf, current_pt, next_pt, (255, 255, 255), **style
+            )
+            pg.display.update(rect)
+
+
+def draw_batched(hw, batches, style):
+    for batch in batches:
+        rect = hw._draw_segments(hw.surf, batch, (255, 255, 255), **style)
+        pg.display.update(rect)
+
+
+def main():
+    pg.init()
+    screen = pg.display.set_mode((400, 300))
+    print(f"speed_mult={SPEED_MULT}, fps={FPS}")
+    print(f"{'font':28}{'style':8}{'segs':>8}{'segs/frame':>12}", end="")
+    print(f"{'before segs/s':>16}{'after segs/s':>16}{'speedup':>10}")
+    for hw_font in sorted(get_hw_font_names()):
+        hw = HandWriterGen(screen, hw_font)
+        batches = get_frame_batches(hw)
+        num_segs = sum(len(batch) - 1 for batch in batches)
+        for name, style in STYLES.items():
+            before = num_segs / time_it(draw_one_by_one, hw, batches, style, repeats=3)
+            after = num_segs / time_it(draw_batched, hw, batches, style, repeats=3)
+            print(
+                f"{hw_font:28}{name:8}{num_segs:8}{num_segs / len(batches):12.1f}"
+                f"{before:16.0f}{after:16.0f}{after / before:10.2f}"
+            )
+        hw.close()
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
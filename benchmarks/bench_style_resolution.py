@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:40:12 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Microbenchmark of resolving the style of every char of a long styled
+paragraph.
+
+before: what the writer used to do per char, a deepcopy of the default style
+    and then the formatting styles applied to it afresh (see
+    process_style_before, copied from the baseline revision)
+after: what it does now, a lookup of the Style already resolved for the
+    char's style set (see TextLayout._get_style)
+
+Also times laying out the whole paragraph (HandWriterGen.measure_text).
+
+Run from the repository root with: python -m benchmarks.bench_style_resolution
+"""
+
+from copy import deepcopy
+
+import pygame as pg
+
+from benchmarks._common import time_it
+from pyhandwriter import colours
+from pyhandwriter import settings as s
+from pyhandwriter.handwriter_gen import HandWriterGen
+from pyhandwriter.layout import Container, TextLayout
+
+SENTENCE = (
+    r"The \red{quick} \bold{brown} fox \bigger{jumps} over the \blue{\underline{lazy}}"
+    r" dog, e = mc\super{2} and H\sub{2}O, \green{\doublespeed{in a hurry}}. "
+)
+REPEATS = 40  # sentences in the paragraph
+
+
+def process_style_before(self):
+    """
+    Apply formatting style
+
+    HandWriterGen._process_style as it was before styles were resolved once
+    per style set, where self is the writer (here a Container holding
+    style, state and props).
+    """
+    # print(f"{self.state.style_set=}") # debug
+    if "bigger" in self.state.style_set:
+        self.style.scale *= s.PROPS_GEN["scale_multipler"]
+
+    if "smaller" in self.state.style_set:
+        self.style.scale /= s.PROPS_GEN["scale_multipler"]
+
+    if "bold" in self.state.style_set:
+        self.style.linewidth *= s.PROPS_GEN["bold_linewidth_sf"]
+
+    if "super" in self.state.style_set:
+        self.style.vert_offset += self.props.super_offset
+        self.style.scale *= s.PROPS_GEN["super_size_sf"]
+
+    if "sub" in self.state.style_set:
+        self.style.vert_offset += self.props.sub_offset
+        self.style.scale *= s.PROPS_GEN["sub_size_sf"]
+
+    if "up" in self.state.style_set:
+        self.style.vert_offset += self.props.up_offset
+
+    if "down" in self.state.style_set:
+        self.style.vert_offset += self.props.down_offset
+
+    for col, rgb in colours.col_dict.items():
+
+        if col.lower() in self.state.style_set:
+            self.style.colour = rgb
+            # No ordering in set, so if mult colours set,
+            # random one will be selected!
+            break
+
+    if "underline" in self.state.style_set:
+        # save current pos to know where underline should start
+        self.state.underline_start_pos = (
+            self.state.current_pos[0],
+            self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
+        )
+
+    if "doublespeed" in self.state.style_set:
+        self.style.speed_mult *= 2
+
+    if "halfspeed" in self.state.style_set:
+        self.style.speed_mult *= 0.5
+
+
+def resolve_before(layout, parsed_text):
+    writer = Container()
+    writer.props = layout.props
+    writer.state = Container()
+    writer.state.current_pos = (0, 0)
+    default_style = Container()
+    default_style.__dict__.update(layout.default_style._asdict())
+    for writer.state.style_set, _ in parsed_text:
+        writer.style = deepcopy(default_style)
+        process_style_before(writer)
+
+
+def resolve_after(layout, parsed_text):
+    layout._styles.clear()  # include resolving each distinct style set once
+    for style_set, _ in parsed_text:
+        layout._get_style(style_set)
+
+
+def main():
+    pg.init()
+    screen = pg.display.set_mode((1000, 800))
+    hw = HandWriterGen(screen)
+    text = SENTENCE * REPEATS
+    props, default_style = hw._init_text(text, pt_size=10)
+    layout = TextLayout(hw, props, default_style, estimate_latex=True)
+    parsed_text = props.parsed_text
+    num_chars = len(parsed_text)
+    num_styles = len({style_set for style_set, _ in parsed_text})
+    print(f"{num_chars} chars, {num_styles} distinct style sets")
+
+    before = time_it(resolve_before, layout, parsed_text)
+    after = time_it(resolve_after, layout, parsed_text)
+    print(f"style resolution before: {1e6 * before / num_chars:8.2f} us/char")
+    print(f"style resolution after:  {1e6 * after / num_chars:8.2f} us/char")
+    print(f"speedup: {before / after:.1f}")
+
+    layout_time = time_it(hw.measure_text, text, None, 10)
+    print(f"layout of paragraph: {1000 * layout_time:.1f} ms")
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:40:55 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Benchmark of the single pass tokenizer (tokenizer.py) against the old text
+pipeline it replaces: get_illegal_index, delimiter_parse for $, £ and `,
+the tab replacement and then parse.
+
+First checks that both give identical results for every string in the demos
+that the old pipeline accepts, then times both on about 100 KB of styled text
+with latex and symbols, and compares the memory taken by the parsed text as
+a list of (style_set, char) per char, as parse returned, and as a ParsedText.
+
+Run from the repository root with: python -m benchmarks.bench_tokenizer
+"""
+
+import ast
+import tracemalloc
+
+from benchmarks._common import REPO_PATH, time_it
+from benchmarks.legacy_parser.brack_delimit_parser import delimiter_parse
+from benchmarks.legacy_parser.legal_token_check import get_illegal_index
+from benchmarks.legacy_parser.my_parser import parse
+from pyhandwriter.style_tokens import STYLE_TOKENS
+from pyhandwriter.tokenizer import tokenize
+
+PARAGRAPH = (
+    r"The \red{quick} \bold{brown} fox \bigger{jumps} over the \blue{\underline{lazy}}"
+    r" dog.\n\tThe roots of $a x^2 + b x + c = 0$ are \green{£x = -b/2a£} `happy`"
+    r" and \halfspeed{\up{up} and \down{down}} again\p ... done!\n"
+)
+INPUT_KB = 100
+
+
+def old_pipeline(text):
+    """
+    Returns (parsed_text, latex_inline_list, latex_newline_list, symbol_list)
+    as the text used to be processed, or None if text was rejected.
+    """
+    if get_illegal_index(text) is not None:
+        return None
+    latex_inline_list, text = delimiter_parse(text, delimiter="$", repl_string="\\$")
+    latex_newline_list, text = delimiter_parse(text, delimiter="£", repl_string="\\£")
+    symbol_list, text = delimiter_parse(text, delimiter="`", repl_string="\\`")
+    parsed_text = parse(text.replace("\\t", " \\t"), STYLE_TOKENS)
+    if parsed_text is None:
+        return None
+    return parsed_text, latex_inline_list, latex_newline_list, symbol_list
+
+
+def new_pipeline(text):
+    tokenized_text = tokenize(text)
+    return (
+        list(tokenized_text.parsed_text),
+        tokenized_text.latex_inline_list,
+        tokenized_text.latex_newline_list,
+        tokenized_text.symbol_list,
+    )
+
+
+def get_demo_strings():
+    strings = []
+    for fname in sorted((REPO_PATH / "demos").glob("*.py")):
+        for node in ast.walk(ast.parse(fname.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                strings.append(node.value)
+    return strings
+
+
+def get_memory(func, *args):
+    """
+    Returns the bytes still allocated by the result of func(*args).
+    """
+    tracemalloc.start()
+    result = func(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    checked = 0
+    for string in get_demo_strings():
+        expected = old_pipeline(string)
+        if expected is None:
+            continue
+        assert new_pipeline(string) == expected, string
+        checked += 1
+    print(f"identical results for {checked} demo strings")
+
+    text = PARAGRAPH * (INPUT_KB * 1024 // len(PARAGRAPH.encode("utf-8")))
+    assert new_pipeline(text) == old_pipeline(text)
+    size_kb = len(text.encode("utf-8")) / 1024
+    before = time_it(old_pipeline, text, repeats=3)
+    after = time_it(tokenize, text, repeats=3)
+    after_expanded = time_it(new_pipeline, text, repeats=3)
+    print(f"{size_kb:.0f} KB of text")
+    print(f"old pipeline:              {1000 * before:8.1f} ms")
+    print(f"tokenize:                  {1000 * after:8.1f} ms")
+    print(f"tokenize + per char list:  {1000 * after_expanded:8.1f} ms")
+    print(f"speedup: {before / after:.1f}")
+
+    # what the old pipeline passed to parse
+    _, preprocessed = delimiter_parse(text, delimiter="$", repl_string="\\$")
+    _, preprocessed = delimiter_parse(preprocessed, delimiter="£", repl_string="\\£")
+    _, preprocessed = delimiter_parse(preprocessed, delimiter="`", repl_string="\\`")
+    preprocessed = preprocessed.replace("\\t", " \\t")
+    list_bytes = get_memory(parse, preprocessed, STYLE_TOKENS)
+    parsed_text_bytes = get_memory(lambda: tokenize(text).parsed_text)
+    print(f"parsed text as list:       {list_bytes / 1024:8.0f} KB")
+    print(f"parsed text as ParsedText: {parsed_text_bytes / 1024:8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:47:10 2026
+
+@author: NerdyTurkey
+"""
+
+# The text parsers the package used before tokenizer.py, kept as the baseline
+# of bench_tokenizer and to check the tokenizer against
@@ -5,8 +5,8 @@ Created on Sun Aug 15 12:59:13 2021
 @author: NerdyTurkey
 """
 
-from .style_tokens import STYLE_TOKENS
-from .settings import ESC_CHARS
+from pyhandwriter.style_tokens import STYLE_TOKENS
+from pyhandwriter.settings import ESC_CHARS
 
 # following converts "\\bold" to "bold{" etc
 STYLE_ESC_TOKENS = [token[1:] + "{" for token in STYLE_TOKENS.values()]
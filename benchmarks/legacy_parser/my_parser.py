@@ -5,11 +5,19 @@ Created on Sun Oct 18 18:18:49 2020
 @author: NerdyTurkey
 """
 
+
 def parse(string, tokens, open_brack=None, close_brack=None):
+    """
+    Returns a list of (style_set, char) for the chars of string, where
+    style_set is the frozenset of the style tokens char is enclosed by.
+    All the chars of a run of the same styles share the same style_set.
+    Returns None if the brackets are not paired.
+    """
     open_brack = open_brack or "{"
     close_brack = close_brack or "}"
 
     styles = []
+    style_set = frozenset()
     parsed = []
     for i, c in enumerate(string):
         if c == open_brack:
@@ -23,10 +31,11 @@ def parse(string, tokens, open_brack=None, close_brack=None):
                             : -len(token_pattern)
                         ]  # remove token pattern and '{'
                         styles.append(token_key)  # add the key to the current styles
+                        style_set = frozenset(styles)
                         break
             if not found:
                 # this open_brack is just a regular text char
-                parsed.append((set(styles), c))
+                parsed.append((style_set, c))
 
         elif c == close_brack:  # and styles:
             if i > 0 and string[i - 1] != "\\":
@@ -35,15 +44,16 @@ def parse(string, tokens, open_brack=None, close_brack=None):
                     styles.pop()
                 except IndexError:
                     return None
+                style_set = frozenset(styles)
             else:
                 # this close_brack is just a regular char
                 if i > 0:
                     # remove the '\\'
                     parsed.pop()
 
-                parsed.append((set(styles), c))
+                parsed.append((style_set, c))
         else:
             # just a regular char
-            parsed.append((set(styles), c))
+            parsed.append((style_set, c))
 
     return parsed
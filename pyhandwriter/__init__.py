@@ -7,12 +7,56 @@ Created on Sat Feb  6 07:37:24 2021
 
 # user accesible modules loaded into package namespace
 
+import importlib
+import sys
+import types
+
 from .enums import Flag
 from .colours import col
 from .handwriter import HandWriter
 from .handwriter_sprite import HandWriterSprite
-from .recorder import Recorder
-from .show_pygame_fonts import show_pygame_fonts
-from .show_pygame_colours import show_pygame_colours
-from .show_hw_fonts import show_hw_fonts
-from .show_hw_symbols import show_hw_symbols
+from .font_registry import preload
+from .glyph_cache import invalidate_rendered_text
+
+# the tools, which the writer does not need, are only imported when first
+# accessed (PEP 562), so importing the package just imports the writer
+LAZY_EXPORTS = {
+    "Recorder": ".recorder",
+    "show_pygame_fonts": ".show_pygame_fonts",
+    "show_pygame_colours": ".show_pygame_colours",
+    "show_hw_fonts": ".show_hw_fonts",
+    "show_hw_symbols": ".show_hw_symbols",
+}
+
+__all__ = [
+    "Flag",
+    "col",
+    "HandWriter",
+    "HandWriterSprite",
+    "preload",
+    "invalidate_rendered_text",
+] + list(LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value  # so this is not called again
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_EXPORTS))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing e.g. the module show_hw_fonts binds it to that name here,
+        # which would hide the function of the same name
+        if name in LAZY_EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
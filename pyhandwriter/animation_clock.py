@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:05:13 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+The clock that handwriting animation is timed against.
+
+Each segment of a path is due at its recorded time (scaled by the writing
+speed) after the pen started the path, see HandWriterGen._draw_path. The
+animation draws whatever is due by the clock's time and otherwise just
+returns, rather than polling in a loop until the next segment is due.
+
+The clock is either driven, by calling advance(dt) once per frame (e.g. from
+HandWriterSprite.update), or else follows the wall clock.
+"""
+
+import time
+
+from . import settings as s
+
+
+class AnimationClock:
+    """
+    Animation time in ms, starting from 0.
+    """
+
+    def __init__(self, max_step_ms=None):
+        self.time = 0
+        self.driven = False
+        # a wall clock gap bigger than this (e.g. while the animation was not
+        # being advanced) only counts as max_step_ms, so the animation does
+        # not then rush to catch up
+        self.max_step_ms = (
+            s.PROPS_GEN["max_animation_step_ms"] if max_step_ms is None else max_step_ms
+        )
+        self._then = None
+
+    def advance(self, dt):
+        """
+        Moves the clock on by dt ms. From then on the clock only moves when
+        advanced, not with the wall clock.
+        """
+        self.driven = True
+        self.time += dt
+
+    def now(self):
+        """
+        Returns the animation time in ms
+        """
+        if not self.driven:
+            wall_time = time.perf_counter()
+            if self._then is not None:
+                self.time += min(1000 * (wall_time - self._then), self.max_step_ms)
+            self._then = wall_time
+        return self.time
@@ -5,6 +5,13 @@ Created on Sun Feb 14 14:36:08 2021
 @author: NerdyTurkey
 """
 
+try:
+    import numpy as np
+except ImportError:
+    # smooth_stroke then streams the points through smooth() instead, see
+    # HandWriterGen._get_smoothed_paths in handwriter_gen.py for its use
+    np = None
+
 
 class BufferSmooth:
     """
@@ -12,6 +19,9 @@ class BufferSmooth:
     Each call to smooth with a data point adds that point to a buffer.
     If the buffer size is reached, the first in is ejected.
     The return value is the mean of the buffer.
+
+    smooth_stroke smooths a whole stroke of points in one go, giving the
+    same values as streaming the points through smooth one at a time.
     """
 
     def __init__(self, buffer_size=None, weighted=True):
@@ -34,6 +44,52 @@ class BufferSmooth:
         # else equal weights
         return sum(self.buffer) / len(self.buffer)
 
+    def smooth_stroke(self, points):
+        """
+        Returns the smoothed points for a whole stroke, where points is a
+        sequence of (x, y, ...) points or an (n, k) array, as an (n, k) array
+        (or a list of lists if numpy could not be imported). Each column
+        is smoothed as if streamed through its own smooth() from an empty
+        buffer, but in one vectorised pass. The streaming buffer is not used.
+        """
+        if np is None:
+            smoothers = None
+            smoothed = []
+            for point in points:
+                if smoothers is None:
+                    smoothers = [
+                        BufferSmooth(self.buffer_size, self.weighted) for _ in point
+                    ]
+                smoothed.append([bs.smooth(v) for bs, v in zip(smoothers, point)])
+            return smoothed
+
+        vals = np.asarray(points, dtype=np.float64)
+        n, k = len(vals), self.buffer_size
+        if k <= 0 or n == 0:
+            return vals
+
+        weights = range(1, k + 1) if self.weighted else [1] * k
+        out = np.empty_like(vals)
+
+        # The sums are accumulated oldest point first, just as in smooth(),
+        # so that the results are identical rather than merely close.
+
+        # buffer still filling for the first k-1 points
+        for i in range(min(n, k - 1)):
+            acc = 0
+            for weight, val in zip(weights, vals[: i + 1]):
+                acc = acc + weight * val
+            out[i] = acc / sum(weights[: i + 1])
+
+        # full buffer for the rest, one shifted slice per buffer position
+        if n >= k:
+            acc = weights[0] * vals[: n - k + 1]
+            for j in range(1, k):
+                acc = acc + weights[j] * vals[j : n - k + 1 + j]
+            out[k - 1 :] = acc / sum(weights)
+
+        return out
+
     def reset(self, buffer_size=None):
         if buffer_size is not None:
             self.buffer_size = buffer_size
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:45:26 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Accumulates the rects changed while writing, so that the display can be
+updated with them once per frame rather than after every blit.
+"""
+
+import pygame as pg
+
+
+class DirtyRects:
+    """
+    A list of changed rects, where overlapping rects are merged into their
+    union as they are added.
+    """
+
+    def __init__(self):
+        self.rects = []
+
+    def __len__(self):
+        return len(self.rects)
+
+    def add(self, rect):
+        if rect is None:
+            return
+        rect = pg.Rect(rect)
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        # merging may make the rect overlap others, so keep going until not
+        i = rect.collidelist(self.rects)
+        while i != -1:
+            rect.union_ip(self.rects.pop(i))
+            i = rect.collidelist(self.rects)
+        self.rects.append(rect)
+
+    def pop_all(self):
+        """
+        Returns the list of rects added since last called, and clears it.
+        """
+        rects, self.rects = self.rects, []
+        return rects
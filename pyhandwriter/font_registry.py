@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:02:47 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Process-wide registry of loaded hw fonts.
+
+Every HandWriterGen needs the default hw font, the symbols and usually a user
+hw font. Rather than each instance loading (and copying) these from disk, they
+are loaded once into the registry and shared by all instances.
+
+A shared font is never changed. HandWriterGen layers its own changes on top
+of it (copy-on-write), see HandWriterGen.set_glyph.
+
+Fonts are reference counted by name. A font is evicted as soon as nobody
+references it, unless it was pinned with preload(), in which case it stays
+until evict() is called. The caches of glyphs derived from a font (see
+glyph_cache.py) are bounded by their own size limits, so they outlive the
+font and are only dropped when its data may have changed, see evict and
+reload. Each load of a font is given a new generation, which is part of the
+keys of those caches, so instances still holding a font from before a reload
+never share cached glyphs with instances using the reloaded font.
+
+Loading a font only reads which glyphs it has (and their metrics, if stored
+with it). Each glyph is then loaded the first time it is used, see
+load_glyphs.
+"""
+
+import os
+import threading
+
+from . import glyph_cache
+from . import glyph_metrics
+from . import glyph_store
+from . import hw_font_bundle
+from . import settings as s
+from .buffer_smooth import BufferSmooth
+from .enums import Flag
+from .lazy_mapping import LazyMapping
+
+
+def get_font_path(hw_font):
+    """
+    Returns the folder holding hw_font.
+    Presently, all hw_fonts are stored in the same folder inside the package,
+    and all the symbols in another.
+    """
+    if hw_font == s.PROPS_GEN["hw_symbol_fname"]:
+        folder = s.PROPS_GEN["hw_symbol_folder"]
+    else:
+        folder = s.PROPS_GEN["hw_font_folder"]
+    return os.path.join(os.path.dirname(__file__), folder)
+
+
+def load_glyphs(hw_font, path):
+    """
+    Returns the tuple (glyphs, metrics) for hw_font.
+    glyphs is a LazyMapping hw_dict that knows the keys of all the glyphs of
+    hw_font, but only loads each glyph (from the bundle if there is one, else
+    from its pickled path file) when it is first used. Its values are Glyphs
+    of NumPy arrays if these are enabled and numpy could be imported, else
+    tuples of paths. Bundle samples may be memory-mapped.
+    metrics is the dict of GlyphMetrics stored in the bundle, or None.
+    """
+    use_arrays = glyph_store.np is not None and s.PROPS_GEN["glyph_arrays"]
+
+    bundle_fname = hw_font_bundle.get_bundle_fname(hw_font, path)
+    result = hw_font_bundle.read_index(bundle_fname)
+    if result is not Flag.FAIL:
+        index, data_offset = result
+        glyph_spans = index["glyphs"]
+        if use_arrays:
+            load_glyph = glyph_store.get_bundle_loader(
+                bundle_fname, data_offset, glyph_spans, s.PROPS_GEN["mmap_hw_fonts"]
+            )
+        else:
+
+            def load_glyph(char_key):
+                spans = glyph_spans[char_key]
+                data = hw_font_bundle.read_samples(bundle_fname, data_offset, spans)
+                if data is Flag.FAIL:
+                    return Flag.FAIL
+                first = spans[0][0] if spans else 0
+                return tuple(hw_font_bundle.unpack_paths(data, spans, first))
+
+        metrics = hw_font_bundle.get_index_metrics(index)
+        if metrics is Flag.FAIL or metrics.keys() != glyph_spans.keys():
+            metrics = None
+        return LazyMapping(glyph_spans, load_glyph), metrics
+
+    char_keys = hw_font_bundle.get_pth_keys(hw_font, path)
+    if char_keys is Flag.FAIL:
+        raise Exception(hw_font + " not found!")
+
+    def load_glyph(char_key):
+        paths = hw_font_bundle.load_pth_file(hw_font, path, char_key)
+        if paths is Flag.FAIL:
+            return Flag.FAIL
+        if use_arrays:
+            return glyph_store.Glyph.from_paths(paths)
+        return tuple(paths)
+
+    return LazyMapping(char_keys, load_glyph), None
+
+
+class SharedFont:
+    """
+    A loaded hw font as shared by the registry, given glyphs and metrics as
+    returned by load_glyphs. generation tells apart the loads of the same hw
+    font, see FontRegistry.reload.
+    glyphs, metrics and char_sizes are read-only mappings and each glyph is a
+    tuple of paths (or a Glyph of arrays), so none of it should be changed in
+    place. metrics and char_sizes have the keys of glyphs, so a glyph that
+    fails to load is dropped from all three.
+    """
+
+    def __init__(self, name, glyphs, metrics=None, generation=0):
+        self.name = name
+        self.generation = generation
+        self.glyphs = glyphs
+        # metrics are normally stored with the font, else each is found from
+        # its glyph when first needed
+        if metrics is None:
+            self.metrics = LazyMapping(
+                self.glyphs,
+                lambda key: glyph_metrics.get_glyph_metrics(self.glyphs[key]),
+            )
+        else:
+            self.metrics = LazyMapping(self.glyphs, metrics.__getitem__)
+        self.char_sizes = LazyMapping(
+            self.glyphs, lambda key: glyph_metrics.get_char_size(self.metrics[key])
+        )
+        self._smoothed_advances = {}  # for each buffer size
+
+    def has_glyph(self, char_key):
+        """
+        Returns True if the font has a glyph for char_key that can be loaded,
+        loading it if it has not been yet.
+        """
+        return char_key in self.glyphs and self.glyphs.get(char_key) is not None
+
+    def get_smoothed_advances(self, buffer_size):
+        """
+        Returns the read-only mapping of the smoothed advances (see
+        glyph_metrics.get_smoothed_advance) of the glyphs when smoothed with
+        buffer_size, each found when first needed.
+        """
+        advances = self._smoothed_advances.get(buffer_size)
+        if advances is None:
+            bs = BufferSmooth(buffer_size)
+            advances = self._smoothed_advances.setdefault(
+                buffer_size,
+                LazyMapping(
+                    self.glyphs,
+                    lambda key: glyph_metrics.get_smoothed_advance(
+                        self.glyphs[key], bs
+                    ),
+                ),
+            )
+        return advances
+
+
+class FontRegistry:
+    """
+    Loads each hw font once and hands it out to all users by name.
+    """
+
+    def __init__(self):
+        self._fonts = {}
+        self._ref_counts = {}
+        self._pinned = set()
+        self._generation = 0  # of the last font loaded
+        self._lock = threading.RLock()
+
+    def __contains__(self, hw_font):
+        return hw_font in self._fonts
+
+    def _get(self, hw_font):
+        if hw_font not in self._fonts:
+            glyphs, metrics = load_glyphs(hw_font, get_font_path(hw_font))
+            self._generation += 1
+            self._fonts[hw_font] = SharedFont(
+                hw_font, glyphs, metrics, self._generation
+            )
+            self._ref_counts.setdefault(hw_font, 0)
+        return self._fonts[hw_font]
+
+    def acquire(self, hw_font):
+        """
+        Returns the SharedFont for hw_font, loading it if necessary, and adds
+        a reference to it. Each acquire must be matched by a release.
+        """
+        with self._lock:
+            font = self._get(hw_font)
+            self._ref_counts[hw_font] += 1
+            return font
+
+    def release(self, hw_font):
+        """
+        Drops a reference to hw_font, evicting it if it is no longer
+        referenced or pinned.
+        """
+        with self._lock:
+            if hw_font not in self._ref_counts:
+                return
+            self._ref_counts[hw_font] = max(0, self._ref_counts[hw_font] - 1)
+            self._evict_if_unused(hw_font)
+
+    def preload(self, hw_font_names):
+        """
+        Loads and pins the hw fonts named in hw_font_names, together with the
+        default hw font and the symbols, so they stay loaded even while no
+        HandWriterGen is using them.
+        """
+        names = [s.PROPS_GEN["default_hw_font"], s.PROPS_GEN["hw_symbol_fname"]]
+        names += list(hw_font_names)
+        with self._lock:
+            for hw_font in names:
+                self._get(hw_font)
+                self._pinned.add(hw_font)
+
+    def evict(self, hw_font_names=None):
+        """
+        Unpins the hw fonts named in hw_font_names (all if None) and evicts
+        any of them that are not referenced, together with everything cached
+        from them (from all hw fonts if None).
+        """
+        with self._lock:
+            if hw_font_names is None:
+                for hw_font in list(self._ref_counts):
+                    self._pinned.discard(hw_font)
+                    self._evict_if_unused(hw_font)
+                glyph_cache.invalidate_font(None)
+                return
+            for hw_font in hw_font_names:
+                self._pinned.discard(hw_font)
+                self._evict_if_unused(hw_font)
+                if hw_font not in self._ref_counts:
+                    # anything derived from the font may be stale if the
+                    # font is changed before it is loaded again
+                    glyph_cache.invalidate_font(hw_font)
+
+    def reload(self, hw_font):
+        """
+        Drops the loaded hw_font and everything cached from it, as its data
+        has changed (e.g. a glyph was saved by the recorder), so it is loaded
+        afresh when next needed. Instances already using it keep the font
+        they have, and as that is of an older generation, what they cache
+        from it is never used for the reloaded font.
+        """
+        with self._lock:
+            self._fonts.pop(hw_font, None)
+            glyph_cache.invalidate_font(hw_font)
+
+    def _evict_if_unused(self, hw_font):
+        if self._ref_counts.get(hw_font) == 0 and hw_font not in self._pinned:
+            self._fonts.pop(hw_font, None)
+            del self._ref_counts[hw_font]
+
+    def ref_count(self, hw_font):
+        """
+        Returns the number of references to hw_font (0 if not loaded)
+        """
+        return self._ref_counts.get(hw_font, 0)
+
+
+# the process-wide registry used by all HandWriterGen instances
+registry = FontRegistry()
+
+
+def preload(hw_font_names):
+    """
+    Loads and pins hw fonts in the shared registry, see FontRegistry.preload
+    """
+    registry.preload(hw_font_names)
+
+
+def evict(hw_font_names=None):
+    """
+    Unpins hw fonts in the shared registry, see FontRegistry.evict
+    """
+    registry.evict(hw_font_names)
+
+
+def reload(hw_font):
+    """
+    Drops a changed hw font from the shared registry, see FontRegistry.reload
+    """
+    registry.reload(hw_font)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:30:52 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Bounded least-recently-used caches shared by all HandWriterGen instances.
+
+Cache keys are tuples whose first item is the name of the hw font the cached
+item was made from, so that everything made from a font can be dropped when
+its data may have changed, see font_registry.evict and font_registry.reload.
+The second item is the generation of the loaded font (see
+font_registry.SharedFont), so items made from a font that has since been
+reloaded are never used for the reloaded font. Items made from several fonts
+(rendered texts) are keyed by the tuples of the names and generations of all
+of them instead.
+Otherwise items stay until pushed out by the size limit of their cache, even
+after no instance is using their font, so short-lived instances share them.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import pygame as pg
+
+from . import settings as s
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "max_size", "size"])
+
+# A glyph rasterised in one style for instant writing. surf is None if the
+# glyph has no ink. offset is the position of the top left of surf relative
+# to the glyph origin.
+GlyphSprite = namedtuple("GlyphSprite", ["surf", "offset"])
+
+
+class LRUCache:
+    """
+    A dict-like cache holding at most max_size worth of items, evicting the
+    least recently used first. By default each item counts as 1; pass
+    size_of to weigh items differently (e.g. by bytes).
+    """
+
+    def __init__(self, max_size, size_of=None):
+        self.max_size = max_size
+        self.size_of = size_of or (lambda item: 1)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Returns the item for key, or default if not cached.
+        Counts a hit or a miss.
+        """
+        with self._lock:
+            try:
+                item = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, item):
+        """
+        Caches item under key, evicting least recently used items as needed.
+        An item bigger than max_size is not cached.
+        """
+        item_size = self.size_of(item)
+        if item_size > self.max_size:
+            return
+        with self._lock:
+            self.discard(key)
+            self._items[key] = item
+            self.size += item_size
+            while self.size > self.max_size:
+                _, old_item = self._items.popitem(last=False)
+                self.size -= self.size_of(old_item)
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._items:
+                self.size -= self.size_of(self._items.pop(key))
+
+    def invalidate(self, hw_font=None):
+        """
+        Drops all items made from hw_font, or all items if hw_font is None.
+        """
+        with self._lock:
+            if hw_font is None:
+                self._items.clear()
+                self.size = 0
+                return
+            for key in [key for key in self._items if is_made_from(key, hw_font)]:
+                self.discard(key)
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.max_size, self.size)
+
+
+def is_made_from(key, hw_font):
+    """
+    Returns True if the item cached under key was made from hw_font, see the
+    module docstring.
+    """
+    if isinstance(key[0], tuple):
+        return hw_font in key[0]
+    return key[0] == hw_font
+
+
+def freeze(value):
+    """
+    Returns a hashable equivalent of value, a style argument such as a nib
+    dict or a colour list, for use in cache keys.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple, pg.Rect)):
+        return tuple(freeze(val) for val in value)
+    return value
+
+
+def get_surf_bytes(surf):
+    return surf.get_bytesize() * surf.get_width() * surf.get_height()
+
+
+def get_sprite_bytes(sprite):
+    if sprite.surf is None:
+        return 0
+    return get_surf_bytes(sprite.surf)
+
+
+# the tuples of the smoothed paths of glyphs (see
+# HandWriterGen._get_smoothed_paths) keyed by (hw font name, generation,
+# char_key, buffer_size)
+smoothed_glyphs = LRUCache(s.PROPS_GEN["smoothed_glyph_cache_size"])
+
+# GlyphSprites keyed by the smoothed_glyphs key plus the style they are
+# drawn in, bounded by their total size in bytes
+glyph_sprites = LRUCache(s.PROPS_GEN["glyph_sprite_cache_bytes"], get_sprite_bytes)
+
+# finished surfaces from HandWriter.render_text keyed by (hw font names,
+# generations, text, size, style arguments), where the names and generations
+# are those of all the fonts of the writer, as the text may be drawn from any
+# of them, bounded by their total size in bytes
+rendered_texts = LRUCache(s.PROPS_GEN["rendered_text_cache_bytes"], get_surf_bytes)
+
+
+def invalidate_font(hw_font):
+    """
+    Drops everything cached from hw_font, or from all hw fonts if hw_font is
+    None
+    """
+    smoothed_glyphs.invalidate(hw_font)
+    glyph_sprites.invalidate(hw_font)
+    rendered_texts.invalidate(hw_font)
+
+
+def invalidate_rendered_text(hw_font=None):
+    """
+    Drops the surfaces cached by HandWriter.render_text for hw_font, or for
+    all hw fonts if hw_font is None.
+    """
+    rendered_texts.invalidate(hw_font)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:41:19 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Per-glyph metrics, computed once when a font is recorded or converted to a
+bundle and stored in the bundle index (see hw_font_bundle.py), so that
+HandWriterGen does not need to walk the samples of every glyph.
+
+All lengths are in the units the paths were recorded in, i.e. at
+PROPS_REC["save_pt_size"], relative to the glyph origin.
+"""
+
+import math
+from collections import namedtuple
+
+from . import glyph_store
+
+try:
+    import numpy as np
+except ImportError:
+    # there are then no glyph_store.Glyph arrays to measure
+    np = None
+
+GlyphMetrics = namedtuple(
+    "GlyphMetrics",
+    [
+        "min_x",  # bounding box over all strokes
+        "min_y",
+        "max_x",
+        "max_y",
+        "advance",  # distance from origin to rightmost ink
+        "num_strokes",
+        "ink_length",  # total length of all strokes
+        "duration",  # total recorded time of all strokes (ms)
+    ],
+)
+
+
+def get_glyph_metrics(paths):
+    """
+    Returns the GlyphMetrics of a glyph made of paths, which may be lists of
+    dicts as recorded or arrays (see glyph_store.py).
+    """
+    if isinstance(paths, glyph_store.Glyph):
+        return get_array_glyph_metrics(paths)
+
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    ink_length = 0
+    duration = 0
+    for path in paths:
+        xs, ys, times = glyph_store.path_columns(path)
+        if not xs:
+            continue
+        min_x, max_x = min(min_x, *xs), max(max_x, *xs)
+        min_y, max_y = min(min_y, *ys), max(max_y, *ys)
+        for i in range(len(xs) - 1):
+            ink_length += math.hypot(xs[i + 1] - xs[i], ys[i + 1] - ys[i])
+        duration += times[-1] - times[0]
+
+    if min_x is math.inf:
+        # no samples at all
+        min_x = min_y = max_x = max_y = 0
+
+    return GlyphMetrics(
+        min_x, min_y, max_x, max_y, max_x, len(paths), ink_length, duration
+    )
+
+
+def get_array_glyph_metrics(glyph):
+    """
+    Returns the GlyphMetrics of a glyph_store.Glyph, from numpy reductions
+    over all its samples at once.
+    """
+    samples, offsets = glyph.samples, glyph.offsets
+    if not len(samples):
+        return GlyphMetrics(0, 0, 0, 0, 0, len(glyph), 0, 0)
+
+    # reducing each column on its own is quicker than along an axis for
+    # arrays of a glyph's size
+    xs, ys, times = samples[:, 0], samples[:, 1], samples[:, 2]
+    min_x, max_x = float(xs.min()), float(xs.max())
+    min_y, max_y = float(ys.min()), float(ys.max())
+
+    steps = samples[1:] - samples[:-1]
+    lengths = np.hypot(steps[:, 0], steps[:, 1])
+    # the gaps from the end of each path to the start of the next are not ink
+    path_ends = offsets[1:-1]
+    lengths[path_ends[(path_ends > 0) & (path_ends < len(samples))] - 1] = 0
+
+    drawn = offsets[1:] > offsets[:-1]
+    duration = (times[offsets[1:][drawn] - 1] - times[offsets[:-1][drawn]]).sum()
+
+    return GlyphMetrics(
+        min_x,
+        min_y,
+        max_x,
+        max_y,
+        max_x,
+        len(glyph),
+        float(lengths.sum()),
+        float(duration),
+    )
+
+
+def get_smoothed_advance(paths, bs):
+    """
+    Returns the advance of a glyph made of paths once they are smoothed by
+    BufferSmooth bs, i.e. the rightmost point of the paths that are drawn
+    (those of 2 or more samples), or None if there are none.
+    Unlike GlyphMetrics.advance, this is where the next char starts from, so
+    is what the layout uses both to break lines and to place chars.
+    """
+    x_max = None
+    for path in paths:
+        if len(path) < 2:
+            continue
+        points, times = glyph_store.path_points(path)
+        smoothed_path = glyph_store.make_path(bs.smooth_stroke(points), times)
+        path_x_max = glyph_store.path_extent(smoothed_path)[2]
+        if x_max is None or path_x_max > x_max:
+            x_max = path_x_max
+    return x_max
+
+
+def get_font_metrics(hw_dict):
+    """
+    Returns a dict of GlyphMetrics with the same keys as hw_dict
+    """
+    return {key: get_glyph_metrics(paths) for key, paths in hw_dict.items()}
+
+
+def get_char_size(metrics):
+    """
+    Returns the (x,y) extent of a glyph from its GlyphMetrics
+    """
+    return metrics.max_x - metrics.min_x, metrics.max_y - metrics.min_y
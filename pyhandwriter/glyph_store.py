@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:20:05 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+NumPy glyph store, an alternative in-memory form of hw_dict values.
+
+A glyph recorded by recorder.py is a list of paths, each a list of dicts
+{"pos": (x, y), "time": t}. That is a few hundred bytes per sample and every
+pass over it is a Python loop.
+
+Here a glyph is instead one (n, 3) array of (x, y, time) samples for all its
+paths, plus an offsets array marking where each path (stroke) starts, so the
+paths are just views into the array. The arrays can be memory-mapped straight
+from a font bundle (see hw_font_bundle.py), in which case worker processes
+using the same font share the same pages.
+
+Note: numpy is not in standard library. If it cannot be imported, the
+package still works with the plain dict paths.
+
+The helpers path_columns, path_points and path_extent accept a path in
+either form, so code that consumes paths need not care which it gets.
+"""
+
+from . import config
+from . import hw_font_bundle
+from .enums import Flag
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    config.failed_imports.append("numpy")
+
+
+class Glyph:
+    """
+    The paths of a glyph held as one array of samples.
+    Behaves as a read-only sequence of paths, where each path is a (k, 3)
+    array view of (x, y, time) samples.
+    """
+
+    __slots__ = ("samples", "offsets")
+
+    def __init__(self, samples, offsets):
+        self.samples = samples  # (n, 3) array
+        self.offsets = offsets  # path i is samples[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def from_paths(cls, paths):
+        """
+        Returns a Glyph made from a list of dict paths as recorded.
+        """
+        samples = np.array(
+            [
+                (data["pos"][0], data["pos"][1], data["time"])
+                for path in paths
+                for data in path
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        offsets = np.cumsum([0] + [len(path) for path in paths])
+        return cls(samples, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("glyph path index out of range")
+        return self.samples[self.offsets[i] : self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def get_bundle_loader(fname, data_offset, glyph_spans, mmap=True):
+    """
+    Returns a function that returns the Glyph of a char_key of bundle fname
+    (or Flag.FAIL if it could not be read), for a LazyMapping, given the
+    data_offset and the "glyphs" of the index of the bundle (see
+    hw_font_bundle.read_index).
+    If mmap is true the samples are memory-mapped, so only the pages of the
+    glyphs used are ever read, else just the samples of each glyph are read.
+    """
+    samples = None
+    if mmap:
+        try:
+            data = np.memmap(fname, dtype="<f8", mode="r", offset=data_offset)
+            samples = data.reshape(-1, hw_font_bundle.SAMPLE_LEN)
+        except (IOError, ValueError):
+            pass  # e.g. no samples at all, so read them instead
+
+    def load_glyph(char_key):
+        spans = glyph_spans[char_key]
+        offsets = np.cumsum([0] + [count for _, count in spans])
+        if samples is not None:
+            # the paths of a glyph are stored one after the other
+            first = spans[0][0] if spans else 0
+            return Glyph(samples[first : first + offsets[-1]], offsets)
+        data = hw_font_bundle.read_samples(fname, data_offset, spans)
+        if data is Flag.FAIL:
+            return Flag.FAIL
+        data = np.frombuffer(data, dtype=np.float64)
+        return Glyph(data.reshape(-1, hw_font_bundle.SAMPLE_LEN), offsets)
+
+    return load_glyph
+
+
+def is_array_path(path):
+    return np is not None and isinstance(path, np.ndarray)
+
+
+def make_path(points, times):
+    """
+    Returns a path of (x, y, time) samples made from (x, y) points and
+    times, an (n, 3) array if numpy could be imported, else a tuple of
+    tuples.
+    """
+    if np is not None:
+        return np.column_stack((np.reshape(points, (-1, 2)), times))
+    return tuple((x, y, time) for (x, y), time in zip(points, times))
+
+
+def path_columns(path):
+    """
+    Returns the tuple (xs, ys, times) of lists for path, which is either a
+    list of dicts as recorded, an array from a Glyph or made by make_path, or
+    a tuple of samples made by make_path.
+    """
+    if is_array_path(path):
+        return path[:, 0].tolist(), path[:, 1].tolist(), path[:, 2].tolist()
+    if path and not isinstance(path[0], dict):
+        return tuple(list(column) for column in zip(*path))
+    return (
+        [data["pos"][0] for data in path],
+        [data["pos"][1] for data in path],
+        [data["time"] for data in path],
+    )
+
+
+def path_points(path):
+    """
+    Returns the tuple (points, times) for path, which is either a list of
+    dicts as recorded or an array from a Glyph. For an array path these are
+    (n, 2) and (n,) array views, else a list of (x, y) tuples and a list.
+    """
+    if is_array_path(path):
+        return path[:, :2], path[:, 2]
+    return [data["pos"] for data in path], [data["time"] for data in path]
+
+
+def path_extent(path):
+    """
+    Returns the tuple (min_x, min_y, max_x, max_y) for a path of one or more
+    samples, in any of the forms taken by path_columns.
+    """
+    if is_array_path(path):
+        xs, ys = path[:, 0], path[:, 1]
+        return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+    xs, ys, _ = path_columns(path)
+    return min(xs), min(ys), max(xs), max(ys)
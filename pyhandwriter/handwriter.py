@@ -4,6 +4,11 @@ Created on Mon Jan 25 07:13:56 2021
 
 @author: NerdyTurkey
 """
+import time
+
+import pygame as pg
+
+from . import glyph_cache
 from .handwriter_gen import HandWriterGen
 from .enums import Flag
 
@@ -222,6 +227,7 @@ class HandWriter:
         text_rect_border_width=None,
         text_rect_border_col=None,
         quit_on_overflow=True,
+        line_breaking=None,
     ):
 
         # get generator
@@ -250,13 +256,117 @@ class HandWriter:
             text_rect_bg_col=text_rect_bg_col,
             text_rect_border_width=text_rect_border_width,
             text_rect_border_col=text_rect_border_col,
+            line_breaking=line_breaking,
         )
 
         while True:
-            try:
-                val = next(self.g)
-            except StopIteration:
-                return Flag.FINISHED
-            else:
-                if val is Flag.USER_QUIT or (val is Flag.OVERFLOW and quit_on_overflow):
-                    return val
+            val = self.hw.advance()
+            if val is Flag.FINISHED or val is Flag.USER_QUIT:
+                return val
+            if val is Flag.OVERFLOW and quit_on_overflow:
+                return val
+            # sleep, rather than spin, until there is more to draw
+            time.sleep(self.hw.get_wait_ms() / 1000)
+
+    def render_text(
+        self,
+        text,
+        size=None,
+        text_rect=None,
+        colour=None,
+        linewidth=None,
+        smooth_level=None,
+        pt_size=None,
+        char_spacing=None,
+        word_spacing=None,
+        line_spacing=None,
+        nib=None,
+        spray=None,
+        num_tabs=None,
+        hyphenation=False,
+        surf_bg_col=None,
+        surf_border_width=None,
+        surf_border_col=None,
+        text_rect_bg_col=None,
+        text_rect_border_width=None,
+        text_rect_border_col=None,
+        line_breaking=None,
+    ):
+        """
+        Returns a new transparent surface of size (default the size of the
+        screen) with text written on it instantly. Takes the same style
+        arguments as write_text.
+
+        The surface is cached, keyed on the text, size and style arguments,
+        so rendering the same text again (e.g. every frame) just returns the
+        same surface. Blit it, but do not draw on it.
+        The cache is bounded by PROPS_GEN["rendered_text_cache_bytes"] and
+        can be cleared with glyph_cache.invalidate_rendered_text.
+        """
+        size = self.screen.get_size() if size is None else tuple(size)
+        args = (
+            text_rect,
+            colour,
+            linewidth,
+            smooth_level,
+            pt_size,
+            char_spacing,
+            word_spacing,
+            line_spacing,
+            nib,
+            spray,
+            num_tabs,
+            hyphenation,
+            surf_bg_col,
+            surf_border_width,
+            surf_border_col,
+            text_rect_bg_col,
+            text_rect_border_width,
+            text_rect_border_col,
+            line_breaking,
+        )
+        # glyphs changed with set_glyph are not in the key, so are not cached
+        cacheable = not self.hw.hw_dict.maps[0]
+        # chars missing from the user hw font are drawn from the default one,
+        # and symbols from the symbol font, so the key names all of them
+        names, generations = zip(*self.hw.hw_font_keys)
+        key = (names, generations, text, size, glyph_cache.freeze(args))
+        if cacheable:
+            surf = glyph_cache.rendered_texts.get(key)
+            if surf is not None:
+                return surf
+
+        surf = pg.Surface(size, pg.SRCALPHA)
+        self.hw.change_surf(surf)
+        try:
+            for _ in self.hw.write_text(
+                text,
+                update_display=False,
+                text_rect=text_rect,
+                colour=colour,
+                linewidth=linewidth,
+                smooth_level=smooth_level,
+                nib=nib,
+                spray=spray,
+                pt_size=pt_size,
+                char_spacing=char_spacing,
+                word_spacing=word_spacing,
+                line_spacing=line_spacing,
+                instantly=True,
+                num_tabs=num_tabs,
+                hyphenation=hyphenation,
+                surf_bg_col=surf_bg_col,
+                surf_border_width=surf_border_width,
+                surf_border_col=surf_border_col,
+                text_rect_bg_col=text_rect_bg_col,
+                text_rect_border_width=text_rect_border_width,
+                text_rect_border_col=text_rect_border_col,
+                line_breaking=line_breaking,
+            ):
+                pass
+        finally:
+            self.hw.change_surf(self.screen)
+
+        if cacheable:
+            glyph_cache.rendered_texts.put(key, surf)
+        return surf
@@ -4,30 +4,41 @@ Created on Tue Oct 13 17:59:00 2020
 
 @author: NerdyTurkey
 """
+import math
 import os
-import time
-import warnings
+import weakref
+from collections import ChainMap
 from copy import deepcopy
 
 import pygame as pg
 
-from . import colours
-from . import config
-from . import file_utils as fu
-from . import legal_token_check
+from . import font_registry
+from . import glyph_cache
+from . import glyph_metrics
+from . import glyph_store
 from . import settings as s
-from . import style_tokens
-from .brack_delimit_parser import delimiter_parse
+from .animation_clock import AnimationClock
 from .buffer_smooth import BufferSmooth
 from .check_user_event import check_user_event, UserEvent
 from .colorize import colorize
-from .convert_image_to_surface import convert_image_to_surface
+from .dirty_rects import DirtyRects
 from .enums import Flag
-from .latex_to_img import latex_to_img
-from .line_blit import line_blit
-from .my_parser import parse
-from .rescale_surf import rescale_surf
+from .layout import (
+    Container,
+    GlyphRecord,
+    LatexRecord,
+    LineRecord,
+    PauseRecord,
+    Style,
+    TextFit,
+    TextLayout,
+    WaitRecord,
+    get_char_key,
+    measure_layout,
+)
+from .line_blit import lines_blit
 from .set_alpha import set_alpha
+from .tokenizer import tokenize
 
 vec = pg.math.Vector2
 
@@ -36,31 +47,12 @@ def oneshot_generator(val):
     yield val
 
 
-class Container:
+def release_hw_fonts(hw_font_names):
     """
-    For grouping attributes. I think sometimes neater than dictionaries
+    Releases the hw fonts borrowed from the font registry by a HandWriterGen
     """
-
-
-def get_char_key(char):
-    """
-    Return the dict key for a regular char to be used in the hw_dic.
-    This is the str of the unicode of char.
-    Note: that char_key for a symbols is the symbol name and are generated
-    elsewhere.
-    """
-    try:
-        return str(ord(char))
-    except:
-        # something went wrong!
-        return str(ord("?"))
-
-
-def get_tab_stop(x, tab_spacing):
-    """
-    Returns next tab stop when cursor is at horiz pos x
-    """
-    return (x // tab_spacing) * tab_spacing + tab_spacing * (x % tab_spacing > 0)
+    for name in hw_font_names:
+        font_registry.registry.release(name)
 
 
 class HandWriterGen:
@@ -76,47 +68,56 @@ class HandWriterGen:
         # self.hw_default_dict is also used to replace in missing
         # chars from user hw_font.
 
-        # The char sizes (in x an y) are stored in separate dictionaries
-        # self.char_sizes and self.default_char_sizes for self.hw_dict and
+        # The char metrics (see glyph_metrics.py) and sizes (in x an y) are
+        # stored in separate dictionaries self.metrics, self.char_sizes and
+        # self.default_metrics, self.default_char_sizes for self.hw_dict and
         # self.hw_default_dict, respectively.
 
-        # Presently, all hw_fonts are stored in the same folder inside the
-        # package.
-        font_path = os.path.join(
-            os.path.dirname(__file__), s.PROPS_GEN["hw_font_folder"]
-        )
-        self.hw_default_dict = self._load_hw_dict(
-            s.PROPS_GEN["default_hw_font"], font_path
-        )
-        if hw_font is None:
-            self.hw_dict = deepcopy(self.hw_default_dict)
-        else:
-            # load user hw font
-            self.hw_dict = self._load_hw_dict(hw_font, font_path)
-
-        # load symbols, i.e. handwritten versions on non standard chars
+        # The hw fonts are borrowed from the process-wide font registry, so
+        # are only loaded from disk the first time any instance needs them.
+        # They are released again when this instance is closed or garbage
+        # collected.
+        default_font = s.PROPS_GEN["default_hw_font"]
+        hw_font = default_font if hw_font is None else hw_font
+        self.hw_font_names = (default_font, hw_font, s.PROPS_GEN["hw_symbol_fname"])
+        # each name is added as soon as its font is acquired, so that only the
+        # fonts actually acquired are released, e.g. if hw_font is not found
+        acquired = []
+        self._finalizer = weakref.finalize(self, release_hw_fonts, acquired)
+        fonts = []
+        try:
+            for name in self.hw_font_names:
+                fonts.append(font_registry.registry.acquire(name))
+                acquired.append(name)
+        except Exception:
+            self._finalizer()
+            raise
+        default_font, user_font, symbols_font = fonts
+        self._hw_fonts = tuple(fonts)  # in the order of hw_font_names
+        # the first items of the keys of the glyphs cached from each font,
+        # see glyph_cache.py
+        self.hw_font_keys = tuple((font.name, font.generation) for font in fonts)
+
+        self.hw_default_dict = default_font.glyphs
+
+        # symbols, i.e. handwritten versions on non standard chars
         # both built-ins (like arrows and emojis) and user symbols made with
-        # recorder.py
-
-        # Presently, all hw_symbols are stores in the same folder insider the
-        # package.
-        symbol_path = os.path.join(
-            os.path.dirname(__file__), s.PROPS_GEN["hw_symbol_folder"]
-        )
-        symbols_dict = self._load_hw_dict(s.PROPS_GEN["hw_symbol_fname"], symbol_path)
-        # add symbols dict to main dict
-        self.hw_dict = {**self.hw_dict, **symbols_dict}
+        # recorder.py, take precedence over the chars of the user hw font.
+        # The shared dicts are never changed, so this is also the backup to
+        # revert to if a glyph is changed (e.g. smoothed), see set_glyph.
+        self.hw_dict0 = ChainMap(symbols_font.glyphs, user_font.glyphs)
 
-        # Make a backup to revert to if original is changed (e.g. smoothed)
-        # and user wants to undo change.
-        self.hw_dict0 = deepcopy(self.hw_dict)
+        # Changed glyphs go into the first (local) dict of the chain only.
+        self.hw_dict = self.hw_dict0.new_child()
 
-        self.default_char_sizes = self.get_char_sizes(self.hw_default_dict)
-        self.char_sizes = self.get_char_sizes(self.hw_dict)
+        self.default_metrics = default_font.metrics
+        self.metrics = ChainMap({}, symbols_font.metrics, user_font.metrics)
+        self.default_char_sizes = default_font.char_sizes
+        self.char_sizes = ChainMap({}, symbols_font.char_sizes, user_font.char_sizes)
 
         # This is used for line breaking calculations
-        self.generic_char_size = self.char_sizes.get(
-            get_char_key("W"), self.default_char_sizes[get_char_key("W")]
+        self.generic_char_size = glyph_metrics.get_char_size(
+            self.get_glyph_metrics(get_char_key("W"))
         )
 
         self._load_cursors()
@@ -131,14 +132,17 @@ class HandWriterGen:
     def _load_spray(self):
         path = os.path.join(os.path.dirname(__file__), "assets")
         spray_fname = os.path.join(path, "spray_softer.png")
-        self.spray = pg.image.load(spray_fname).convert_alpha()
+        self.spray_base = pg.image.load(spray_fname).convert_alpha()
+        self.spray = self.spray_base
 
     def _customise_spray(self, spray_props):
         width = 2 * spray_props["width"]
         col = spray_props["col"]
         aspect_ratio = spray_props["aspect_ratio"]
         angle = spray_props["angle"]
-        self.spray = colorize(self.spray, col)
+        # always customise the loaded spray, so that the spray only depends
+        # on spray_props (glyph sprites drawn with it are cached by them)
+        self.spray = colorize(self.spray_base, col)
         self.spray = pg.transform.scale(self.spray, (width, int(width / aspect_ratio)))
         self.spray = pg.transform.rotate(self.spray, angle)
         if len(col) == 4:
@@ -150,72 +154,89 @@ class HandWriterGen:
 
     # experimental
     def change_text(self, text):
-        self._prepare_text(text)
+        self._prepare_text(text, self.props)
 
-    def _load_hw_dict(self, hw_font, path):
+    def close(self):
         """
-        Creates a hw_dict by loading pre-recorded path files.
-        a hw_dict has keys that are unicodes* of char and values that is the
-        path data for rendering them.
-        A path file contains (x,y) cordinates for the handwritten strokes
-        making up a character together with the sample times.
-        *For a special char (like emojies and arrows or user recorded symbols),
-        the key is the names of the symbol.
+        Releases the hw fonts borrowed from the font registry.
+        Called automatically when the instance is garbage collected.
         """
+        self._finalizer()
 
-        hw_dict = {}
-        # get list of all filenames starting with the hw_font string
-        filenames = fu.get_filenames_with_prefix(hw_font, path=path)
-
-        if not filenames:
-            raise Exception(hw_font + " not found!")
-
-        for filename in filenames:
-            fname, ext = filename.split(".")
-
-            if ext != "pth":
-                continue
-
-            result = fu.pickle_load(os.path.join(path, filename))
-
-            if result is Flag.FAIL:
-                # pickle load failed
-                continue
-
-            else:
-                char_key = fname[
-                    -(len(fname) - len(hw_font) - len(s.PROPS_GEN["fname_separator"])) :
-                ]
-                # print(char_key) # debug
-                hw_dict[char_key] = result
-
-        # The hw_dict will only contain a key,val entry if the
-        # corresponding pth file could be loaded properly.
-        # Missing keys will be handled by write_text method.
-        # A valid key is either str of unicode for a "regular" char
-        # or a symbol name, e.g. built-in symbols "left", "happy".
+    def set_glyph(self, char_key, paths):
+        """
+        Replaces the paths of glyph char_key for this instance only.
+        The shared hw fonts are never changed; the new paths are copied into
+        a local layer on top of them.
+        """
+        self.hw_dict[char_key] = deepcopy(paths)
+        metrics = glyph_metrics.get_glyph_metrics(paths)
+        self.metrics.maps[0][char_key] = metrics
+        self.char_sizes.maps[0][char_key] = glyph_metrics.get_char_size(metrics)
 
-        return hw_dict
+    def revert_glyphs(self):
+        """
+        Undoes all changes made with set_glyph.
+        """
+        self.hw_dict.maps[0].clear()
+        self.metrics.maps[0].clear()
+        self.char_sizes.maps[0].clear()
 
     def get_char_sizes(self, hw_dict):
         """
         Returns a dictionary with keys the char "unicodes" and values
         a tuple giving the (x,y) extent of the paths in pixels.
         """
-        # ToDo: rather than separate dict, this could be added to hw_dict
-        char_sizes = {}
-        for key, paths in hw_dict.items():
-
-            for path in paths:
-                x_pts = [data["pos"][0] for data in path]
-                y_pts = [data["pos"][1] for data in path]
+        return {
+            key: glyph_metrics.get_char_size(metrics)
+            for key, metrics in glyph_metrics.get_font_metrics(hw_dict).items()
+        }
 
-            char_sizes[key] = (
-                abs(min(x_pts) - max(x_pts)),
-                abs(min(y_pts) - max(y_pts)),
-            )
+    def _draw_segments(self, surf, points, colour, linewidth, nib, spray):
+        """
+        Draws the segments joining consecutive points on surf in one go, or
+        for nib strokes one polygon per run of segments, see
+        _draw_nib_segments.
+        Returns the rect bounding the changed pixels, None if none changed.
+        """
+        if len(points) < 2:
+            return None
+        if nib is not None:
+            return self._draw_nib_segments(surf, points, colour, nib)
+        if spray is not None:
+            return lines_blit(surf, points, self.spray)
+        # same pixels as drawing the segments one by one
+        return pg.draw.lines(surf, colour, False, points, linewidth)
 
-        return char_sizes
+    def _draw_nib_segments(self, surf, points, colour, nib):
+        """
+        Draws the nib parallelograms of the segments joining consecutive
+        points on surf.
+        While the segments keep to one side of the nib, their parallelograms
+        make up a single polygon: the points there and back again offset by
+        the nib. Where a stroke doubles back across the nib that polygon
+        would cross itself, so a new one is started.
+        Returns the rect bounding the changed pixels.
+        """
+        offset = nib["width"] * vec(0, 1).rotate(nib["angle"])
+        rects = []
+        run = [points[0]]
+        run_side = 0
+        for current_pt, next_pt in zip(points[:-1], points[1:]):
+            cross = (next_pt - current_pt).cross(offset)
+            side = (cross > 0) - (cross < 0)
+            if side and run_side and side != run_side:
+                rects.append(self._draw_nib_run(surf, run, colour, offset))
+                run = [current_pt]
+                run_side = 0
+            run_side = run_side or side
+            run.append(next_pt)
+        rects.append(self._draw_nib_run(surf, run, colour, offset))
+        return rects[0].unionall(rects[1:])
+
+    def _draw_nib_run(self, surf, run, colour, offset):
+        poly_pts = run + [pt + offset for pt in reversed(run)]
+        return pg.draw.polygon(surf, colour, poly_pts)
 
     def _draw_path(
         self,
@@ -233,700 +254,403 @@ class HandWriterGen:
         """
         Draws a path to surf using the timing info encoded with the path
         to replicate the recorded stroke. A char will often comprise multiple
-        paths.
-        Generator. Yields None until the path is finished and the yields x_max
+        paths. path is made by glyph_store.make_path.
+        Each segment is due at its recorded time (divided by speed_mult) after
+        the pen became free to start the path, as told by self.clock. All the
+        segments that are due are drawn in one go.
+        Generator. Yields None while waiting for the next segment to be due.
         """
-
-        # ---------------------------------------------------------------------
-        def delay_gen(delay_ms):
-            if instantly:
-                # single-shot generator
-                yield
-                return
-            delay_s = delay_ms / 1000
-            start_time = time.time()
-            while time.time() - start_time < delay_s:
-                yield
-
-        # ---------------------------------------------------------------------
-        if path == []:
-            yield
-        if cursor_img is not None:
-            cursor_rect = cursor_img.get_rect()
-
-            # make a surf for saving region under cursor img
-            save_surf = pg.Surface(cursor_rect.size, pg.SRCALPHA)
-
         sox, soy = origin_pos
         colour = colour or s.PROPS_GEN["colour"]
         linewidth = linewidth or s.PROPS_GEN["linewidth"]
         speed_mult = speed_mult or s.PROPS_GEN["speed_mult"]
         scale = scale or s.PROPS_GEN["scale"]
-        x_max = 0  # leftmost part of path
+        start_time = self.state.pen_time
 
-        for (i, data) in enumerate(path[:-1]):
-            current_pt = vec(
-                (sox + scale * data["pos"][0], soy + scale * data["pos"][1])
-            )
-            current_time = data["time"]
-            next_pt = vec(
-                (
-                    sox + scale * path[i + 1]["pos"][0],
-                    soy + scale * path[i + 1]["pos"][1],
-                )
+        def draw(points):
+            # draws the segments due so far with one display update
+            if len(points) < 2:
+                return
+            modified_rect = self._draw_segments(
+                self.surf, points, colour, linewidth, nib, spray
             )
-            next_time = path[i + 1]["time"]
-
-            # restore surf under cursor, but not on first pass
-            if not instantly and cursor_img is not None and i != 0:
-                self.surf.fill(
-                    (0, 0, 0, 0), cursor_rect
-                )  # wipe surf under cursor first
-                self.surf.blit(save_surf, cursor_rect)  # restore saved surf
-
-            # draw path segment
-            if nib is not None:
-                # calligraphy type stroke
-                # parallelogram shape
-                # work out poly pts
-                offset = nib["width"] * vec(0, 1).rotate(nib["angle"])
-                current_pt2 = current_pt + offset
-                next_pt2 = next_pt + offset
-                poly_pts = [current_pt, current_pt2, next_pt2, next_pt]
-                modified_rect = pg.draw.polygon(self.surf, colour, poly_pts)
-            elif spray is not None:
-                # ToDo: nib currently trumps spray; do I want that?
-                # path point is at centre of spray
-                modified_rect = line_blit(self.surf, current_pt, next_pt, self.spray)
-            else:
-                # regular line
-                modified_rect = pg.draw.line(
-                    self.surf, colour, current_pt, next_pt, linewidth
-                )
-
-            # no cursor drawn if handwriting rendered 'instantly'
             if not instantly:
+                self._mark_dirty(modified_rect)
+                self.state.pen_pt = points[-1]
+
+        xs, ys, times = glyph_store.path_columns(path)
+        points = []
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            if i > 0 and not instantly:
+                # segment from point i-1 to point i
+                due = start_time + (times[i - 1] - times[0]) / speed_mult
+                if self.clock.now() < due:
+                    draw(points)
+                    points = points[-1:]
+                    yield from self._wait_until(due, cursor_img)
+            points.append(vec(sox + scale * x, soy + scale * y))
+        draw(points)
+
+        if not instantly and times:
+            # the pen is free once the last segment's recorded time is up
+            self.state.pen_time = start_time + (times[-1] - times[0]) / speed_mult
+
+    def _wait_until(self, due, cursor_img=None):
+        """
+        Waits until self.clock reaches due (ms), with cursor_img shown at the
+        pen meanwhile.
+        Generator. Yields None while waiting.
+        """
+        if self.clock.now() >= due:
+            return
 
-                # update cursor position
-                if cursor_img is not None:
-                    cursor_rect.topleft = next_pt
-
-                    # save surf region under new cursor pos before it is blitted
-                    save_surf.fill((0, 0, 0, 0))  # wipe save_surf first
-                    save_surf.blit(self.surf, (0, 0), cursor_rect)
-
-                    # blit cursor
-                    self.surf.blit(cursor_img, cursor_rect)
-
-                    if self.update_display:
-                        pg.display.update(cursor_rect)
-
-                # update display where ink has been laid (line, nib or spray)
-                if self.update_display:
-                    pg.display.update(modified_rect)
-                delay_ms = (next_time - current_time) / speed_mult
-                dg = delay_gen(delay_ms)
-
-                while True:
-                    try:
-                        next(dg)
-                        yield
-                    except StopIteration:
-                        break
-
-            # clean-up at end of path
-            if not instantly and cursor_img is not None:
+        cursor_rect = None
+        if cursor_img is not None and self.state.pen_pt is not None:
+            self.state.cursor_pt = self.state.pen_pt
+            if not self.cursor_overlay:
+                # no overlay, so draw the cursor onto the surf, saving the
+                # region under it first
+                cursor_rect = cursor_img.get_rect(topleft=self.state.pen_pt)
+                save_surf = self._cursor_save_surf
+                save_surf.fill((0, 0, 0, 0))  # wipe save_surf first
+                save_surf.blit(self.surf, (0, 0), cursor_rect)
+                self.surf.blit(cursor_img, cursor_rect)
+                self._mark_dirty(cursor_rect)
+
+        self.state.due = due
+        try:
+            while self.clock.now() < due:
+                # a frame ends whenever the writing waits
+                if not self.collect_rects:
+                    self.flush()
+                yield
+        finally:
+            self.state.due = None
+            self.state.cursor_pt = None
+            if cursor_rect is not None:
                 # restore surf under cursor
                 self.surf.fill((0, 0, 0, 0), cursor_rect)  # wipe it first
                 self.surf.blit(save_surf, cursor_rect)
-                if self.update_display:
-                    pg.display.update(cursor_rect)
+                self._mark_dirty(cursor_rect)
 
-            if current_pt[0] > x_max:
-                x_max = current_pt[0]
-
-            if next_pt[0] > x_max:
-                x_max = next_pt[0]
-
-        # clean-up at end of path
-        if not instantly and cursor_img is not None:
-            # restore surf under cursor
-            self.surf.fill((0, 0, 0, 0), cursor_rect)  # wipe it first
-            self.surf.blit(save_surf, cursor_rect)
-            if self.update_display:
-                # calling code is using screen as surf
-                # so need to update display
-                pg.display.update(cursor_rect)
-
-        yield x_max
-
-    def _get_word_length_pixels(self, parsed_text, j, norm_scale):
+    def get_cursor(self):
         """
-        Return length in pixels of word in parsed text starting at
-        index j
+        Returns the tuple (cursor_img, pos) of the cursor to show with its
+        topleft at pos over the surf right now, or None if no cursor is to
+        be shown.
+        If cursor_overlay (see write_text) the cursor is never drawn onto the
+        surf, so it is up to the calling code to show it, e.g. when blitting
+        the surf to the screen.
         """
-        length = 0
-        # temp_string = '' # debug
-
-        while j < len(parsed_text) and parsed_text[j][1] != " ":
-
-            if parsed_text[j][1] == "\\":
-                j += 2
-                continue
-            char_size = self.char_sizes.get(
-                parsed_text[j][1],
-                (
-                    self.default_char_sizes.get(
-                        parsed_text[j][1], self.generic_char_size
-                    )
-                ),
-            )
-            char_width = char_size[0]
-            length += char_width * norm_scale
-            # temp_string += parsed_text[j][1] # debug
-
-            j += 1
-
-        return length
-
-    def _preprocess_text(self, text):
-        """
-        Parses latex control chars, symbol control chars, and tabs
-        """
-        # ToDo change $, £ etc to consts in settings
-        self.props.latex_inline_list, text = delimiter_parse(
-            text, delimiter="$", repl_string="\\$"
-        )
-        self.props.latex_newline_list, text = delimiter_parse(
-            text, delimiter="£", repl_string="\\£"
-        )
-
-        self.props.symbol_list, text = delimiter_parse(
-            text, delimiter=s.SYMBOL_ESC_CHAR, repl_string="\\" + s.SYMBOL_ESC_CHAR
-        )
-
-        return text.replace("\\t", " \\t")  # note space in 2nd arg
+        if self.state.cursor_pt is None:
+            return None
+        return self.props.cursor_img, self.state.cursor_pt
 
-    def _process_style(self):
+    def _mark_dirty(self, rect):
         """
-        Apply formatting style
+        Notes that rect of the surf has changed, for the next flush.
         """
-        # print(f"{self.state.style_set=}") # debug
-        if "bigger" in self.state.style_set:
-            self.style.scale *= s.PROPS_GEN["scale_multipler"]
-
-        if "smaller" in self.state.style_set:
-            self.style.scale /= s.PROPS_GEN["scale_multipler"]
-
-        if "bold" in self.state.style_set:
-            self.style.linewidth *= s.PROPS_GEN["bold_linewidth_sf"]
-
-        if "super" in self.state.style_set:
-            self.style.vert_offset += self.props.super_offset
-            self.style.scale *= s.PROPS_GEN["super_size_sf"]
-
-        if "sub" in self.state.style_set:
-            self.style.vert_offset += self.props.sub_offset
-            self.style.scale *= s.PROPS_GEN["sub_size_sf"]
-
-        if "up" in self.state.style_set:
-            self.style.vert_offset += self.props.up_offset
-
-        if "down" in self.state.style_set:
-            self.style.vert_offset += self.props.down_offset
-
-        for col, rgb in colours.col_dict.items():
-
-            if col.lower() in self.state.style_set:
-                self.style.colour = rgb
-                # No ordering in set, so if mult colours set,
-                # random one will be selected!
-                break
-
-        if "underline" in self.state.style_set:
-            # save current pos to know where underline should start
-            self.state.underline_start_pos = (
-                self.state.current_pos[0],
-                self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
-            )
-
-        if "doublespeed" in self.state.style_set:
-            self.style.speed_mult *= 2
-
-        if "halfspeed" in self.state.style_set:
-            self.style.speed_mult *= 0.5
+        if self.update_display or self.collect_rects:
+            self.dirty_rects.add(rect)
 
-    def _process_formatting_esc_char(self, char):
+    def flush(self):
         """
-        Processes formatting-type Esc chars, returns None if ready to move
-        to next char or the new processed char to write.
+        Returns the list of rects of the surf changed since the last flush,
+        merged where they overlap, and updates the display with them if
+        update_display, unless collect_rects (see write_text).
+        This is done automatically once per frame unless collect_rects, in
+        which case it is up to the calling code to call flush and use the
+        rects.
         """
+        rects = self.dirty_rects.pop_all()
+        if rects and self.update_display and not self.collect_rects:
+            pg.display.update(rects)
+        return rects
 
-        if char == "n":
-            # newline
-            self._newline()
-
-        elif char == "t":
-            # tab
-            tab_pos = self.props.origin_pos[0] + get_tab_stop(
-                self.state.current_pos[0] - self.props.origin_pos[0],
-                self.props.tab_spacing,
-            )
-
-            if tab_pos >= (self.props.text_box_width - s.PROPS_GEN["text_box_margin"]):
-                self._newline()
-
-            else:
-                self.state.current_pos = tab_pos, self.state.current_pos[1]
-
-        return None
-
-    def _process_symbol_esc_char(self, char):
+    def get_wait_ms(self):
         """
-        Processes symbol-type Esc chars, returns None if ready to move
-        to next char or the char_key to write.
+        Returns how long (ms) until the text being written next has something
+        to draw, 0 if not waiting.
         """
+        if self.state.due is None:
+            return 0
+        return max(0, self.state.due - self.clock.now())
 
-        if char == s.SYMBOL_ESC_CHAR:
-            char_key = self.props.symbol_list[self.state.symbol_count]
-            self.state.symbol_count += 1
-            # print(char_key) # debug
-            return char_key
-
-        return None
-
-    def _init_latex_process(self, char):
+    def advance(self, dt=None):
         """
-        Returns the latex and a vertical height adjustment dependent on char
-
+        Moves the animation of the text being written (see write_text) on by
+        dt ms, or by the wall clock time since it was last moved on if dt is
+        None, drawing everything then due in one go.
+        Returns Flag.FINISHED if the text is finished, Flag.USER_QUIT if user
+        quit, Flag.OVERFLOW if the text overflowed the text rect, else None.
         """
-        if char == "$":
-            # This is inline latex equation
-            latex = self.props.latex_inline_list[self.state.latex_inline_count]
-            self.state.latex_inline_count += 1
-            height_tweak = s.PROPS_GEN["latex_inline_height_scaling"]
-
-        elif char == "£":
-            # This is newline latex equation (like $$xx$$)
-            latex = self.props.latex_newline_list[self.state.latex_newline_count]
-            self.state.latex_newline_count += 1
-            height_tweak = s.PROPS_GEN["latex_newline_height_scaling"]
-
-        return latex, height_tweak
+        if dt is not None:
+            self.clock.advance(dt)
+        while True:
+            try:
+                val = next(self.writing)
+            except StopIteration:
+                val = Flag.FINISHED
+            if val is Flag.FINISHED or val is Flag.USER_QUIT or val is Flag.OVERFLOW:
+                break
+            if self.state.due is not None:
+                val = None
+                break
+        if not self.collect_rects:
+            self.flush()
+        return val
 
-    def _get_latex_surf(self, latex, height_tweak):
+    def get_glyph_metrics(self, char_key):
         """
-        Returns a pygame surface with latext rendered on it
+        Returns the GlyphMetrics of the glyph _write_char would write for
+        char_key.
         """
-        try:
-            latex_img = latex_to_img(
-                latex,
-                pt_size=self.props.pt_size,
-                text_col=self.style.colour,
-                bg_col=self.props.text_rect_bg_col,
-            )
-        except:
-            msg = "Latex could not be rendered because :"
-            if "matplotlib" in config.failed_imports:
-                msg = "Matplotlib could not be imported."
-            elif "PIL" in config.failed_imports:
-                msg += "PIL could not be imported"
-            else:
-                msg += "No latex installation found on your computer."
-            warnings.warn(msg)
-            return None
-
-        latex_surf = convert_image_to_surface(latex_img)
+        font, char_key = self._get_font(char_key)
+        if font is None:
+            return self.metrics.maps[0][char_key]
+        return font.metrics[char_key]
 
-        # scale latex_surf so height matches pt_size with tweak factor
-        latex_surf = rescale_surf(latex_surf, height=height_tweak * self.props.pt_size)
-
-        if "bigger" in self.state.style_set:
-            latex_surf = pg.transform.rotozoom(latex_surf, 0, 2)
-
-        elif "smaller" in self.state.style_set:
-            latex_surf = pg.transform.rotozoom(latex_surf, 0, 0.5)
-
-        return latex_surf
-
-    def _get_scaled_latex_surf(self, char, latex_surf):
+    def get_glyph_advance(self, char_key, bs):
         """
-        Returns latex_surf scaled to correct size
+        Returns the smoothed advance of the glyph for char_key (see
+        glyph_metrics.get_smoothed_advance), i.e. the rightmost point of its
+        ink, as smoothed by BufferSmooth bs and relative to its origin, or
+        None if it has no ink.
+        The advances of shared fonts are kept with their metrics, so each
+        glyph is only measured once per buffer size.
         """
-        # get rect and dimesions
-        latex_rect = latex_surf.get_rect()
-        w, h = latex_rect.size
-
-        if char == "$":
-            # inline eqn
-            # check if latex_surf too long for current line
-            if self.state.current_pos[0] + w >= self.props.text_box_left_edge:
-                self._newline()
-
-                # rescale to fit onto newline if necessary
-                if w > self.props.text_box_width:
-                    # scale to fit onto one line
-                    latex_surf = rescale_surf(
-                        latex_surf,
-                        width=s.PROPS_GEN["latex_full_line_scaling"]
-                        * self.props.text_box_width,
-                    )
-
-        if char == "£":
-            # centred, newline eqn
-            # rescale to fit onto newline if necessary
-            if w > self.props.text_box_width:
-                # scale to fit onto one line
-                latex_surf = rescale_surf(
-                    latex_surf,
-                    width=s.PROPS_GEN["latex_full_line_scaling"]
-                    * self.props.text_box_width,
-                )
-
-        return latex_surf
+        font, char_key = self._get_font(char_key)
+        if font is None:
+            return glyph_metrics.get_smoothed_advance(self.hw_dict[char_key], bs)
+        return font.get_smoothed_advances(bs.buffer_size)[char_key]
 
-    def _process_latex_position(self, char, w, h):
+    def _get_font(self, char_key):
         """
-        Ensures newline latex equations £..£ are centred on newline.
+        Returns the tuple (font, char_key) for the glyph that will be drawn
+        for char_key, where font is the SharedFont it comes from, or None if
+        it was changed with set_glyph.
         """
-        if char == "£":
-            # centre on new line
-            self.state.current_pos = (
-                self.props.origin_pos[0] + (self.props.text_box_width - w) // 2,
-                self.state.current_pos[1]
-                + self.props.line_spacing
-                + s.PROPS_GEN["latex_newline_vert_padding"],
-            )
-
-    def _blit_latex(self, latex_surf, latex_rect):
+        # paths will be from working dict or if not found there, from
+        # default dict, or the glyph for a question mark if not found
+        # there either.
+        if char_key in self.hw_dict.maps[0]:
+            return None, char_key
+        default_font, user_font, symbols_font = self._hw_fonts
+        # symbols take precedence, as in self.hw_dict, and a glyph that fails
+        # to load is replaced as if missing
+        if symbols_font.has_glyph(char_key):
+            return symbols_font, char_key
+        if user_font.has_glyph(char_key):
+            return user_font, char_key
+        if not default_font.has_glyph(char_key):
+            char_key = str(ord(s.PROPS_REC["not_recognised_char"]))
+        return default_font, char_key
+
+    def _get_paths(self, char_key):
         """
-        Blits the latex surf to the surf.
+        Returns the tuple (font, char_key, paths) for the glyph that will be
+        drawn for char_key, with font and char_key as for _get_font.
         """
-        latex_rect.bottomleft = (
-            self.state.current_pos[0]
-            + self.props.pt_size * s.PROPS_GEN["latex_horiz_spacing_multiplier"],
-            self.state.current_pos[1]
-            + self.props.pt_size * s.PROPS_GEN["latex_inline_vert_offset_multiplier"],
-        )
-
-        mod_rect = self.surf.blit(latex_surf, latex_rect)
-        if self.update_display:
-            pg.display.update(mod_rect)
+        font, char_key = self._get_font(char_key)
+        if font is None:
+            return None, char_key, self.hw_dict[char_key]
+        return font, char_key, font.glyphs[char_key]
 
-    def _move_to_next_position(self, char, w):
+    def _get_smoothed_paths(self, char_key, bs):
         """
-        Moves cursor to next position after the equation.
+        Returns the tuple (cache_key, smoothed_paths) for the glyph for
+        char_key smoothed by BufferSmooth bs, where smoothed_paths is a tuple
+        of paths made by glyph_store.make_path.
+        Smoothing depends only on the glyph and the buffer size, so the result
+        is kept in the cache shared by all instances, unless the glyph was
+        changed with set_glyph, in which case cache_key is None.
         """
-        if char == "$":
-            self.state.current_pos = (
-                self.state.current_pos[0]
-                + w
-                + self.props.pt_size * s.PROPS_GEN["latex_horiz_spacing_multiplier"],
-                self.state.current_pos[1],
+        font, char_key, paths = self._get_paths(char_key)
+        cache_key = None
+        if font is not None:
+            cache_key = (font.name, font.generation, char_key, bs.buffer_size)
+            smoothed_paths = glyph_cache.smoothed_glyphs.get(cache_key)
+            if smoothed_paths is not None:
+                return cache_key, smoothed_paths
+
+        smoothed_paths = []
+        for path in paths:
+            # smooth path (x and y together) in one pass
+            # path is either a list of dicts or an array (see glyph_store.py)
+            points, times = glyph_store.path_points(path)
+            # If smooth_level was 0 (i.e. buffer_size = 0) then smooth_stroke
+            # immediately returns the points.
+            smoothed_paths.append(
+                glyph_store.make_path(bs.smooth_stroke(points), times)
             )
+        smoothed_paths = tuple(smoothed_paths)
 
-        elif char == "£":
-            self._newline()
+        if cache_key is not None:
+            glyph_cache.smoothed_glyphs.put(cache_key, smoothed_paths)
+        return cache_key, smoothed_paths
 
-    def _process_latex_esc_char(self, char):
+    def _get_glyph_sprite(self, record):
         """
-        Processes latex equations in the text.
-        Returns char_key = None to flag that no char needs
-        to be written (since equation is directly blitted).
+        Returns the GlyphSprite of the glyph of GlyphRecord record drawn in
+        its style, or None if it cannot be cached, in which case the glyph
+        must be drawn stroke by stroke.
+        Sprites are kept in a cache shared by all instances (see
+        glyph_cache.py), so each glyph is only rasterised once per style.
         """
-
-        # get latex code and a vertical height adjustment
-        latex, height_tweak = self._init_latex_process(char)
-
-        # get pygame surf with latex rendererd on it
-        latex_surf = self._get_latex_surf(latex, height_tweak)
-
-        if latex_surf is None:
-            print("Latex index error!")
+        if len(record.colour) == 4 and record.colour[3] != 255:
+            # translucent lines replace rather than blend with what is under
+            # them, which a blitted sprite cannot do
             return None
 
-        # scale the surf to correct size
-        latex_surf = self._get_scaled_latex_surf(char, latex_surf)
-
-        # get new rect and dimensions
-        latex_rect = latex_surf.get_rect()
-        w, h = latex_rect.size
-
-        # adjust current_position var to enable blitting it to correct pos
-        self._process_latex_position(char, w, h)
-
-        self._blit_latex(latex_surf, latex_rect)
-
-        # leave current_pos in righty pos for next char
-        self._move_to_next_position(char, w)
-
-        return None
-
-    def _process_interrupt_esc_char(self, char):
-        """
-        Processes interrupt-type Esc chars, returns None if ready to move
-        to next char or the new processed char to write.
-        """
-
-        if char == "p":
-            # pause
-            pg.time.delay(s.PROPS_GEN["pause_delay"])
+        cache_key, smoothed_paths = self._get_smoothed_paths(
+            record.char_key, self.props.bs
+        )
+        if cache_key is None:
             return None
 
-        if char == "w":
-
-            if self.props.instantly:
-                # don't pause if instantly flag is true
-                return None
-
-            # wait for keypress or quit
-            while True:
-                response = check_user_event()
-                if response in (
-                    UserEvent.ESCAPED,
-                    UserEvent.WINDOW_CLOSED,
-                    UserEvent.KEY_PRESSED,
-                ):
-                    break
-
-            return None
+        sprite_key = cache_key + (
+            record.scale,
+            glyph_cache.freeze(record.colour),
+            record.linewidth,
+            glyph_cache.freeze(record.nib),
+            glyph_cache.freeze(record.spray),
+        )
+        sprite = glyph_cache.glyph_sprites.get(sprite_key)
+        if sprite is None:
+            sprite = self._make_glyph_sprite(smoothed_paths, record)
+            glyph_cache.glyph_sprites.put(sprite_key, sprite)
+        return sprite
 
-    def _process_escape_char(self, char):
+    def _make_glyph_sprite(self, smoothed_paths, record):
         """
-        Processes Esc chars, returns None if ready to move
-        to next char or the new processed char to write.
+        Rasterises smoothed_paths in the style of GlyphRecord record to a
+        GlyphSprite, drawing the segments exactly as _draw_path does.
         """
+        scale = record.scale
+        # only paths of 2 or more samples have segments to draw
+        paths = [path for path in smoothed_paths if len(path) > 1]
+        if not paths:
+            return glyph_cache.GlyphSprite(None, (0, 0))
+
+        # scale is positive, so scaling the extent gives the scaled extent
+        extents = [glyph_store.path_extent(path) for path in paths]
+        min_x, min_y, max_x, max_y = (
+            scale * min(extent[0] for extent in extents),
+            scale * min(extent[1] for extent in extents),
+            scale * max(extent[2] for extent in extents),
+            scale * max(extent[3] for extent in extents),
+        )
 
-        if char in s.FORMATTING_ESC_CHARS:
-            return self._process_formatting_esc_char(char)
-
-        if char == s.SYMBOL_ESC_CHAR:
-            return self._process_symbol_esc_char(char)
-
-        if char in s.LATEX_ESC_CHARS:
-            return self._process_latex_esc_char(char)
-
-        if char in s.INTERRUPT_ESC_CHARS:
-            return self._process_interrupt_esc_char(char)
-
-        return None
-
-    def _process_linebreaking(self):
-        """semi-intelligent line breaking to ensure words
-        don't run past edge of text box
-        """
-
-        if self.state.current_pos[0] == self.props.origin_pos[0]:
-            # at start of newline, so measure next word length from current
-            # index in parsed text
-            word_length_pixels = self._get_word_length_pixels(
-                self.props.parsed_text, self.state.i, self.default_style.scale
-            )
-
-        elif (
-            self.state.char == " "
-            or self.state.char == "."
-            and self.state.i + 1 < len(self.props.parsed_text)
-            and self.props.parsed_text[self.state.i + 1][1] != " "
-        ):
-            # not starting a newline and current char is a space or fullstop
-            # and next char is not a space, so measure next word length from
-            # next index in parsed text
-            word_length_pixels = self._get_word_length_pixels(
-                self.props.parsed_text, self.state.i + 1, self.default_style.scale
-            )
-
-        else:
-            # don't need to do any further checking
-            return
-
-        # check if next word will fit onto line
-        if (
-            self.state.current_pos[0] + word_length_pixels
-            >= self.props.text_box_left_edge
-        ):
-            self._newline()
-
-    def _add_space(self):
-        """
-        Add space unless start of line
-        """
-        if self.state.current_pos[0] != self.props.origin_pos[0]:
-            self.state.current_pos = (
-                self.state.current_pos[0] + self.props.word_spacing,
-                self.state.current_pos[1],
+        # room for the ink either side of the path points
+        pad = record.linewidth + 2
+        if record.nib is not None:
+            pad += math.ceil(record.nib["width"])
+        elif record.spray is not None:
+            pad += max(self.spray.get_size())
+        left, top = math.floor(min_x) - pad, math.floor(min_y) - pad
+        width = math.ceil(max_x) + pad - left
+        height = math.ceil(max_y) + pad - top
+
+        surf = pg.Surface((width, height), pg.SRCALPHA)
+        for path in paths:
+            xs, ys, _ = glyph_store.path_columns(path)
+            self._draw_segments(
+                surf,
+                [vec(scale * x - left, scale * y - top) for x, y in zip(xs, ys)],
+                record.colour,
+                record.linewidth,
+                record.nib,
+                record.spray,
             )
+        return glyph_cache.GlyphSprite(surf, (left, top))
 
-    def _move_to_next_pos(self):
+    def _blit_glyph_sprite(self, sprite, record):
         """
-        next char start at leftmost postion of last char plus the space
+        Blits sprite at the position of GlyphRecord record.
         """
-        self.state.current_pos = (
-            self.state.x_max + self.props.char_spacing,
-            self.state.current_pos[1],
+        if sprite.surf is None:
+            return
+        left, top = sprite.offset
+        self.surf.blit(
+            sprite.surf,
+            (
+                round(record.pos[0] + left),
+                round(record.pos[1] + record.vert_offset + top),
+            ),
         )
 
-    def _write_char(self, char_key):
+    def _write_char(self, record):
         """
-        Writes char.
+        Writes the char of GlyphRecord record.
         Generator. Yields Flag.USER_QUIT if user quit else None.
         """
-        self.state.x_max = 0
-
-        # paths will be from working dict or if not found there, from
-        # default dict or None if not found there either.
-
-        # Note: key_val() should substitute key corresp to a question mark
-        # for any rogue characters.
-        # paths = self.hw_dict.get(char_key,
-        #                           self.hw_default_dict.get(char_key, None))
-
-        # might be a way of doing this more elegantly using .get dict method
-        if char_key in self.hw_dict:
-            paths = self.hw_dict[char_key]
-        elif char_key in self.hw_default_dict:
-            paths = self.hw_default_dict[char_key]
-        else:
-            paths = self.hw_default_dict[str(ord(s.PROPS_REC["not_recognised_char"]))]
-
-        # if paths is None:
-        #     yield
+        if self.props.instantly and s.PROPS_GEN["glyph_sprites"]:
+            # fast path, blit the whole glyph from the sprite cache
+            sprite = self._get_glyph_sprite(record)
+            if sprite is not None:
+                response = check_user_event()
+                if response in (UserEvent.ESCAPED, UserEvent.WINDOW_CLOSED):
+                    yield Flag.USER_QUIT
+                self._blit_glyph_sprite(sprite, record)
+                yield
+                return
 
-        for path in paths:
+        _, smoothed_paths = self._get_smoothed_paths(record.char_key, self.props.bs)
+        for smoothed_path in smoothed_paths:
             response = check_user_event()
 
             if response in (UserEvent.ESCAPED, UserEvent.WINDOW_CLOSED):
                 yield Flag.USER_QUIT
 
-            # smooth path
-            self.props.bsx.reset()
-            self.props.bsy.reset()
-            smoothed_path = []
-
-            for data in path:
-                x, y = data["pos"]
-                # If smooth_level was 0 (i.e. buffer_size = 0) then the smooth
-                # method of BufferSmooth immediately returns the value so there
-                # should not be too much overhead calling this method
-                # even when no smoothing is required. The conditional logic to
-                # prevent this was more trouble than it was worth!
-                smoothed_x = self.props.bsx.smooth(x)
-                smoothed_y = self.props.bsy.smooth(y)
-                smoothed_path.append(
-                    {"pos": (smoothed_x, smoothed_y), "time": data["time"]}
-                )
-
             dp = self._draw_path(
                 smoothed_path,
-                (
-                    self.state.current_pos[0],
-                    self.state.current_pos[1] + self.style.vert_offset,
-                ),
-                colour=self.style.colour,
-                linewidth=self.style.linewidth,
-                nib=self.style.nib,
-                spray=self.style.spray,
-                scale=self.style.scale,
-                speed_mult=self.style.speed_mult,
+                (record.pos[0], record.pos[1] + record.vert_offset),
+                colour=record.colour,
+                linewidth=record.linewidth,
+                nib=record.nib,
+                spray=record.spray,
+                scale=record.scale,
+                # the writing speed can also be changed on the fly, see
+                # write_text_gen
+                speed_mult=record.speed_mult * self.state.speed_factor,
                 instantly=self.props.instantly,
                 cursor_img=self.props.cursor_img,
             )
 
-            while True:
-                try:
-                    val = next(dp)
-                    yield
-                except StopIteration:
-                    break
+            for _ in dp:
+                yield
 
-            xm = val
-            if xm is not None:
-                if xm > self.state.x_max:
-                    self.state.x_max = xm
+        # so that write_text_gen checks for overflow even if nothing waited
+        yield
 
-    def _newline(self):
+    def _draw_line(self, record):
         """
-        move to start of next line down
+        Draws the underline or hyphen of LineRecord record.
         """
-        self.state.current_pos = (
-            self.props.origin_pos[0] + s.PROPS_GEN["text_box_margin"],
-            self.state.current_pos[1] + self.props.line_spacing,
+        mod_rect = pg.draw.line(
+            self.surf, record.colour, record.start, record.end, record.linewidth
         )
+        self._mark_dirty(mod_rect)
 
-    def _process_hyphenation(self):
+    def _blit_latex(self, record):
         """
-        hyphenation is rather crude; hyphen inserted when next char
-        would run over
+        Blits the latex surf of LatexRecord record to the surf.
         """
-        if (
-            self.state.current_pos[0]
-            > self.props.text_box_left_edge - s.PROPS_GEN["text_box_margin"]
-        ):
-
-            if (
-                self.state.i + 1 < len(self.props.parsed_text)
-                and self.props.parsed_text[self.state.i + 1][1] != " "
-            ):
-
-                # next character is not a space, hence we are splitting a word,
-                # so add a hypen
-
-                char_width, char_height = self.generic_char_size
-
-                hyphen_start_pos = (
-                    self.state.current_pos[0]
-                    + 0.5 * char_width * self.default_style.scale,
-                    self.state.current_pos[1]
-                    - 0.5 * char_height * self.default_style.scale,
-                )
+        mod_rect = self.surf.blit(record.surf, record.rect)
+        self._mark_dirty(mod_rect)
 
-                hyphen_length = int(
-                    (self.props.pt_size / 28) * s.PROPS_GEN["hyphen_length"]
-                )
-                hyphen_end_pos = (
-                    hyphen_start_pos[0] + hyphen_length,
-                    hyphen_start_pos[1],
-                )
-                mod_rect = pg.draw.line(
-                    self.surf,
-                    self.style.colour,
-                    hyphen_start_pos,
-                    hyphen_end_pos,
-                    self.style.linewidth,
-                )
-                if self.update_display:
-                    pg.display.update(mod_rect)
-
-            if "underline" in self.state.style_set:
-                # save position before we move to next line
-                self.state.underline_end_pos = (
-                    self.state.current_pos[0],
-                    self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
-                )
-
-            self._newline()
-
-    def _process_underlining(self):
+    def _wait_for_key(self):
         """
-        Handles underlining of text. This just appears and is currently not
-        animated.
+        Waits for keypress or quit
         """
-        if self.state.underline_end_pos is None:
-            self.state.underline_end_pos = (
-                self.state.current_pos[0],
-                self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
-            )
-
-        mod_rect = pg.draw.line(
-            self.surf,
-            self.style.colour,
-            self.state.underline_start_pos,
-            self.state.underline_end_pos,
-            self.style.linewidth,
-        )
-
-        if self.update_display:
-            pg.display.update(mod_rect)
+        while True:
+            response = check_user_event()
+            if response in (
+                UserEvent.ESCAPED,
+                UserEvent.WINDOW_CLOSED,
+                UserEvent.KEY_PRESSED,
+            ):
+                break
 
     def char_okay(self, char):
         """
@@ -975,6 +699,9 @@ class HandWriterGen:
         text_rect_bg_col=None,
         text_rect_border_width=None,
         text_rect_border_col=None,
+        collect_rects=False,
+        cursor_overlay=False,
+        line_breaking=None,
     ):
 
         r"""
@@ -989,7 +716,7 @@ class HandWriterGen:
             if true, the calling code (e.g. handwriter.py) is passing the
             screen as the surface to be written on, and so this requires
             pg.display.update() calls in this code after blits to show those
-            blits.
+            blits. The rects changed are updated together once per frame.
             None --> default used
         text_box_rect: (x,y, w, h) or equivalent pygame rect specifying the
         bounding rect for the written text **RELATIVE** to the passed surf.
@@ -1031,7 +758,9 @@ class HandWriterGen:
             default writing speed (1 = speed at which handwriting was recorded)
 
         instantly: Bool
-            if true, text appears instantly
+            if true, text appears instantly. Glyphs are then blitted from
+            cached sprites rather than drawn stroke by stroke, unless
+            PROPS_GEN["glyph_sprites"] is False.
 
         cursor: string or pygame surface
             Either name of one of the built-in cursor types or pygame surface
@@ -1071,6 +800,21 @@ class HandWriterGen:
         text_rect_border_col: int tuple (r,g,b,a)
             text_rect border colour
             default is none
+        collect_rects: bool
+            if true, the display is never updated; instead the rects of surf
+            changed are collected for the calling code to get with flush()
+            (e.g. once a frame, to pass on to pg.display.update)
+            default is False
+        cursor_overlay: bool
+            if true, the cursor is never drawn onto surf; instead the calling
+            code shows it over surf where get_cursor() says, e.g. as a sprite
+            (see handwriter_sprite.py)
+            default is False
+        line_breaking: str
+            "greedy" breaks a line only once the next word will not fit on it
+            "optimal" chooses all the line breaks of a paragraph together so
+            the lines are as evenly filled as they can be
+            None --> default used
 
 
         Styles (effects)
@@ -1156,59 +900,34 @@ class HandWriterGen:
         r"Left arrow `left`, down arrow `down`"
 
         """
-        # first check for illegal Esc tokens in text
-        i = legal_token_check.get_illegal_index(text)
-        if i is not None:
-            raise Exception(f"Unrecognised Esc token at index position {i} in text!")
-        # TODO could show text with error position marked
-
         self.update_display = (
             s.PROPS_GEN["update_display"] if update_display is None else update_display
         )
+        self.collect_rects = collect_rects
+        self.cursor_overlay = cursor_overlay
+        self.dirty_rects = DirtyRects()
 
         # Put attributes into containers to keep track of them.
-
-        # properties ---------------------------------------------------------
-        self.props = Container()
-        if text_rect is None:
-            # centre text rect on surf with uniform gap all around
-            surf_rect = self.surf.get_rect()
-            b = s.PROPS_GEN["text_box_border"]
-            self.props.rect = surf_rect.inflate((-b, -b))
-        else:
-            self.props.rect = pg.Rect(text_rect)
-        self.props.origin_pos = self.props.rect.topleft  # rect is rel to surf
-        self.props.text_box_width = self.props.rect.width
-        self.props.text_box_height = self.props.rect.height
-        self.props.num_tabs = s.PROPS_GEN["num_tabs"] if num_tabs is None else num_tabs
-        self.props.tab_spacing = self.props.text_box_width // self.props.num_tabs
-        self.props.text_box_left_edge = (
-            self.props.origin_pos[0] + self.props.text_box_width
-        )
-        self.props.pt_size = pt_size or s.PROPS_GEN["display_pt_size"]
-        self.props.super_offset = s.PROPS_GEN["super_offset_sf"] * self.props.pt_size
-        self.props.sub_offset = s.PROPS_GEN["sub_offset_sf"] * self.props.pt_size
-        self.props.up_offset = s.PROPS_GEN["up_offset_sf"] * self.props.pt_size
-        self.props.down_offset = s.PROPS_GEN["down_offset_sf"] * self.props.pt_size
-        self.props.char_spacing = (
-            s.PROPS_GEN["char_spacing"] if char_spacing is None else char_spacing
-        )
-        self.props.word_spacing = (
-            s.PROPS_GEN["word_spacing"] if word_spacing is None else word_spacing
-        )
-        self.props.line_spacing = (
-            self.props.pt_size * 1.5 if line_spacing is None else line_spacing
+        self.props, self.default_style = self._init_text(
+            text,
+            text_rect=text_rect,
+            colour=colour,
+            linewidth=linewidth,
+            smooth_level=smooth_level,
+            nib=nib,
+            spray=spray,
+            pt_size=pt_size,
+            char_spacing=char_spacing,
+            word_spacing=word_spacing,
+            line_spacing=line_spacing,
+            speed_mult=speed_mult,
+            instantly=instantly,
+            num_tabs=num_tabs,
+            hyphenation=hyphenation,
+            text_rect_bg_col=text_rect_bg_col,
+            line_breaking=line_breaking,
         )
-        self._prepare_text(text)
-        self.props.hyphenation = hyphenation
-        self.props.instantly = instantly
 
-        # I had to change alpha of text_rect_bg_col to 255 to make latex equations
-        # work, but I think there was a good reason why I had put it to zero ...?
-        # self.props.text_rect_bg_col = (0,0,0,0) if text_rect_bg_col is None else text_rect_bg_col
-        self.props.text_rect_bg_col = (
-            (0, 0, 0, 255) if text_rect_bg_col is None else text_rect_bg_col
-        )
         if cursor is None:
             self.props.cursor_img = None
         else:
@@ -1225,53 +944,15 @@ class HandWriterGen:
                 self.props.cursor_img = pg.transform.rotozoom(
                     self.props.cursor_img, 0, cursor_sf
                 )
-        # style---------------------------------------------------------------
-        self.default_style = Container()
-        self.default_style.colour = colour or s.PROPS_GEN["colour"]
-        self.default_style.linewidth = linewidth or s.PROPS_GEN["linewidth"]
-        self.default_style.nib = nib  # default value is None
-        self.default_style.spray = spray  # default value is None
+        # for saving the region under the cursor (if drawn onto the surf),
+        # reused every time it is drawn, see _wait_until
+        self._cursor_save_surf = None
+        if self.props.cursor_img is not None and not cursor_overlay:
+            self._cursor_save_surf = pg.Surface(
+                self.props.cursor_img.get_size(), pg.SRCALPHA
+            )
         if spray is not None:
             self._customise_spray(spray)
-        # scale factor depends on pt size that path was saved as in recorder.py
-        self.default_style.scale = self.props.pt_size / s.PROPS_REC["save_pt_size"]
-        self.default_style.speed_mult = (
-            speed_mult * s.PROPS_GEN["speed_mult"]
-            if speed_mult is not None
-            else s.PROPS_GEN["speed_mult"]
-        )
-        self.default_style.vert_offset = 0
-
-        # state---------------------------------------------------------------
-        self.state = Container()
-        # move down and to right of top left of bounding rect to start first
-        # char
-        self.state.current_pos = (
-            self.props.origin_pos[0] + s.PROPS_GEN["text_box_margin"],
-            self.props.origin_pos[1] + self.props.line_spacing,
-        )
-
-        self.state.skip_next_char = False
-        self.state.latex_inline_count = 0
-        self.state.latex_newline_count = 0
-        self.state.symbol_count = 0
-        self.state.underline_start_pos = None
-        self.state.underline_end_pos = None
-        self.state.x_max = None
-        self.state.i = None
-        self.state.style_set = None
-        self.state.char = None
-
-        self.props.char_spacing *= self.default_style.scale
-        self.props.word_spacing *= self.default_style.scale
-
-        # any smooth_value not in 0-9 inclusive will default to default_smooth_level
-        buffer_size = s.PROPS_REC["smooth_levels"].get(
-            smooth_level, s.PROPS_REC["default_smooth_level"]
-        )
-        # print("buffer size = ", buffer_size) # debug
-        self.props.bsx = BufferSmooth(buffer_size=buffer_size)
-        self.props.bsy = BufferSmooth(buffer_size=buffer_size)
 
         # Backgrounds and borders
         # Note that pygame does not allow screen (display) to be filled
@@ -1304,14 +985,38 @@ class HandWriterGen:
                 temp_surf, text_rect_border_col, self.props.rect, text_rect_border_width
             )
             self.surf.blit(temp_surf, (0, 0))
-        if self.update_display:
-            pg.display.flip()
+        self._mark_dirty(self.surf.get_rect())
+        if not self.collect_rects:
+            self.flush()
+
+        # layout--------------------------------------------------------------
+        # where everything goes is decided by the layout, which write_text_gen
+        # then draws record by record
+        self.layout = TextLayout(self, self.props, self.default_style)
+        # any latex equations are rendered in the background meanwhile
+        self.layout.prerender_latex()
+
+        # state---------------------------------------------------------------
+        self.state = Container()
+        self.state.current_pos = None
+        # multiplies the speed of every char, can be changed on the fly
+        self.state.speed_factor = 1
+        # the animation is timed against self.clock (ms); pen_time is when the
+        # pen is free to draw the next path, pen_pt where it was last, and
+        # due when the next thing to draw is due (None if not waiting)
+        self.clock = AnimationClock()
+        self.state.pen_time = 0
+        self.state.pen_pt = None
+        # where the cursor is shown, None if not shown
+        self.state.cursor_pt = None
+        self.state.due = None
 
         def write_text_gen():
             """
             A generator that writes the text char by char.
 
-            Each char is written path by path, where a path is a continous line
+            The text is laid out by self.layout (see layout.py), then each
+            char is written path by path, where a path is a continous line
             without pen leaving paper.
             Each path is drawn as a series of straight line segments, with a
             delay between each, as recorded during training.
@@ -1327,93 +1032,54 @@ class HandWriterGen:
             used for the speed multiplier.
             """
 
-            # print(f"{self.props.parsed_text}") # debug
-            # loop through text................................................
-            for self.state.i, (self.state.style_set, self.state.char) in enumerate(
-                self.props.parsed_text
-            ):
+            for record in self.layout.records():
 
-                # set style to default
-                self.style = deepcopy(self.default_style)
+                if isinstance(record, GlyphRecord):
+                    # handwrite char-------------------------------------------
+                    self.state.current_pos = record.pos
+                    wc = self._write_char(record)  # generator
+                    while True:
 
-                # escape chars need to be skipped
-                if self.state.skip_next_char:
-                    self.state.skip_next_char = False
-                    continue
+                        try:
+                            val = next(wc)
 
-                # handwriting style-------------------------------------------
-                self._process_style()
+                        except StopIteration:
+                            break
 
-                # linebreaking------------------------------------------------
-                # previously after processing of escape chars
-                if not self.props.hyphenation:
-                    self._process_linebreaking()
+                        if self.state.current_pos[1] > self.props.text_box_height:
+                            yield Flag.OVERFLOW
 
-                self.state.underline_end_pos = None
+                        elif val is Flag.USER_QUIT:
+                            yield Flag.USER_QUIT
 
-                # spaces-------------------------------------------------------
-                # previously after processing of escape chars
-                if self.state.char == " ":
-                    self._add_space()
-                    continue
+                        else:
+                            received_data = yield self.state.current_pos
 
-                # escape chars------------------------------------------------
-                if self.state.char == "\\":
+                            if received_data is not None:
+                                self.state.speed_factor *= received_data
 
-                    try:
-                        next_char = self.props.parsed_text[self.state.i + 1][1]
-                    except IndexError:
-                        break
+                elif isinstance(record, LineRecord):
+                    # underline or hyphen--------------------------------------
+                    self._draw_line(record)
 
-                    self.state.skip_next_char = True
-
-                    char_key = self._process_escape_char(next_char)
-
-                    if char_key is None:
-                        continue
-
-                else:
-                    # not an escape char
-                    char_key = get_char_key(self.state.char)
-
-                # char_key is either unicode for a "regular" char
-                # or the symbol name
-
-                # handwrite char-----------------------------------------------
-                wc = self._write_char(char_key)  # generator
-                while True:
-
-                    try:
-                        val = next(wc)
-
-                    except StopIteration:
-                        break
-
-                    if self.state.current_pos[1] > self.props.text_box_height:
-                        yield Flag.OVERFLOW
-
-                    elif val is Flag.USER_QUIT:
-                        yield Flag.USER_QUIT
+                elif isinstance(record, LatexRecord):
+                    self._blit_latex(record)
 
+                elif isinstance(record, PauseRecord):
+                    if self.props.instantly:
+                        pg.time.delay(record.delay_ms)
                     else:
-                        received_data = yield self.state.current_pos
+                        self.state.pen_time += record.delay_ms
+                        for _ in self._wait_until(self.state.pen_time):
+                            yield self.state.current_pos
 
-                        if received_data is not None:
-                            self.default_style.speed_mult *= received_data
+                elif isinstance(record, WaitRecord):
+                    self._wait_for_key()
 
-                # move to next position----------------------------------------
-                self._move_to_next_pos()
-
-                # hyphenation--------------------------------------------------
-                if self.props.hyphenation:
-                    self._process_hyphenation()
-
-                # underlining-------------------------------------------------
-                if "underline" in self.state.style_set:
-                    self._process_underlining()
-
-            if self.props.instantly and self.update_display:
-                pg.display.flip()
+            if self.props.instantly:
+                self._mark_dirty(self.surf.get_rect())
+            if not self.collect_rects:
+                self.flush()
 
             # end of inner func------------------------------------------------
 
@@ -1424,6 +1090,8 @@ class HandWriterGen:
         # Up to calling code to decide how to handle these cases.
         # Calling code can also use "send" to send data back to the yield
         # to change the speed multiplier
+        # Rather than calling next itself, calling code can call advance once
+        # a frame to draw everything due in that frame.
 
         wtg = write_text_gen()
 
@@ -1433,26 +1101,263 @@ class HandWriterGen:
                     val = next(wtg)
                     if val is Flag.USER_QUIT or val is Flag.OVERFLOW:
                         # update display evn on break, else nothing shows
-                        if self.update_display:
-                            pg.display.flip()
+                        self._mark_dirty(self.surf.get_rect())
+                        if not self.collect_rects:
+                            self.flush()
                         break
                 except StopIteration:
                     val = None
                     break
-            return oneshot_generator(val)
+            self.writing = oneshot_generator(val)
+        else:
+            self.writing = wtg
+        return self.writing  # generator
 
-        return wtg  # generator
+    def measure_text(
+        self,
+        text,
+        text_rect=None,
+        pt_size=None,
+        linewidth=None,
+        smooth_level=None,
+        nib=None,
+        spray=None,
+        char_spacing=None,
+        word_spacing=None,
+        line_spacing=None,
+        num_tabs=None,
+        hyphenation=False,
+        line_breaking=None,
+    ):
+        """
+        Returns the TextMeasurement (see layout.py) of text as write_text
+        would write it with the same arguments, i.e. the rect bounding it, the
+        rects of its lines and whether it overflows text_rect.
+        Nothing is drawn: the text is laid out from the glyph metrics and
+        latex equations are only estimated, so this is cheap enough to call
+        repeatedly, e.g. to fit text to a box.
+        """
+        props, default_style = self._init_text(
+            text,
+            text_rect=text_rect,
+            linewidth=linewidth,
+            smooth_level=smooth_level,
+            nib=nib,
+            spray=spray,
+            pt_size=pt_size,
+            char_spacing=char_spacing,
+            word_spacing=word_spacing,
+            line_spacing=line_spacing,
+            instantly=True,
+            num_tabs=num_tabs,
+            hyphenation=hyphenation,
+            line_breaking=line_breaking,
+        )
+        return measure_layout(
+            TextLayout(self, props, default_style, estimate_latex=True)
+        )
 
-    def _prepare_text(self, text):
-        # the next two can get populated by preprocess_text()!
-        self.props.latex_inline_list = None
-        self.props.latex_newline_list = None
-        self.props.symbol_list = None
-        self.props.parsed_text = parse(
-            self._preprocess_text(text), style_tokens.STYLE_TOKENS
+    def fit_text(
+        self,
+        text,
+        text_rect=None,
+        min_pt_size=None,
+        max_pt_size=None,
+        fit_line_spacing=False,
+        linewidth=None,
+        smooth_level=None,
+        nib=None,
+        spray=None,
+        char_spacing=None,
+        word_spacing=None,
+        line_spacing=None,
+        num_tabs=None,
+        hyphenation=False,
+        line_breaking=None,
+    ):
+        """
+        Returns the TextFit (see layout.py) giving the largest pt_size from
+        min_pt_size to max_pt_size for which text fits inside text_rect, and
+        the TextMeasurement of the text at that size.
+        If fit_line_spacing is true, the line spacing may also be reduced,
+        down to PROPS_GEN["min_line_spacing_sf"] * pt_size, to fit bigger
+        text, and is then made as big as will still fit.
+        If the text does not fit even at min_pt_size, the fit at min_pt_size
+        is returned, with its measurement showing the overflow.
+        The text is only laid out (see measure_text), never drawn.
+        """
+        rect = self._get_text_rect(text_rect)
+        min_pt_size = min_pt_size or s.PROPS_GEN["min_fit_pt_size"]
+        max_pt_size = max_pt_size or s.PROPS_GEN["max_fit_pt_size"]
+
+        def measure(pt_size, line_spacing):
+            return self.measure_text(
+                text,
+                text_rect=rect,
+                pt_size=pt_size,
+                linewidth=linewidth,
+                smooth_level=smooth_level,
+                nib=nib,
+                spray=spray,
+                char_spacing=char_spacing,
+                word_spacing=word_spacing,
+                line_spacing=line_spacing,
+                num_tabs=num_tabs,
+                hyphenation=hyphenation,
+                line_breaking=line_breaking,
+            )
+
+        def fits(measurement):
+            return not measurement.overflow and rect.contains(measurement.rect)
+
+        def tightest_line_spacing(pt_size):
+            if fit_line_spacing:
+                return s.PROPS_GEN["min_line_spacing_sf"] * pt_size
+            return line_spacing
+
+        # binary search for largest pt_size that fits
+        lo, hi = min_pt_size, max_pt_size
+        best = None
+        while lo <= hi:
+            pt_size = (lo + hi) // 2
+            spacing = tightest_line_spacing(pt_size)
+            measurement = measure(pt_size, spacing)
+            if fits(measurement):
+                best = TextFit(pt_size, spacing, measurement)
+                lo = pt_size + 1
+            else:
+                hi = pt_size - 1
+
+        if best is None:
+            spacing = tightest_line_spacing(min_pt_size)
+            return TextFit(min_pt_size, spacing, measure(min_pt_size, spacing))
+
+        if fit_line_spacing:
+            # spread the lines back out as far as they still fit, up to the
+            # usual line spacing
+            lo = best.line_spacing
+            hi = line_spacing or best.pt_size * 1.5
+            measurement = measure(best.pt_size, hi)
+            if fits(measurement):
+                return TextFit(best.pt_size, hi, measurement)
+            for _ in range(s.PROPS_GEN["fit_line_spacing_steps"]):
+                spacing = (lo + hi) / 2
+                measurement = measure(best.pt_size, spacing)
+                if fits(measurement):
+                    best = TextFit(best.pt_size, spacing, measurement)
+                    lo = spacing
+                else:
+                    hi = spacing
+
+        return best
+
+    def _get_text_rect(self, text_rect):
+        """
+        Returns text_rect as a pygame Rect, or if it is None the rect
+        write_text uses by default.
+        """
+        if text_rect is None:
+            # centre text rect on surf with uniform gap all around
+            surf_rect = self.surf.get_rect()
+            b = s.PROPS_GEN["text_box_border"]
+            return surf_rect.inflate((-b, -b))
+        return pg.Rect(text_rect)
+
+    def _init_text(
+        self,
+        text,
+        text_rect=None,
+        colour=None,
+        linewidth=None,
+        smooth_level=None,
+        nib=None,
+        spray=None,
+        pt_size=None,
+        char_spacing=None,
+        word_spacing=None,
+        line_spacing=None,
+        speed_mult=None,
+        instantly=False,
+        num_tabs=None,
+        hyphenation=False,
+        text_rect_bg_col=None,
+        line_breaking=None,
+    ):
+        """
+        Parses text and returns the tuple (props, default_style) of
+        Containers that the layout of text needs, for the arguments of
+        write_text of the same names. Nothing is drawn.
+        """
+        # properties ---------------------------------------------------------
+        props = Container()
+        props.rect = self._get_text_rect(text_rect)
+        props.origin_pos = props.rect.topleft  # rect is rel to surf
+        props.text_box_width = props.rect.width
+        props.text_box_height = props.rect.height
+        props.num_tabs = s.PROPS_GEN["num_tabs"] if num_tabs is None else num_tabs
+        props.tab_spacing = props.text_box_width // props.num_tabs
+        props.text_box_left_edge = props.origin_pos[0] + props.text_box_width
+        props.pt_size = pt_size or s.PROPS_GEN["display_pt_size"]
+        props.super_offset = s.PROPS_GEN["super_offset_sf"] * props.pt_size
+        props.sub_offset = s.PROPS_GEN["sub_offset_sf"] * props.pt_size
+        props.up_offset = s.PROPS_GEN["up_offset_sf"] * props.pt_size
+        props.down_offset = s.PROPS_GEN["down_offset_sf"] * props.pt_size
+        props.char_spacing = (
+            s.PROPS_GEN["char_spacing"] if char_spacing is None else char_spacing
+        )
+        props.word_spacing = (
+            s.PROPS_GEN["word_spacing"] if word_spacing is None else word_spacing
+        )
+        props.line_spacing = (
+            props.pt_size * 1.5 if line_spacing is None else line_spacing
         )
-        if self.props.parsed_text is None:
-            error_msg = f"""Error parsing text. Check that all curly brackets
-            are paired and that all Escaped tokens are legal,
-            especially those starting with {s.ESC_CHARS}"""
-            raise Exception(error_msg)
+        self._prepare_text(text, props)
+        props.hyphenation = hyphenation
+        props.line_breaking = line_breaking or s.PROPS_GEN["line_breaking"]
+        props.instantly = instantly
+
+        # I had to change alpha of text_rect_bg_col to 255 to make latex equations
+        # work, but I think there was a good reason why I had put it to zero ...?
+        # props.text_rect_bg_col = (0,0,0,0) if text_rect_bg_col is None else text_rect_bg_col
+        props.text_rect_bg_col = (
+            (0, 0, 0, 255) if text_rect_bg_col is None else text_rect_bg_col
+        )
+        # style---------------------------------------------------------------
+        default_style = Style(
+            colour=colour or s.PROPS_GEN["colour"],
+            linewidth=linewidth or s.PROPS_GEN["linewidth"],
+            nib=nib,  # default value is None
+            spray=spray,  # default value is None
+            # scale factor depends on pt size that path was saved as in recorder.py
+            scale=props.pt_size / s.PROPS_REC["save_pt_size"],
+            speed_mult=(
+                speed_mult * s.PROPS_GEN["speed_mult"]
+                if speed_mult is not None
+                else s.PROPS_GEN["speed_mult"]
+            ),
+            vert_offset=0,
+        )
+
+        props.char_spacing *= default_style.scale
+        props.word_spacing *= default_style.scale
+
+        # any smooth_value not in 0-9 inclusive will default to default_smooth_level
+        buffer_size = s.PROPS_REC["smooth_levels"].get(
+            smooth_level, s.PROPS_REC["default_smooth_level"]
+        )
+        # print("buffer size = ", buffer_size) # debug
+        props.bs = BufferSmooth(buffer_size=buffer_size)
+
+        return props, default_style
+
+    def _prepare_text(self, text, props):
+        """
+        Tokenizes text into props (see tokenizer.py). Raises an Exception if
+        text has illegal Esc tokens or unpaired curly brackets.
+        """
+        # TODO could show text with error position marked
+        tokenized_text = tokenize(text)
+        props.latex_inline_list = tokenized_text.latex_inline_list
+        props.latex_newline_list = tokenized_text.latex_newline_list
+        props.symbol_list = tokenized_text.symbol_list
+        props.parsed_text = tokenized_text.parsed_text
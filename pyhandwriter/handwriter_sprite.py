@@ -13,6 +13,38 @@ from .enums import Flag
 from .handwriter_gen import HandWriterGen
 
 
+class CursorSprite(pg.sprite.DirtySprite):
+    """
+    Shows the cursor of a HandWriterSprite over it while it writes, so the
+    cursor is never drawn onto (and then rubbed out of) the writing itself.
+    """
+
+    def __init__(self, hw_sprite, layer):
+        self._layer = layer  # Note: need to set layer before super init!
+        pg.sprite.DirtySprite.__init__(self)
+        self.hw_sprite = hw_sprite
+        self.image = pg.Surface((0, 0))
+        self.offset = (0, 0)  # of cursor topleft from hw_sprite topleft
+        self.visible = 0
+
+    @property
+    def rect(self):
+        # worked out when drawn, so the cursor keeps up with the hw sprite
+        # even if that is moved after update
+        x, y = self.hw_sprite.rect.topleft
+        return self.image.get_rect(topleft=(x + self.offset[0], y + self.offset[1]))
+
+    def update(self, dt):
+        self.dirty = 1
+        cursor = self.hw_sprite.hw.get_cursor()
+        if cursor is None:
+            self.visible = 0
+            return
+        self.image, pos = cursor
+        self.offset = (int(pos[0]), int(pos[1]))
+        self.visible = 1
+
+
 class HandWriterSprite(pg.sprite.DirtySprite):
     """
     TODO docstring
@@ -52,6 +84,7 @@ class HandWriterSprite(pg.sprite.DirtySprite):
             text_rect_bg_col=None,
             text_rect_border_width=None,
             text_rect_border_col=None,
+            line_breaking=None,
     ):
         self._layer = layer  # Note: need to set layer before super init!
         pg.sprite.DirtySprite.__init__(self)
@@ -83,6 +116,7 @@ class HandWriterSprite(pg.sprite.DirtySprite):
         self.text_rect_bg_col = text_rect_bg_col
         self.text_rect_border_width = text_rect_border_width
         self.text_rect_border_col = text_rect_border_col
+        self.line_breaking = line_breaking
         self.image = surf
         self.surf_topleft = (20, 20) if surf_topleft is None else surf_topleft
         self.rect = self.image.get_rect(topleft=self.surf_topleft)
@@ -93,6 +127,10 @@ class HandWriterSprite(pg.sprite.DirtySprite):
         self.paused = False
         self.hw = HandWriterGen(self.surf, self.hw_font)
         self._set_generator()
+        # same layer, but added after, so drawn on top
+        self.cursor_sprite = CursorSprite(self, layer)
+        sprite_group.add(self.cursor_sprite)
+        HandWriterSprite.handwriter_sprites.add(self.cursor_sprite)
         # self.is_first_tick = True
 
     def _set_generator(self):
@@ -121,10 +159,13 @@ class HandWriterSprite(pg.sprite.DirtySprite):
             text_rect_bg_col=self.text_rect_bg_col,
             text_rect_border_width=self.text_rect_border_width,
             text_rect_border_col=self.text_rect_border_col,
+            cursor_overlay=True,  # shown by self.cursor_sprite
+            line_breaking=self.line_breaking,
         )  # generator
 
     def update(self, dt):
-        # dt not used
+        # dt is the time (ms) since the last frame, see tick; the writing is
+        # moved on by that much.
         # In all cases, want sprite rect to continue to be updated in display
         # by setting self.dirty=1, else any other sprite passing over it will
         # leave trails; also sprite won't move properly.
@@ -133,15 +174,13 @@ class HandWriterSprite(pg.sprite.DirtySprite):
         if self.finished or self.paused:
             # print(self, "in update, paused") # debug
             return
-        try:
-            val = next(self.g)
-        except StopIteration:
+        val = self.hw.advance(dt)
+        if val is Flag.FINISHED:
             self.finished = True
-        else:
-            if val is Flag.USER_QUIT:
-                self.quit_attempt = True
-            elif val is Flag.OVERFLOW:
-                self.overlow = True
+        elif val is Flag.USER_QUIT:
+            self.quit_attempt = True
+        elif val is Flag.OVERFLOW:
+            self.overflow = True
 
     def pause(self):
         self.paused = True
@@ -175,29 +214,27 @@ class HandWriterSprite(pg.sprite.DirtySprite):
         # kill only removes instance from sprite group
         # so unhide just has to add it back to the sprite group
         self.kill()
+        self.cursor_sprite.kill()
 
     def unhide(self):
-        self.sprite_group.add(self)
-        self.handwriter_sprites.add(self)
+        self.sprite_group.add(self, self.cursor_sprite)
+        self.handwriter_sprites.add(self, self.cursor_sprite)
 
     @classmethod
     def tick(cls, fps):
-        now = time.time()
-        elapsed_time_since_last_call_sec = 0
+        """
+        Sleeps until 1/fps s after the last call, like pygame's Clock.tick,
+        and returns the time (ms) since the last call, to be passed to
+        update. The handwriter sprites are moved on by update, not here.
+        """
+        now = time.perf_counter()
         if cls.is_first_tick:
-            delay_sec = 1 / fps  # first tick will be wrong
             cls.is_first_tick = False
-            cls.then = now
-        else:
-            elapsed_time_since_last_call_sec = now - cls.then
-            delay_sec = max(0, 1 / fps - elapsed_time_since_last_call_sec)
-            cls.then = now
-        dont_care = 0
-        # print(int(1000*delay_sec))
-        while time.time() - now <= delay_sec:
-            # update all handwriter sprites
-            # but wait for redraw and display update in main game loop
-            cls.handwriter_sprites.update(dont_care)
-        return int(
-            1000 * (elapsed_time_since_last_call_sec + delay_sec)
-        )  # pygame needs milliseconds
+            cls.then = now - 1 / fps  # first tick will be wrong
+        delay_sec = 1 / fps - (now - cls.then)
+        if delay_sec > 0:
+            time.sleep(delay_sec)
+        elapsed_ms = int(1000 * (time.perf_counter() - cls.then))
+        # carry the fraction of a ms over to the next call, so no time is lost
+        cls.then += elapsed_ms / 1000
+        return elapsed_ms  # pygame needs milliseconds
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:31 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Packed hw font bundles.
+
+A recorded hw font is saved by recorder.py as one pickled "path" file per
+char, e.g. hw_segoescript#97.pth, so loading a font means listing the font
+folder and unpickling ~94 files.
+
+A bundle holds a whole font in a single file, hw_font + BUNDLE_EXT, which is
+read with a single I/O call. The layout is:
+
+    magic       4 bytes, b"HWFB"
+    version     uint32
+    index_len   uint32
+    index       utf-8 json, {"glyphs": {char_key: [[start, count], ...]},
+                             "metrics": {char_key: [min_x, min_y, ...]}}
+    padding     zero bytes up to the next 8-byte boundary
+    data        little-endian float64, (x, y, time) for every sample
+
+Each [start, count] pair in the index locates one path of the glyph, in
+samples, inside the contiguous data block. Samples are stored as float64 so
+that a bundle holds exactly the same values as the pickled path files.
+The metrics are the fields of a GlyphMetrics (see glyph_metrics.py).
+
+The index can be read on its own (read_index), and then the samples of just
+one glyph (read_samples), as the paths of each glyph are stored one after
+the other.
+
+To convert the pickled fonts in the package, run this module as a script.
+"""
+
+import array
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+from . import file_utils as fu
+from . import glyph_metrics
+from . import settings as s
+from .enums import Flag
+
+BUNDLE_EXT = ".hwb"
+MAGIC = b"HWFB"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+SAMPLE_LEN = 3  # x, y, time
+
+
+def get_bundle_fname(hw_font, path):
+    """
+    Returns the full filename of the bundle for hw_font in folder path
+    """
+    return os.path.join(path, hw_font + BUNDLE_EXT)
+
+
+def get_data_offset(index_len):
+    """
+    Returns the byte offset of the data block, which is aligned to 8 bytes
+    so that it can be viewed directly as float64.
+    """
+    offset = HEADER.size + index_len
+    return offset + (-offset % 8)
+
+
+def load_pth_files(hw_font, path):
+    """
+    Returns a hw_dict loaded from the per-char pickled path files of hw_font
+    in folder path, or Flag.FAIL if no files with the hw_font prefix exist.
+    """
+    char_keys = get_pth_keys(hw_font, path)
+    if char_keys is Flag.FAIL:
+        return Flag.FAIL
+
+    hw_dict = {}
+    for char_key in char_keys:
+        result = load_pth_file(hw_font, path, char_key)
+
+        if result is Flag.FAIL:
+            # pickle load failed
+            continue
+
+        hw_dict[char_key] = result
+
+    return hw_dict
+
+
+def get_pth_keys(hw_font, path):
+    """
+    Returns the list of the char_keys of the per-char pickled path files of
+    hw_font in folder path, without loading them, or Flag.FAIL if no files
+    with the hw_font prefix exist.
+    """
+    # get list of all filenames starting with the hw_font string
+    filenames = fu.get_filenames_with_prefix(hw_font, path=path)
+
+    if not filenames:
+        return Flag.FAIL
+
+    char_keys = []
+    for filename in filenames:
+        fname, ext = os.path.splitext(filename)
+
+        if ext != ".pth":
+            continue
+
+        char_keys.append(fname[len(hw_font) + len(s.PROPS_GEN["fname_separator"]) :])
+
+    return char_keys
+
+
+def load_pth_file(hw_font, path, char_key):
+    """
+    Returns the paths of glyph char_key loaded from its pickled path file
+    of hw_font in folder path, or Flag.FAIL if it could not be loaded.
+    """
+    filename = hw_font + s.PROPS_GEN["fname_separator"] + char_key + ".pth"
+    return fu.pickle_load(os.path.join(path, filename))
+
+
+def save_bundle(hw_dict, fname):
+    """
+    Packs hw_dict into a bundle file fname.
+    Return True if successful else False.
+    """
+    data = array.array("d")
+    glyphs = {}
+    for char_key, paths in hw_dict.items():
+        spans = []
+        for path in paths:
+            spans.append([len(data) // SAMPLE_LEN, len(path)])
+            for sample in path:
+                data.extend((sample["pos"][0], sample["pos"][1], sample["time"]))
+        glyphs[char_key] = spans
+
+    metrics = glyph_metrics.get_font_metrics(hw_dict)
+    return write_bundle({"glyphs": glyphs, "metrics": metrics}, data, fname)
+
+
+def write_bundle(index, data, fname):
+    """
+    Writes index and data, an array of float64 samples, to bundle file fname.
+    The bundle is written to a temporary file first and then replaces fname,
+    so a bundle that is being read (or is memory-mapped) is never changed
+    under the reader.
+    Return True if successful else False.
+    """
+    if sys.byteorder != "little":
+        data = array.array("d", data)
+        data.byteswap()
+
+    index = json.dumps(index).encode("utf-8")
+    padding = bytes(get_data_offset(len(index)) - HEADER.size - len(index))
+    try:
+        fd, temp_fname = tempfile.mkstemp(dir=os.path.dirname(fname), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(index)))
+            f.write(index)
+            f.write(padding)
+            f.write(data.tobytes())
+        if os.path.exists(fname):
+            shutil.copymode(fname, temp_fname)
+        os.replace(temp_fname, fname)
+        return True
+    except IOError:
+        print("IOError saving bundle ", fname)
+        return False
+
+
+def read_bundle(fname):
+    """
+    Returns the tuple (index, data) read from bundle fname, where data is an
+    array of float64 samples, or Flag.FAIL if the bundle could not be read.
+    """
+    try:
+        with open(fname, "rb") as f:
+            raw = f.read()  # the single I/O call
+        magic, version, index_len = HEADER.unpack_from(raw)
+    except (IOError, struct.error):
+        return Flag.FAIL
+
+    if magic != MAGIC or version != VERSION:
+        return Flag.FAIL
+
+    index = json.loads(raw[HEADER.size : HEADER.size + index_len].decode("utf-8"))
+    data = array.array("d")
+    data.frombytes(raw[get_data_offset(index_len) :])
+    if sys.byteorder != "little":
+        data.byteswap()
+    return index, data
+
+
+def unpack_paths(data, spans, first=0):
+    """
+    Returns the list of paths, in the same form as the pickled path files, of
+    the glyph at spans (from the index) in data, an array of samples that
+    starts with sample number first of the data block.
+    """
+    paths = []
+    for start, count in spans:
+        path = []
+        stop = (start - first + count) * SAMPLE_LEN
+        for i in range((start - first) * SAMPLE_LEN, stop, SAMPLE_LEN):
+            path.append({"pos": (data[i], data[i + 1]), "time": data[i + 2]})
+        paths.append(path)
+    return paths
+
+
+def read_index(fname):
+    """
+    Returns the tuple (index, data_offset) read from bundle fname without
+    reading the samples, where data_offset is the byte offset of the data
+    block, or Flag.FAIL if the bundle could not be read.
+    """
+    try:
+        with open(fname, "rb") as f:
+            magic, version, index_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                return Flag.FAIL
+            index = json.loads(f.read(index_len).decode("utf-8"))
+    except (IOError, struct.error):
+        return Flag.FAIL
+    return index, get_data_offset(index_len)
+
+
+def read_samples(fname, data_offset, spans):
+    """
+    Returns an array of the float64 samples of the glyph at spans (from the
+    index of bundle fname, whose data block starts at data_offset) read with a
+    single seek, or Flag.FAIL if they could not be read.
+    The array starts with sample number spans[0][0] of the data block.
+    """
+    data = array.array("d")
+    if not spans:
+        return data
+    first = spans[0][0]
+    count = sum(count for _, count in spans)
+    try:
+        with open(fname, "rb") as f:
+            f.seek(data_offset + first * SAMPLE_LEN * data.itemsize)
+            data.frombytes(f.read(count * SAMPLE_LEN * data.itemsize))
+    except (IOError, ValueError):
+        return Flag.FAIL
+    if len(data) != count * SAMPLE_LEN:
+        return Flag.FAIL
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+
+def convert_to_bundle(hw_font, path):
+    """
+    Converts the pickled path files of hw_font in folder path into a bundle
+    saved in the same folder.
+    Return True if successful else False.
+    """
+    hw_dict = load_pth_files(hw_font, path)
+    if hw_dict is Flag.FAIL or not hw_dict:
+        print(hw_font + " not found!")
+        return False
+    return save_bundle(hw_dict, get_bundle_fname(hw_font, path))
+
+
+def update_bundle(hw_font, path, char_key, paths):
+    """
+    Puts the glyph char_key, with paths as saved in its pickled path file,
+    into the existing bundle of hw_font in folder path, so the bundle stays
+    in step with the path files without converting them all again.
+    The samples of the other glyphs are copied across as they are.
+    Does nothing if hw_font has no bundle (it is then loaded from its path
+    files).
+    Return True if the bundle was updated else False.
+    """
+    fname = get_bundle_fname(hw_font, path)
+    result = read_bundle(fname)
+    if result is Flag.FAIL:
+        return False
+
+    index, old_data = result
+    data = array.array("d")
+    glyphs = {}
+    for key, spans in index["glyphs"].items():
+        if key == char_key or not spans:
+            glyphs[key] = []
+            continue
+        # the paths of a glyph are stored one after the other
+        first = spans[0][0]
+        count = sum(count for _, count in spans)
+        shift = len(data) // SAMPLE_LEN - first
+        data.extend(old_data[first * SAMPLE_LEN : (first + count) * SAMPLE_LEN])
+        glyphs[key] = [[start + shift, count] for start, count in spans]
+
+    spans = []
+    for path in paths:
+        spans.append([len(data) // SAMPLE_LEN, len(path)])
+        for sample in path:
+            data.extend((sample["pos"][0], sample["pos"][1], sample["time"]))
+    glyphs[char_key] = spans
+
+    index["glyphs"] = glyphs
+    if "metrics" in index:
+        index["metrics"][char_key] = glyph_metrics.get_glyph_metrics(paths)
+    return write_bundle(index, data, fname)
+
+
+def get_index_metrics(index):
+    """
+    Returns the dict of GlyphMetrics in the index of a bundle, or Flag.FAIL if
+    there are none.
+    """
+    if "metrics" not in index:
+        return Flag.FAIL
+    return {
+        key: glyph_metrics.GlyphMetrics(*vals) for key, vals in index["metrics"].items()
+    }
+
+
+def get_hw_font_names(path):
+    """
+    Returns the names of the hw fonts in folder path, whether stored as
+    pickled path files or bundles.
+    """
+    hw_font_names = set()  # to prevent duplications
+    for filename in os.listdir(path):
+        if filename.endswith(BUNDLE_EXT):
+            hw_font_names.add(filename[: -len(BUNDLE_EXT)])
+        else:
+            hw_font_names.add(filename.split(s.PROPS_GEN["fname_separator"])[0])
+    return list(hw_font_names)
+
+
+def main():
+    # convert all the fonts and symbols shipped with the package
+    package_path = os.path.dirname(__file__)
+    font_path = os.path.join(package_path, s.PROPS_GEN["hw_font_folder"])
+    for hw_font in get_hw_font_names(font_path):
+        print(hw_font, convert_to_bundle(hw_font, font_path))
+
+    symbol_path = os.path.join(package_path, s.PROPS_GEN["hw_symbol_folder"])
+    hw_font = s.PROPS_GEN["hw_symbol_fname"]
+    print(hw_font, convert_to_bundle(hw_font, symbol_path))
+
+
+if __name__ == "__main__":
+    main()
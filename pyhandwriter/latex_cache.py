@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 08:47:26 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Cache of rendered latex equations.
+
+Rendering an equation with latex_to_surf runs matplotlib and latex, which takes
+hundreds of ms, so each rendered equation is kept
+    - on disk, as the cropped png, in PROPS_GEN["latex_cache_dir"] (None for
+      no disk cache), so it survives the process,
+    - in memory, as the pygame surface made from it, bounded by
+      PROPS_GEN["latex_surf_cache_bytes"].
+
+The equations of a text can be rendered ahead of time by prerender, in a
+pool of background processes, so that get_latex_surf only has to wait for
+any not yet finished when they are written.
+
+A png is named by the hash of everything that decides how it looks: the tex,
+pt_size, text_col, bg_col and LATEX_RENDERER_VERSION (see latex_to_img.py),
+so a cached png is never stale, and cached pngs can be used even when
+matplotlib cannot be imported.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import BrokenExecutor
+
+import pygame as pg
+
+from . import config
+from . import settings as s
+from .glyph_cache import LRUCache, freeze, get_surf_bytes
+from .latex_to_img import LATEX_RENDERER_VERSION, latex_to_surf
+
+# pygame surfaces keyed by the name of their png
+latex_surfs = LRUCache(s.PROPS_GEN["latex_surf_cache_bytes"], get_surf_bytes)
+
+# futures of the pngs being rendered by prerender, keyed by png name
+pending = {}
+_pool = None
+
+
+def get_png_name(tex, pt_size, text_col, bg_col):
+    """
+    Returns the file name of the png of tex rendered with these arguments
+    """
+    key = (LATEX_RENDERER_VERSION, tex, pt_size, freeze(text_col), freeze(bg_col))
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest() + ".png"
+
+
+def get_latex_surf(tex, pt_size, text_col, bg_col):
+    """
+    Returns a pygame surface with tex rendered on it by latex_to_surf, from the
+    cache if it has been rendered before.
+    Raises an Exception if tex could not be rendered.
+    The surface may be shared, so do not draw on it.
+    """
+    png_name = get_png_name(tex, pt_size, text_col, bg_col)
+    surf = latex_surfs.get(png_name)
+    if surf is not None:
+        return surf
+
+    future = pending.pop(png_name, None)
+    if future is not None:
+        try:
+            png = future.result()  # only waits if not rendered yet
+        except BrokenExecutor:
+            # e.g. the processes could not be started, so render it here
+            _shutdown_pool()
+            png = None
+        except ImportError:
+            # render it here, so the failed import is noted in this process
+            png = None
+    else:
+        png = _read_png(png_name)
+
+    if png is None:
+        surf, png = _render(tex, pt_size, text_col, bg_col, png_name)
+        _write_png(png_name, png)
+    else:
+        surf = pg.image.load(io.BytesIO(png), png_name)
+
+    latex_surfs.put(png_name, surf)
+    return surf
+
+
+def prerender(equations):
+    """
+    Starts rendering each (tex, pt_size, text_col, bg_col) in equations that
+    is not already cached, in a pool of PROPS_GEN["latex_workers"] background
+    processes, for get_latex_surf to pick up later.
+    Does nothing unless PROPS_GEN["latex_prerender"].
+    """
+    if not s.PROPS_GEN["latex_prerender"] or "matplotlib" in config.failed_imports:
+        return
+    cache_dir = s.PROPS_GEN["latex_cache_dir"]
+    for tex, pt_size, text_col, bg_col in equations:
+        png_name = get_png_name(tex, pt_size, text_col, bg_col)
+        if png_name in pending or png_name in latex_surfs:
+            continue
+        if cache_dir is not None and os.path.exists(os.path.join(cache_dir, png_name)):
+            continue
+        pending[png_name] = _get_pool().submit(
+            _render_png, tex, pt_size, text_col, bg_col, png_name
+        )
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # only imported if needed, to keep down the time to import the package
+        from concurrent.futures import ProcessPoolExecutor
+
+        _pool = ProcessPoolExecutor(s.PROPS_GEN["latex_workers"])
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    pending.clear()
+
+
+def _render(tex, pt_size, text_col, bg_col, png_name):
+    """
+    Returns the tuple (surf, png) of tex rendered by latex_to_surf, where png
+    is the bytes of surf saved as png_name.
+    Raises an Exception if tex could not be rendered.
+    """
+    surf = latex_to_surf(tex, pt_size=pt_size, text_col=text_col, bg_col=bg_col)
+    if surf is None:
+        raise Exception(f"Latex {tex} could not be rendered at pt_size {pt_size}")
+    buf = io.BytesIO()
+    pg.image.save(surf, buf, png_name)
+    return surf, buf.getvalue()
+
+
+def _render_png(tex, pt_size, text_col, bg_col, png_name):
+    """
+    Run in a background process by prerender. Returns the bytes of the png of
+    tex rendered, having saved it in the disk cache.
+    """
+    _, png = _render(tex, pt_size, text_col, bg_col, png_name)
+    _write_png(png_name, png)
+    return png
+
+
+def _read_png(png_name):
+    """
+    Returns the bytes of png_name in the disk cache, or None if not cached
+    """
+    cache_dir = s.PROPS_GEN["latex_cache_dir"]
+    if cache_dir is None:
+        return None
+    try:
+        with open(os.path.join(cache_dir, png_name), "rb") as f:
+            return f.read()
+    except IOError:
+        return None
+
+
+def _write_png(png_name, png):
+    """
+    Saves png (bytes) as png_name in the disk cache, if possible.
+    The png is written to a temporary file first, so other processes never
+    read it half written.
+    """
+    cache_dir = s.PROPS_GEN["latex_cache_dir"]
+    if cache_dir is None:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_fname = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        os.replace(temp_fname, os.path.join(cache_dir, png_name))
+    except IOError:
+        # an unwritable cache just means rendering again next time
+        pass
+
+
+def clear_latex_cache(disk=False):
+    """
+    Drops the cached surfaces and any being rendered, and also the cached
+    pngs if disk is true.
+    """
+    latex_surfs.invalidate()
+    for future in pending.values():
+        future.cancel()
+    pending.clear()
+    cache_dir = s.PROPS_GEN["latex_cache_dir"]
+    if not disk or cache_dir is None or not os.path.isdir(cache_dir):
+        return
+    for fname in os.listdir(cache_dir):
+        if fname.endswith(".png"):
+            try:
+                os.remove(os.path.join(cache_dir, fname))
+            except IOError:
+                pass
@@ -10,147 +10,224 @@ Created on Sat Oct 24 12:32:19 2020
 Note: matplotlib and PIL are not in standard library
 
 If these cannot be imported, we want the package still to operate but latex
-equations won't be rendered.
+equations won't be rendered. latex_to_surf, which renders the equations, only
+needs matplotlib. PIL is only needed by the older latex_to_img.
+
+Both are slow to import, so they are only imported when first needed, not
+when this module is. Whether matplotlib can be imported is still checked
+(cheaply, without importing it) here, so that config.failed_imports lists it
+from the start. PIL is only noted there if latex_to_img fails to import it.
 
 To gracefully handle the failed imports:
 
-log the failed imports using a config scrip to share info between modules and
-then define a dummy latex_to_img function which will raise an exception when
-called which  will be caught by try/except block in handwriter_gen.
+log the failed imports using a config scrip to share info between modules.
+Rendering then raises an ImportError which will be caught by try/except block
+in layout.py.
 
 """
 
 
+import importlib.util
+import io
+import math
 import warnings
-from . import config
 
-import_failed = False
-
-try:
-    import matplotlib.pyplot as plt
-
-    # import non_existant_module # for testing only
-except ImportError:
-    import_failed = True
-    config.failed_imports.append("matplotlib")
-    warnings.warn("matplotlib could not be imported - latex equations will not work")
-
-try:
-    from PIL import Image, ImageChops
-
-    # import non_existant_module # for testing only
-except ImportError:
-    import_failed = True
-    config.failed_imports.append("PIL")
-    warnings.warn("PIL could not be imported - latex equations will not work")
-
-if import_failed:
-    # at least one fatal ImportError
-    def latex_to_img():
-        """dummmy function definition designed to cause error which will
-        be trapped gracefully later"""
-        pass
-
-
-else:
-    # imports all fine
-    import io
-    from .colours import col
-
-    MIN_PT_SIZE = 2
-    MAX_PT_SIZE = 1000
-    BUFFER = 50
-    MARGIN = 5
-
-    def convert_col(col):
-        """
-        Converts colour tuple, col,  with component channels in range 0-255
-        to a colour tuple with component channels in range 0-1 as needed by
-        matplotlib
-        """
-        return [x / 255 for x in col]
-
-    def latex_to_img(tex, pt_size=60, text_col=col("WHITE"), bg_col=col("BLUE")):
-        """
-        Returns an image file containing rendered tex.
-        Params are self-obvious.
-
-        The tex is first rendererd on a matplotlib plot at pt_size, the text
-        bounding box is measured and then the pt_size is adjusted for a second
-        pass to try and fill the width of the plot with the equation for optimal
-        resolution (I couldn't think of a way to do this a-priori).
-
-        The figure is then 'saved' as png using io.BytesIO().
-        The png is then loaded with PIL and cropped to the bounding box of the text.
-        """
-
-        if not (MIN_PT_SIZE <= pt_size <= MAX_PT_SIZE):
-            print("pt size error!")
-            return None
-        buf = io.BytesIO()  # for temp save of plt fig
-        fig = plt.figure()
-        ax = plt.gca()
-        renderer = fig.canvas.get_renderer()
-        axes_bb = ax.get_window_extent(renderer=renderer)  # axes bounding box
-        axes_width = axes_bb.width
-
-        plt.rcParams["text.color"] = convert_col(text_col)
-        plt.rcParams["axes.facecolor"] = convert_col(bg_col)
-        plt.rcParams["savefig.facecolor"] = convert_col(bg_col)
-        plt.rc("text", usetex=True)
-        plt.rc("font", family="serif")
-        plt.axis("off")
-
-        text = plt.text(0.0, 0.5, f"${tex}$", size=pt_size)
-        text_bb = text.get_window_extent(renderer=renderer)
-        text_width = text_bb.width
-
-        # scale pt_size to try and get equation to fill width of plot
-        pt_size *= max(1, int(0.2 * axes_width / text_width))
-        plt.close(fig)
-
-        # and repeat with new pt_size
-
-        if not (MIN_PT_SIZE <= pt_size <= MAX_PT_SIZE):
-            print("pt size error!")
-            return None
-        buf = io.BytesIO()  # for temp save of plt fig
-        fig = plt.figure()
-        ax = plt.gca()
-        renderer = fig.canvas.get_renderer()
-        axes_bb = ax.get_window_extent(renderer=renderer)
-        axes_width = axes_bb.width
-
-        plt.rcParams["text.color"] = convert_col(text_col)
-        plt.rcParams["axes.facecolor"] = convert_col(bg_col)
-        plt.rcParams["savefig.facecolor"] = convert_col(bg_col)
-        plt.rc("text", usetex=True)
-        plt.rc("font", family="serif")
-        plt.axis("off")
-
-        text = plt.text(0.0, 0.5, f"${tex}$", size=pt_size)
-        plt.ioff()
-        plt.savefig(buf, format="png")
-        plt.close(fig)
-
-        # Crop the image to the size of the rendered tex-----------
-
-        # subtract bg col, so regions outside of text will be zeroed
-        im = Image.open(buf)
-        # im.show() # should be commented out
-        bg = Image.new(im.mode, im.size, bg_col)
-        diff = ImageChops.difference(im.convert("RGB"), bg.convert("RGB"))
-        diff = ImageChops.add(diff, diff, 2.0, -100)  # not needed???
-
-        # diff.show() # should be commented out
-        # get bounding box of non-zero regions in image
-        bbox = diff.getbbox()
-
-        # add a small margin
-        bbox = (bbox[0] - MARGIN, bbox[1] - MARGIN, bbox[2] + MARGIN, bbox[3] + MARGIN)
-
-        # return cropped image
-        return im.crop(bbox)
+import pygame as pg
+
+from . import config
+from . import settings as s
+from .colours import col
+
+# bump whenever a change here changes the images made, so that images cached
+# by latex_cache.py from earlier versions are not used
+LATEX_RENDERER_VERSION = 2
+
+# imported by import_matplotlib and import_pil
+plt = Figure = FigureCanvasAgg = None
+Image = ImageChops = None
+
+
+def import_matplotlib(pyplot=False):
+    """
+    Imports the parts of matplotlib needed to render latex (and pyplot too if
+    pyplot), unless already imported.
+    Raises an ImportError if they cannot be imported.
+    """
+    global plt, Figure, FigureCanvasAgg
+    try:
+        if Figure is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+        if pyplot and plt is None:
+            import matplotlib.pyplot as plt
+    except ImportError:
+        _import_failed("matplotlib")
+        raise
+
+
+def import_pil():
+    """
+    Imports the parts of PIL needed by latex_to_img, unless already imported.
+    Raises an ImportError if they cannot be imported.
+    """
+    global Image, ImageChops
+    try:
+        if Image is None:
+            from PIL import Image, ImageChops
+    except ImportError:
+        _import_failed("PIL", "latex_to_img")
+        raise
+
+
+def _import_failed(module_name, needed_by="latex equations"):
+    if module_name not in config.failed_imports:
+        config.failed_imports.append(module_name)
+        warnings.warn(
+            f"{module_name} could not be imported - {needed_by} will not work"
+        )
+
+
+# found without importing it; if found it may still fail to import later
+if importlib.util.find_spec("matplotlib") is None:
+    _import_failed("matplotlib")
+
+
+MIN_PT_SIZE = 2
+MAX_PT_SIZE = 1000
+BUFFER = 50
+MARGIN = 5
+
+
+def convert_col(col):
+    """
+    Converts colour tuple, col,  with component channels in range 0-255
+    to a colour tuple with component channels in range 0-1 as needed by
+    matplotlib
+    """
+    return [x / 255 for x in col]
+
+
+def latex_to_surf(tex, pt_size=60, text_col=col("WHITE"), bg_col=col("BLUE")):
+    """
+    Returns a pygame surface with tex rendered on it, cropped to the tex
+    plus MARGIN pixels all round.
+
+    Unlike latex_to_img, the tex is rendered just once. It is laid out at
+    pt_size to measure it, the figure is then sized to fit it and it is
+    drawn at PROPS_GEN["latex_oversample"] pixels per pt, straight into an
+    RGBA buffer that the surface shares rather than copies.
+    """
+    if not (MIN_PT_SIZE <= pt_size <= MAX_PT_SIZE):
+        print("pt size error!")
+        return None
+    import_matplotlib()
+    dpi = 72 * s.PROPS_GEN["latex_oversample"]  # 72 pt per inch
+    fig = Figure(dpi=dpi, facecolor=convert_col(bg_col))
+    canvas = FigureCanvasAgg(fig)
+    text = fig.text(
+        0,
+        0,
+        f"${tex}$",
+        size=pt_size,
+        color=convert_col(text_col),
+        usetex=True,
+        family="serif",
+    )
+
+    # bounding box (pixels) of the tex relative to where it is placed
+    bbox = text.get_window_extent(renderer=canvas.get_renderer())
+    width = math.ceil(bbox.width) + 2 * MARGIN
+    height = math.ceil(bbox.height) + 2 * MARGIN
+    fig.set_size_inches(width / dpi, height / dpi)
+    text.set_position(((MARGIN - bbox.x0) / width, (MARGIN - bbox.y0) / height))
+
+    canvas.draw()
+    return pg.image.frombuffer(canvas.buffer_rgba(), canvas.get_width_height(), "RGBA")
+
+
+def latex_to_img(tex, pt_size=60, text_col=col("WHITE"), bg_col=col("BLUE")):
+    """
+    Returns an image file containing rendered tex.
+    Params are self-obvious.
+
+    The tex is first rendererd on a matplotlib plot at pt_size, the text
+    bounding box is measured and then the pt_size is adjusted for a second
+    pass to try and fill the width of the plot with the equation for optimal
+    resolution (I couldn't think of a way to do this a-priori).
+
+    The figure is then 'saved' as png using io.BytesIO().
+    The png is then loaded with PIL and cropped to the bounding box of the text.
+    """
+
+    if not (MIN_PT_SIZE <= pt_size <= MAX_PT_SIZE):
+        print("pt size error!")
+        return None
+    import_matplotlib(pyplot=True)
+    import_pil()
+    buf = io.BytesIO()  # for temp save of plt fig
+    fig = plt.figure()
+    ax = plt.gca()
+    renderer = fig.canvas.get_renderer()
+    axes_bb = ax.get_window_extent(renderer=renderer)  # axes bounding box
+    axes_width = axes_bb.width
+
+    plt.rcParams["text.color"] = convert_col(text_col)
+    plt.rcParams["axes.facecolor"] = convert_col(bg_col)
+    plt.rcParams["savefig.facecolor"] = convert_col(bg_col)
+    plt.rc("text", usetex=True)
+    plt.rc("font", family="serif")
+    plt.axis("off")
+
+    text = plt.text(0.0, 0.5, f"${tex}$", size=pt_size)
+    text_bb = text.get_window_extent(renderer=renderer)
+    text_width = text_bb.width
+
+    # scale pt_size to try and get equation to fill width of plot
+    pt_size *= max(1, int(0.2 * axes_width / text_width))
+    plt.close(fig)
+
+    # and repeat with new pt_size
+
+    if not (MIN_PT_SIZE <= pt_size <= MAX_PT_SIZE):
+        print("pt size error!")
+        return None
+    buf = io.BytesIO()  # for temp save of plt fig
+    fig = plt.figure()
+    ax = plt.gca()
+    renderer = fig.canvas.get_renderer()
+    axes_bb = ax.get_window_extent(renderer=renderer)
+    axes_width = axes_bb.width
+
+    plt.rcParams["text.color"] = convert_col(text_col)
+    plt.rcParams["axes.facecolor"] = convert_col(bg_col)
+    plt.rcParams["savefig.facecolor"] = convert_col(bg_col)
+    plt.rc("text", usetex=True)
+    plt.rc("font", family="serif")
+    plt.axis("off")
+
+    text = plt.text(0.0, 0.5, f"${tex}$", size=pt_size)
+    plt.ioff()
+    plt.savefig(buf, format="png")
+    plt.close(fig)
+
+    # Crop the image to the size of the rendered tex-----------
+
+    # subtract bg col, so regions outside of text will be zeroed
+    im = Image.open(buf)
+    # im.show() # should be commented out
+    bg = Image.new(im.mode, im.size, bg_col)
+    diff = ImageChops.difference(im.convert("RGB"), bg.convert("RGB"))
+    diff = ImageChops.add(diff, diff, 2.0, -100)  # not needed???
+
+    # diff.show() # should be commented out
+    # get bounding box of non-zero regions in image
+    bbox = diff.getbbox()
+
+    # add a small margin
+    bbox = (bbox[0] - MARGIN, bbox[1] - MARGIN, bbox[2] + MARGIN, bbox[3] + MARGIN)
+
+    # return cropped image
+    return im.crop(bbox)
 
 
 def main():
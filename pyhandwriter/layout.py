@@ -0,0 +1,1039 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:52:36 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Layout of parsed text, separated from drawing it.
+
+TextLayout decides where every char of the text goes (line breaking, spaces,
+tabs, hyphenation, underlining, latex equations) without drawing anything.
+Its records are a flat list of placed records, which HandWriterGen then draws
+(or animates) one after the other, or measure_layout measures.
+
+Glyph positions only depend on the smoothed advances of the glyphs (see
+HandWriterGen.get_glyph_advance), which are also what lines are broken by, so
+they are known before anything is drawn.
+Latex equations have to be rendered to be placed, but are rendered in the
+background as soon as the text is prepared (see TextLayout.prerender_latex),
+so the whole text is laid out once, when its records are first needed.
+"""
+
+import math
+import re
+import warnings
+from collections import namedtuple
+
+import pygame as pg
+
+from . import colours
+from . import config
+from . import settings as s
+from .latex_cache import get_latex_surf, prerender
+from .rescale_surf import rescale_surf
+
+# A glyph written with its origin at pos + (0, vert_offset). x_max is the
+# rightmost point of its ink (or 0 if it has none), where the next char
+# starts from.
+GlyphRecord = namedtuple(
+    "GlyphRecord",
+    [
+        "char_key",
+        "pos",
+        "vert_offset",
+        "scale",
+        "colour",
+        "linewidth",
+        "nib",
+        "spray",
+        "speed_mult",
+        "style_set",
+        "x_max",
+    ],
+)
+
+# The style chars are written in. The default is set up by
+# HandWriterGen._init_text, then each distinct set of formatting styles (see
+# style_tokens.py) is resolved to a Style once, see TextLayout._get_style.
+Style = namedtuple(
+    "Style",
+    ["colour", "linewidth", "nib", "spray", "scale", "speed_mult", "vert_offset"],
+)
+
+# A rendered latex equation to blit to rect, placed with the pen at pos.
+# surf is None if the size of the equation was only estimated.
+LatexRecord = namedtuple("LatexRecord", ["surf", "rect", "pos"])
+
+# A straight line drawn in one go, kind is "underline" or "hyphen"
+LineRecord = namedtuple("LineRecord", ["kind", "start", "end", "colour", "linewidth"])
+
+# A pause (\p) of delay_ms
+PauseRecord = namedtuple("PauseRecord", ["delay_ms"])
+
+# A wait (\w) for the user to press a key
+WaitRecord = namedtuple("WaitRecord", [])
+
+# The size of laid out text, see measure_layout. rect bounds everything,
+# line_rects each line of text, both in surf coords.
+TextMeasurement = namedtuple("TextMeasurement", ["rect", "line_rects", "overflow"])
+
+# The result of HandWriterGen.fit_text: the chosen pt_size and line_spacing
+# (None for the default) and the TextMeasurement of the text with them
+TextFit = namedtuple("TextFit", ["pt_size", "line_spacing", "measurement"])
+
+
+# (index, rgb) of each lower case colour name in colours.col_dict, so the
+# colour of a style set is found without scanning all the colours
+COLOUR_ORDER = {}
+for i, (col, rgb) in enumerate(colours.col_dict.items()):
+    COLOUR_ORDER.setdefault(col.lower(), (i, rgb))
+
+# an escape char and the char it escapes
+ESCAPE_RE = re.compile(r"\\.", re.DOTALL)
+
+
+class Container:
+    """
+    For grouping attributes. I think sometimes neater than dictionaries
+    """
+
+
+def get_char_key(char):
+    """
+    Return the dict key for a regular char to be used in the hw_dic.
+    This is the str of the unicode of char.
+    Note: that char_key for a symbols is the symbol name and are generated
+    elsewhere.
+    """
+    try:
+        return str(ord(char))
+    except:
+        # something went wrong!
+        return str(ord("?"))
+
+
+def get_tab_stop(x, tab_spacing):
+    """
+    Returns next tab stop when cursor is at horiz pos x
+    """
+    return (x // tab_spacing) * tab_spacing + tab_spacing * (x % tab_spacing > 0)
+
+
+class TextLayout:
+    """
+    Places the parsed text of a HandWriterGen.
+    hw supplies the glyphs, props and default_style (a Style) are as set up
+    by HandWriterGen._init_text.
+    The text is laid out once, see records; iterating over the layout
+    iterates over its records.
+    If estimate_latex is true, latex equations are not rendered, their
+    sizes are just estimated from their length.
+    """
+
+    def __init__(self, hw, props, default_style, estimate_latex=False):
+        self.hw = hw
+        self.props = props
+        self.default_style = default_style
+        self.estimate_latex = estimate_latex
+        self._styles = {}  # Style for each style set met so far
+        self._word_widths = None  # see _get_word_length_pixels
+        self._escaped = None  # indices of the chars following an escape char
+        self._records = None  # see records
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def records(self):
+        """
+        Returns the list of the placed records of the text in the order they
+        are to be drawn, laying the text out the first time only.
+        """
+        if self._records is None:
+            self._records = list(self._layout_gen())
+        return self._records
+
+    def _init_state(self):
+        self.state = Container()
+        # move down and to right of top left of bounding rect to start first
+        # char
+        self.state.current_pos = (
+            self.props.origin_pos[0] + s.PROPS_GEN["text_box_margin"],
+            self.props.origin_pos[1] + self.props.line_spacing,
+        )
+
+        self.state.skip_next_char = False
+        self.state.latex_inline_count = 0
+        self.state.latex_newline_count = 0
+        self.state.symbol_count = 0
+        self.state.underline_start_pos = None
+        self.state.underline_end_pos = None
+        self.state.x_max = None
+        self.state.i = None
+        self.state.style_set = None
+        self.state.char = None
+        # the indices of the spaces to break lines at and the index the
+        # paragraph they were planned for ends at, see _plan_line_breaks
+        self.state.line_breaks = None
+        self.state.paragraph_end = -1
+
+    def _layout_gen(self):
+        """
+        Generator yielding the placed records of the text in the order they
+        are to be drawn.
+        """
+        self._init_state()
+
+        # loop through text....................................................
+        for self.state.i, (self.state.style_set, self.state.char) in enumerate(
+            self.props.parsed_text
+        ):
+
+            # escape chars need to be skipped
+            if self.state.skip_next_char:
+                self.state.skip_next_char = False
+                continue
+
+            # handwriting style-----------------------------------------------
+            self._process_style()
+
+            # linebreaking----------------------------------------------------
+            # previously after processing of escape chars
+            if not self.props.hyphenation:
+                self._process_linebreaking()
+
+            self.state.underline_end_pos = None
+
+            # spaces-----------------------------------------------------------
+            # previously after processing of escape chars
+            if self.state.char == " ":
+                self._add_space()
+                continue
+
+            # escape chars----------------------------------------------------
+            if self.state.char == "\\":
+
+                try:
+                    next_char = self.props.parsed_text.char(self.state.i + 1)
+                except IndexError:
+                    break
+
+                self.state.skip_next_char = True
+
+                char_key = yield from self._process_escape_char(next_char)
+
+                if char_key is None:
+                    continue
+
+            else:
+                # not an escape char
+                char_key = get_char_key(self.state.char)
+
+            # char_key is either unicode for a "regular" char
+            # or the symbol name
+
+            # handwrite char---------------------------------------------------
+            yield self._place_char(char_key)
+
+            # move to next position--------------------------------------------
+            self._move_to_next_pos()
+
+            # hyphenation------------------------------------------------------
+            if self.props.hyphenation:
+                yield from self._process_hyphenation()
+
+            # underlining-----------------------------------------------------
+            if "underline" in self.state.style_set:
+                yield self._process_underlining()
+
+    def _get_word_length_pixels(self, j):
+        """
+        Return length in pixels of word in parsed text starting at
+        index j
+        """
+        if self._word_widths is None:
+            self._word_widths = self._get_word_widths()
+        return self._word_widths[j]
+
+    def _get_word_widths(self):
+        """
+        Returns the list of the lengths in pixels of the word in parsed text
+        starting at each index (0 for a space), found in one backward sweep
+        of the text. Padded with zeros past the end.
+        """
+        text = self.props.parsed_text.text
+        norm_scale = self.default_style.scale
+        self._escaped = {match.end() - 1 for match in ESCAPE_RE.finditer(text)}
+        advances = {}  # for each char met
+        widths = [0] * (len(text) + 2)
+
+        for j in range(len(text) - 1, -1, -1):
+            char = text[j]
+            if j in self._escaped:
+                # measured with its escape char
+                continue
+            if char == " ":
+                continue
+            if char == "\\":
+                # escape chars take no room
+                widths[j] = widths[j + 2]
+                continue
+            # a written char advances the next char to its rightmost ink
+            # plus the char spacing, as _place_char and _move_to_next_pos
+            # place it
+            advance = advances.get(char)
+            if advance is None:
+                glyph_advance = self.hw.get_glyph_advance(
+                    get_char_key(char), self.props.bs
+                )
+                advance = advances[char] = (
+                    glyph_advance or 0
+                ) * norm_scale + self.props.char_spacing
+            widths[j] = advance + widths[j + 1]
+
+        return widths
+
+    def _process_style(self):
+        """
+        Apply formatting style
+        """
+        # print(f"{self.state.style_set=}") # debug
+        self.style = self._get_style(self.state.style_set)
+
+        if "underline" in self.state.style_set:
+            # save current pos to know where underline should start
+            self.state.underline_start_pos = (
+                self.state.current_pos[0],
+                self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
+            )
+
+    def _get_style(self, style_set):
+        """
+        Returns the Style for the frozenset of formatting styles style_set,
+        resolving it only the first time it is met.
+        """
+        style = self._styles.get(style_set)
+        if style is None:
+            style = self._styles[style_set] = self._resolve_style(style_set)
+        return style
+
+    def _resolve_style(self, style_set):
+        """
+        Returns the default style with the formatting styles in style_set
+        applied.
+        """
+        style = self.default_style
+        scale = style.scale
+        linewidth = style.linewidth
+        vert_offset = style.vert_offset
+        colour = style.colour
+        speed_mult = style.speed_mult
+
+        if "bigger" in style_set:
+            scale *= s.PROPS_GEN["scale_multipler"]
+
+        if "smaller" in style_set:
+            scale /= s.PROPS_GEN["scale_multipler"]
+
+        if "bold" in style_set:
+            linewidth *= s.PROPS_GEN["bold_linewidth_sf"]
+
+        if "super" in style_set:
+            vert_offset += self.props.super_offset
+            scale *= s.PROPS_GEN["super_size_sf"]
+
+        if "sub" in style_set:
+            vert_offset += self.props.sub_offset
+            scale *= s.PROPS_GEN["sub_size_sf"]
+
+        if "up" in style_set:
+            vert_offset += self.props.up_offset
+
+        if "down" in style_set:
+            vert_offset += self.props.down_offset
+
+        colour_matches = [
+            COLOUR_ORDER[name] for name in style_set if name in COLOUR_ORDER
+        ]
+        if colour_matches:
+            # if mult colours set, the first in colours.col_dict is selected
+            colour = min(colour_matches)[1]
+
+        if "doublespeed" in style_set:
+            speed_mult *= 2
+
+        if "halfspeed" in style_set:
+            speed_mult *= 0.5
+
+        return style._replace(
+            colour=colour,
+            linewidth=linewidth,
+            scale=scale,
+            speed_mult=speed_mult,
+            vert_offset=vert_offset,
+        )
+
+    def _process_formatting_esc_char(self, char):
+        """
+        Processes formatting-type Esc chars, returns None if ready to move
+        to next char or the new processed char to write.
+        """
+
+        if char == "n":
+            # newline
+            self._newline()
+
+        elif char == "t":
+            # tab
+            tab_pos = self.props.origin_pos[0] + get_tab_stop(
+                self.state.current_pos[0] - self.props.origin_pos[0],
+                self.props.tab_spacing,
+            )
+
+            if tab_pos >= (self.props.text_box_width - s.PROPS_GEN["text_box_margin"]):
+                self._newline()
+
+            else:
+                self.state.current_pos = tab_pos, self.state.current_pos[1]
+
+        return None
+
+    def _process_symbol_esc_char(self, char):
+        """
+        Processes symbol-type Esc chars, returns None if ready to move
+        to next char or the char_key to write.
+        """
+
+        if char == s.SYMBOL_ESC_CHAR:
+            char_key = self.props.symbol_list[self.state.symbol_count]
+            self.state.symbol_count += 1
+            # print(char_key) # debug
+            return char_key
+
+        return None
+
+    def _init_latex_process(self, char):
+        """
+        Returns the latex and a vertical height adjustment dependent on char
+
+        """
+        if char == "$":
+            # This is inline latex equation
+            latex = self.props.latex_inline_list[self.state.latex_inline_count]
+            self.state.latex_inline_count += 1
+            height_tweak = s.PROPS_GEN["latex_inline_height_scaling"]
+
+        elif char == "£":
+            # This is newline latex equation (like $$xx$$)
+            latex = self.props.latex_newline_list[self.state.latex_newline_count]
+            self.state.latex_newline_count += 1
+            height_tweak = s.PROPS_GEN["latex_newline_height_scaling"]
+
+        return latex, height_tweak
+
+    def prerender_latex(self):
+        """
+        Starts rendering the latex equations of the text in the background
+        (see latex_cache.prerender), with the same arguments _get_latex_surf
+        will render them with, so they are ready by the time they are written.
+        """
+        parsed_text = self.props.parsed_text
+        equations = []
+        for char, latex_list in (
+            ("$", self.props.latex_inline_list),
+            ("£", self.props.latex_newline_list),
+        ):
+            if not latex_list:
+                continue
+            # each equation has been replaced by \$ or \£ in the text
+            placeholder = re.compile(re.escape("\\" + char))
+            indices = [
+                match.end() - 1 for match in placeholder.finditer(parsed_text.text)
+            ]
+            for i, latex in zip(indices, latex_list):
+                colour = self._get_style(parsed_text.style_set(i)).colour
+                equations.append(
+                    (latex, self.props.pt_size, colour, self.props.text_rect_bg_col)
+                )
+        prerender(equations)
+
+    def _get_latex_surf(self, latex, height_tweak):
+        """
+        Returns a pygame surface with latext rendered on it
+        """
+        try:
+            # cached, as rendering is slow
+            latex_surf = get_latex_surf(
+                latex,
+                pt_size=self.props.pt_size,
+                text_col=self.style.colour,
+                bg_col=self.props.text_rect_bg_col,
+            )
+        except:
+            msg = "Latex could not be rendered because :"
+            if "matplotlib" in config.failed_imports:
+                msg = "Matplotlib could not be imported."
+            else:
+                msg += "No latex installation found on your computer."
+            warnings.warn(msg)
+            return None
+
+        # scale latex_surf so height matches pt_size with tweak factor
+        latex_surf = rescale_surf(latex_surf, height=height_tweak * self.props.pt_size)
+
+        if "bigger" in self.state.style_set:
+            latex_surf = pg.transform.rotozoom(latex_surf, 0, 2)
+
+        elif "smaller" in self.state.style_set:
+            latex_surf = pg.transform.rotozoom(latex_surf, 0, 0.5)
+
+        return latex_surf
+
+    def _estimate_latex_size(self, latex, height_tweak):
+        """
+        Returns an estimate of the (w, h) of the surface _get_latex_surf
+        would return, without rendering the latex.
+        """
+        # count each latex command (e.g. \frac) as one symbol
+        num_symbols = len(re.sub(r"\\[a-zA-Z]+", "x", latex).replace(" ", ""))
+        h = height_tweak * self.props.pt_size
+        w = num_symbols * s.PROPS_GEN["latex_estimate_symbol_aspect"] * h
+
+        if "bigger" in self.state.style_set:
+            w, h = 2 * w, 2 * h
+
+        elif "smaller" in self.state.style_set:
+            w, h = 0.5 * w, 0.5 * h
+
+        return w, h
+
+    def _fit_latex(self, char, w):
+        """
+        Starts a new line if an inline equation of width w does not fit on
+        the current line. Returns the width the equation must be scaled to
+        to fit onto one line, or None if it fits.
+        """
+        if char == "$":
+            # inline eqn
+            # check if latex_surf too long for current line
+            if self.state.current_pos[0] + w >= self.props.text_box_left_edge:
+                self._newline()
+
+                # rescale to fit onto newline if necessary
+                if w > self.props.text_box_width:
+                    # scale to fit onto one line
+                    return s.PROPS_GEN["latex_full_line_scaling"] * (
+                        self.props.text_box_width
+                    )
+
+        if char == "£":
+            # centred, newline eqn
+            # rescale to fit onto newline if necessary
+            if w > self.props.text_box_width:
+                # scale to fit onto one line
+                return s.PROPS_GEN["latex_full_line_scaling"] * (
+                    self.props.text_box_width
+                )
+
+        return None
+
+    def _get_scaled_latex_surf(self, char, latex_surf):
+        """
+        Returns latex_surf scaled to correct size
+        """
+        width = self._fit_latex(char, latex_surf.get_width())
+        if width is not None:
+            latex_surf = rescale_surf(latex_surf, width=width)
+
+        return latex_surf
+
+    def _process_latex_position(self, char, w, h):
+        """
+        Ensures newline latex equations £..£ are centred on newline.
+        """
+        if char == "£":
+            # centre on new line
+            self.state.current_pos = (
+                self.props.origin_pos[0] + (self.props.text_box_width - w) // 2,
+                self.state.current_pos[1]
+                + self.props.line_spacing
+                + s.PROPS_GEN["latex_newline_vert_padding"],
+            )
+
+    def _place_latex(self, latex_rect):
+        """
+        Positions latex_rect at the current position.
+        """
+        latex_rect.bottomleft = (
+            self.state.current_pos[0]
+            + self.props.pt_size * s.PROPS_GEN["latex_horiz_spacing_multiplier"],
+            self.state.current_pos[1]
+            + self.props.pt_size * s.PROPS_GEN["latex_inline_vert_offset_multiplier"],
+        )
+
+    def _move_to_next_position(self, char, w):
+        """
+        Moves cursor to next position after the equation.
+        """
+        if char == "$":
+            self.state.current_pos = (
+                self.state.current_pos[0]
+                + w
+                + self.props.pt_size * s.PROPS_GEN["latex_horiz_spacing_multiplier"],
+                self.state.current_pos[1],
+            )
+
+        elif char == "£":
+            self._newline()
+
+    def _process_latex_esc_char(self, char):
+        """
+        Processes latex equations in the text.
+        Generator. Yields the LatexRecord of the equation, and returns
+        char_key = None to flag that no char needs to be written.
+        """
+
+        # get latex code and a vertical height adjustment
+        latex, height_tweak = self._init_latex_process(char)
+
+        if self.estimate_latex:
+            latex_surf = None
+            w, h = self._estimate_latex_size(latex, height_tweak)
+            width = self._fit_latex(char, w)
+            if width is not None:
+                w, h = width, h * width / w
+            latex_rect = pg.Rect(0, 0, round(w), round(h))
+            w, h = latex_rect.size
+
+        else:
+            # get pygame surf with latex rendererd on it
+            latex_surf = self._get_latex_surf(latex, height_tweak)
+
+            if latex_surf is None:
+                warnings.warn(f"Latex {latex} could not be rendered, so is left out.")
+                return None
+
+            # scale the surf to correct size
+            latex_surf = self._get_scaled_latex_surf(char, latex_surf)
+
+            # get new rect and dimensions
+            latex_rect = latex_surf.get_rect()
+            w, h = latex_rect.size
+
+        # adjust current_position var to enable blitting it to correct pos
+        self._process_latex_position(char, w, h)
+
+        self._place_latex(latex_rect)
+        yield LatexRecord(latex_surf, latex_rect, self.state.current_pos)
+
+        # leave current_pos in righty pos for next char
+        self._move_to_next_position(char, w)
+
+        return None
+
+    def _process_interrupt_esc_char(self, char):
+        """
+        Processes interrupt-type Esc chars.
+        Generator. Yields a PauseRecord or WaitRecord, and returns None to
+        flag that no char needs to be written.
+        """
+
+        if char == "p":
+            # pause
+            yield PauseRecord(s.PROPS_GEN["pause_delay"])
+            return None
+
+        if char == "w":
+
+            if self.props.instantly:
+                # don't pause if instantly flag is true
+                return None
+
+            # wait for keypress or quit
+            yield WaitRecord()
+
+            return None
+
+    def _process_escape_char(self, char):
+        """
+        Processes Esc chars, returns None if ready to move
+        to next char or the new processed char to write.
+        Generator. Yields the records of latex equations and interrupts.
+        """
+
+        if char in s.FORMATTING_ESC_CHARS:
+            return self._process_formatting_esc_char(char)
+
+        if char == s.SYMBOL_ESC_CHAR:
+            return self._process_symbol_esc_char(char)
+
+        if char in s.LATEX_ESC_CHARS:
+            return (yield from self._process_latex_esc_char(char))
+
+        if char in s.INTERRUPT_ESC_CHARS:
+            return (yield from self._process_interrupt_esc_char(char))
+
+        return None
+
+    def _process_linebreaking(self):
+        """semi-intelligent line breaking to ensure words
+        don't run past edge of text box
+        """
+        if self.props.line_breaking == "optimal" and self.state.char == " ":
+            if (
+                self.state.line_breaks is None
+                or self.state.i > self.state.paragraph_end
+            ):
+                self._plan_line_breaks()
+            if self.state.i in self.state.line_breaks:
+                self._newline()
+                return
+
+        if self.state.current_pos[0] == self.props.origin_pos[0]:
+            # at start of newline, so measure next word length from current
+            # index in parsed text
+            word_length_pixels = self._get_word_length_pixels(self.state.i)
+
+        elif (
+            self.state.char == " "
+            or self.state.char == "."
+            and self.state.i + 1 < len(self.props.parsed_text)
+            and self.props.parsed_text.char(self.state.i + 1) != " "
+        ):
+            # not starting a newline and current char is a space or fullstop
+            # and next char is not a space, so measure next word length from
+            # next index in parsed text
+            word_length_pixels = self._get_word_length_pixels(self.state.i + 1)
+
+        else:
+            # don't need to do any further checking
+            return
+
+        if self.state.char == " ":
+            # the space itself is added before the word
+            word_length_pixels += self.props.word_spacing
+
+        # check if next word will fit onto line, leaving the same margin on
+        # the right as _newline leaves on the left
+        if (
+            self.state.current_pos[0] + word_length_pixels
+            >= self.props.text_box_left_edge - s.PROPS_GEN["text_box_margin"]
+        ):
+            self._newline()
+            # the planned breaks (if any) no longer fit, so plan afresh
+            self.state.line_breaks = None
+
+    def _plan_line_breaks(self):
+        """
+        Plans where to break the lines of the rest of the paragraph after the
+        space at the current index, for optimal line breaking. A paragraph
+        ends at a newline (\\n) or the end of the text.
+        The words are measured as _process_linebreaking measures them, and
+        lines start where _newline and _add_space leave the pen.
+        """
+        if self._word_widths is None:
+            self._word_widths = self._get_word_widths()  # and self._escaped
+        text = self.props.parsed_text.text
+        paragraph_end = text.find("\\n", self.state.i)
+        if paragraph_end == -1:
+            paragraph_end = len(text)
+
+        word_starts = []
+        word_widths = []
+        gap_widths = []
+        gap = 0
+        j = self.state.i
+        while j < paragraph_end:
+            if text[j] == " ":
+                gap += self.props.word_spacing
+                j += 1
+                continue
+            word_end = j + 1
+            while word_end < paragraph_end and (
+                text[word_end] != " " or word_end in self._escaped
+            ):
+                word_end += 1
+            word_starts.append(j)
+            # a word running into the paragraph end was measured past it
+            word_widths.append(
+                self._get_word_length_pixels(j) - self._get_word_length_pixels(word_end)
+            )
+            gap_widths.append(gap)
+            gap = 0
+            j = word_end
+
+        line_start = self.props.origin_pos[0] + s.PROPS_GEN["text_box_margin"]
+        line_end = self.props.text_box_left_edge - s.PROPS_GEN["text_box_margin"]
+        first_line_width = self.state.current_pos[0] - line_start
+        if word_widths:
+            # the first word is on the current line, after the spaces before it
+            word_widths[0] += gap_widths[0]
+        breaks = get_optimal_breaks(
+            word_widths,
+            gap_widths,
+            first_line_width,
+            self.props.word_spacing,
+            line_end - line_start,
+        )
+        # break at the space just before each word starting a line
+        self.state.line_breaks = {word_starts[k] - 1 for k in breaks}
+        self.state.paragraph_end = paragraph_end
+
+    def _add_space(self):
+        """
+        Add space unless start of line
+        """
+        if self.state.current_pos[0] != self.props.origin_pos[0]:
+            self.state.current_pos = (
+                self.state.current_pos[0] + self.props.word_spacing,
+                self.state.current_pos[1],
+            )
+
+    def _place_char(self, char_key):
+        """
+        Returns the GlyphRecord for char_key at the current position, and
+        sets x_max to the rightmost point of its ink.
+        """
+        x_max = 0
+        glyph_advance = self.hw.get_glyph_advance(char_key, self.props.bs)
+        if glyph_advance is not None:
+            x_max = max(
+                x_max, self.state.current_pos[0] + self.style.scale * glyph_advance
+            )
+        self.state.x_max = x_max
+
+        return GlyphRecord(
+            char_key,
+            self.state.current_pos,
+            self.style.vert_offset,
+            self.style.scale,
+            self.style.colour,
+            self.style.linewidth,
+            self.style.nib,
+            self.style.spray,
+            self.style.speed_mult,
+            self.state.style_set,
+            x_max,
+        )
+
+    def _move_to_next_pos(self):
+        """
+        next char start at leftmost postion of last char plus the space
+        """
+        self.state.current_pos = (
+            self.state.x_max + self.props.char_spacing,
+            self.state.current_pos[1],
+        )
+
+    def _newline(self):
+        """
+        move to start of next line down
+        """
+        self.state.current_pos = (
+            self.props.origin_pos[0] + s.PROPS_GEN["text_box_margin"],
+            self.state.current_pos[1] + self.props.line_spacing,
+        )
+
+    def _process_hyphenation(self):
+        """
+        hyphenation is rather crude; hyphen inserted when next char
+        would run over
+        Generator. Yields the LineRecord of the hyphen if one is needed.
+        """
+        if (
+            self.state.current_pos[0]
+            > self.props.text_box_left_edge - s.PROPS_GEN["text_box_margin"]
+        ):
+
+            if (
+                self.state.i + 1 < len(self.props.parsed_text)
+                and self.props.parsed_text.char(self.state.i + 1) != " "
+            ):
+
+                # next character is not a space, hence we are splitting a word,
+                # so add a hypen
+
+                char_width, char_height = self.hw.generic_char_size
+
+                hyphen_start_pos = (
+                    self.state.current_pos[0]
+                    + 0.5 * char_width * self.default_style.scale,
+                    self.state.current_pos[1]
+                    - 0.5 * char_height * self.default_style.scale,
+                )
+
+                hyphen_length = int(
+                    (self.props.pt_size / 28) * s.PROPS_GEN["hyphen_length"]
+                )
+                hyphen_end_pos = (
+                    hyphen_start_pos[0] + hyphen_length,
+                    hyphen_start_pos[1],
+                )
+                yield LineRecord(
+                    "hyphen",
+                    hyphen_start_pos,
+                    hyphen_end_pos,
+                    self.style.colour,
+                    self.style.linewidth,
+                )
+
+            if "underline" in self.state.style_set:
+                # save position before we move to next line
+                self.state.underline_end_pos = (
+                    self.state.current_pos[0],
+                    self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
+                )
+
+            self._newline()
+
+    def _process_underlining(self):
+        """
+        Returns the LineRecord underlining the last char. This just appears
+        and is currently not animated.
+        """
+        if self.state.underline_end_pos is None:
+            self.state.underline_end_pos = (
+                self.state.current_pos[0],
+                self.state.current_pos[1] + s.PROPS_GEN["underline_offset"],
+            )
+
+        return LineRecord(
+            "underline",
+            self.state.underline_start_pos,
+            self.state.underline_end_pos,
+            self.style.colour,
+            self.style.linewidth,
+        )
+
+
+def get_optimal_breaks(word_widths, gap_widths, first_line_width, indent, width):
+    """
+    Returns the indices of the words that should start a new line, so that the
+    words fit lines of width with the least raggedness, i.e. the least sum of
+    the squares of the room left at the end of every line but the last, as in
+    Knuth and Plass line breaking.
+    gap_widths[k] is the room taken by the spaces before word k, unless it
+    starts a line. The first line already has first_line_width taken, the
+    others start at indent. A word too long for any line gets a line to
+    itself.
+    """
+    num_words = len(word_widths)
+    # costs[k] is the least cost of the lines before word k, when word k
+    # starts a line, and starts[k] the first word of the last of those lines
+    costs = [0] + [math.inf] * num_words
+    starts = [0] * (num_words + 1)
+
+    for first in range(num_words):
+        if costs[first] == math.inf:
+            continue
+        line_width = first_line_width if first == 0 else indent
+        for last in range(first, num_words):
+            if last > first:
+                line_width += gap_widths[last]
+            line_width += word_widths[last]
+            if line_width >= width and last > first:
+                break
+            room = width - line_width
+            # the last line can be as short as it likes, if it fits
+            cost = 0 if last == num_words - 1 and room > 0 else room * room
+            if costs[first] + cost < costs[last + 1]:
+                costs[last + 1] = costs[first] + cost
+                starts[last + 1] = first
+
+    breaks = []
+    k = num_words
+    while k > 0:
+        k = starts[k]
+        if k > 0:
+            breaks.append(k)
+    return breaks[::-1]
+
+
+def get_glyph_rect(record, metrics):
+    """
+    Returns the (left, top, right, bottom) of the ink of the glyph of
+    GlyphRecord record with GlyphMetrics metrics, or None if it has no ink.
+    The box is from the recorded paths, widened by the pen (line, nib or
+    spray), so is approximate.
+    """
+    if record.x_max == 0:
+        # nothing drawn
+        return None
+    pad = record.linewidth / 2
+    if record.nib is not None:
+        pad += record.nib["width"]
+    elif record.spray is not None:
+        pad += record.spray["width"]
+    x, y = record.pos[0], record.pos[1] + record.vert_offset
+    return (
+        x + record.scale * metrics.min_x - pad,
+        y + record.scale * metrics.min_y - pad,
+        record.x_max + pad,
+        y + record.scale * metrics.max_y + pad,
+    )
+
+
+def to_rect(box):
+    """
+    Returns the smallest pygame Rect holding box (left, top, right, bottom)
+    """
+    left, top = math.floor(box[0]), math.floor(box[1])
+    return pg.Rect(left, top, math.ceil(box[2]) - left, math.ceil(box[3]) - top)
+
+
+def measure_layout(layout):
+    """
+    Returns the TextMeasurement of TextLayout layout, found by laying the
+    text out but not drawing it. Each line is identified by the y of the pen.
+    overflow is True if writing the text would give Flag.OVERFLOW.
+    """
+    props = layout.props
+    line_boxes = {}  # pen y: (left, top, right, bottom)
+    overflow = False
+    line_y = None
+
+    for record in layout.records():
+        if isinstance(record, GlyphRecord):
+            line_y = record.pos[1]
+            if line_y > props.text_box_height:
+                overflow = True
+            box = get_glyph_rect(record, layout.hw.get_glyph_metrics(record.char_key))
+        elif isinstance(record, LatexRecord):
+            line_y = record.pos[1]
+            box = (
+                record.rect.left,
+                record.rect.top,
+                record.rect.right,
+                record.rect.bottom,
+            )
+        elif isinstance(record, LineRecord):
+            # underlines and hyphens belong to the line of the last char
+            pad = record.linewidth / 2
+            box = (
+                min(record.start[0], record.end[0]) - pad,
+                min(record.start[1], record.end[1]) - pad,
+                max(record.start[0], record.end[0]) + pad,
+                max(record.start[1], record.end[1]) + pad,
+            )
+        else:
+            continue
+
+        if box is None:
+            continue
+        if line_y in line_boxes:
+            old = line_boxes[line_y]
+            box = (
+                min(old[0], box[0]),
+                min(old[1], box[1]),
+                max(old[2], box[2]),
+                max(old[3], box[3]),
+            )
+        line_boxes[line_y] = box
+
+    line_rects = [to_rect(box) for box in line_boxes.values()]
+    if line_rects:
+        rect = line_rects[0].unionall(line_rects[1:])
+    else:
+        rect = pg.Rect(props.origin_pos, (0, 0))
+    return TextMeasurement(rect, line_rects, overflow)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:06:52 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+A read-only mapping whose keys are known up front but whose values are only
+loaded when first looked up.
+
+The font registry uses these for the glyphs of a hw font (and their metrics
+and sizes), so that writing a short label only loads the few glyphs it uses
+rather than the whole font, see font_registry.load_glyphs.
+"""
+
+import threading
+from collections.abc import Mapping
+
+from .enums import Flag
+
+
+class LazyMapping(Mapping):
+    """
+    Maps each of keys to load(key), called the first time key is looked up.
+    load returns Flag.FAIL if the value could not be loaded, in which case
+    key is dropped.
+    Checking for a key, iterating over the keys and len do not load anything.
+    If keys is itself a LazyMapping, the two share their keys, so a key
+    dropped from either is dropped from both.
+    """
+
+    def __init__(self, keys, load):
+        if isinstance(keys, LazyMapping):
+            self._keys = keys._keys
+        else:
+            self._keys = dict.fromkeys(keys)  # ordered, as keys
+        self._load = load
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        if key not in self._keys:
+            raise KeyError(key)
+        with self._lock:
+            if key not in self._values:
+                value = self._load(key)
+                if value is Flag.FAIL:
+                    self._keys.pop(key, None)
+                    raise KeyError(key)
+                self._values[key] = value
+            return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def num_loaded(self):
+        """
+        Returns how many values have been loaded so far
+        """
+        return len(self._values)
@@ -36,6 +36,36 @@ def line_blit(surf, p1, p2, img, mult=1):
     -------
     the rect bounding the changed pixels on the surface
 
+    """
+    blit_positions = get_blit_positions(p1, p2, img, mult)
+    if not blit_positions:
+        # print("zero length line!")
+        return
+    blitted_rects = [surf.blit(img, pos) for pos in blit_positions]
+
+    # ToDo might be a gap at p2??
+    return blitted_rects[0].unionall(blitted_rects[1:])
+
+
+def lines_blit(surf, points, img, mult=1):
+    """
+    Draws the lines joining consecutive points on surf as line_blit does,
+    with a single Surface.blits call.
+    Returns the rect bounding the changed pixels, None if none changed.
+    """
+    blit_positions = []
+    for p1, p2 in zip(points[:-1], points[1:]):
+        blit_positions += get_blit_positions(p1, p2, img, mult)
+    if not blit_positions:
+        return None
+    blitted_rects = surf.blits([(img, pos) for pos in blit_positions])
+    return blitted_rects[0].unionall(blitted_rects[1:])
+
+
+def get_blit_positions(p1, p2, img, mult=1):
+    """
+    Returns the list of the topleft positions at which line_blit blits img
+    to draw the line from p1 to p2 (empty if the line has no length).
     """
     fudge_factor = 5
     p1 = vec(p1)
@@ -46,20 +76,16 @@ def line_blit(surf, p1, p2, img, mult=1):
     line_vector = p2 - p1
     length = line_vector.length()
     if length == 0:
-        # print("zero length line!")
-        return
+        return []
     unit_vector = line_vector / length
     num_blits = 1 + int(mult * fudge_factor * length / mean_size)
     delta = length / num_blits
     current_pos = vec(p1)
-    blitted_rects = []  # list of blitted rects
+    blit_positions = []
     for _ in range(num_blits):
-        blitted_rect = surf.blit(img, current_pos - mid_pt)
-        blitted_rects.append(blitted_rect)
+        blit_positions.append(current_pos - mid_pt)
         current_pos += delta * unit_vector
-
-    # ToDo might be a gap at p2??
-    return blitted_rects[0].unionall(blitted_rects[1:])
+    return blit_positions
 
 
 def main():
@@ -9,6 +9,8 @@ import os
 import pygame as pg
 from . import text_utils as tu
 from . import file_utils as fu
+from . import font_registry
+from . import hw_font_bundle
 from . import settings as s
 from .fname_check import is_valid_fname
 from .buffer_smooth import BufferSmooth
@@ -253,6 +255,21 @@ class Recorder:
         if self.all_paths:
             self._display_msg("Saving...")
             fu.pickle_dump(self.all_paths, fname)
+            # keep any packed bundle of the font in step with its path files
+            if self.record_type == FONT:
+                fname_root = self.hw_font_fname_root
+            else:
+                fname_root = self.hw_symbol_fname_root
+            prefix = fname_root + s.PROPS_GEN["fname_separator"]
+            char_key = os.path.splitext(fname)[0][len(prefix) :]
+            hw_font_bundle.update_bundle(
+                os.path.basename(fname_root),
+                os.path.dirname(fname_root),
+                char_key,
+                self.all_paths,
+            )
+            # so the new glyph is used rather than anything cached of the old
+            font_registry.reload(os.path.basename(fname_root))
             pg.time.delay(s.PROPS_REC["pause_ms"])
 
     def _save_as(self):
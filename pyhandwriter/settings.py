@@ -52,6 +52,27 @@ PROPS_GEN = {
     "hw_font_folder": "hw_fonts",  # assumed to be in same folder as handwriter_gen.py etc
     "hw_symbol_folder": "hw_symbols",  # assumed to be in same folder as handwriter_gen.py etc
     "hw_symbol_fname": "hw_symbol",
+    "glyph_arrays": True,  # hold glyphs as numpy arrays (if numpy available)
+    "mmap_hw_fonts": True,  # memory-map glyph arrays from hw font bundles
+    "smoothed_glyph_cache_size": 1024,  # max glyphs in shared smoothing cache
+    "glyph_sprites": True,  # instantly written text is blitted from glyph sprites
+    "glyph_sprite_cache_bytes": 32 * 1024 * 1024,  # max size of sprite cache
+    "rendered_text_cache_bytes": 64 * 1024 * 1024,  # max size of render_text cache
+    # rendered latex pngs are kept here (None --> not kept), see latex_cache.py
+    "latex_cache_dir": os.path.join(
+        os.path.expanduser("~"), ".cache", "pyhandwriter", "latex"
+    ),
+    "latex_surf_cache_bytes": 16 * 1024 * 1024,  # max size of latex surf cache
+    "latex_oversample": 2,  # latex is rendered at this many pixels per pt
+    "latex_prerender": True,  # render latex in background at write_text start
+    "latex_workers": None,  # processes to prerender latex in (None --> 1 per cpu)
+    "latex_estimate_symbol_aspect": 0.5,  # width/height of a latex symbol
+    "min_fit_pt_size": 6,  # smallest pt_size tried by fit_text
+    "max_fit_pt_size": 200,  # biggest pt_size tried by fit_text
+    "min_line_spacing_sf": 1.1,  # fit_text line spacing at least this * pt_size
+    "fit_line_spacing_steps": 8,  # bisection steps when fitting line spacing
+    "max_animation_step_ms": 100,  # most animation time per wall clock step
+    "line_breaking": "greedy",  # or "optimal" (least ragged lines)
     "colour": col("WHITE"),
     "display_pt_size": 30,
     "linewidth": 1,
@@ -9,6 +9,7 @@ import os
 import pygame as pg
 from . import text_utils as tu
 from . import colours
+from . import hw_font_bundle
 from .natural_sort import natural_keys
 from .patch import Patch
 from .handwriter import HandWriter
@@ -20,10 +21,7 @@ HELP_TEXT = "LEFT/RIGHT ARROW FOR NEXT/PREVIOUS PAGE, CLICK TO SELECT, ESC OR CL
 
 def get_hw_font_names():
     font_path = os.path.join(os.path.dirname(__file__), s.PROPS_GEN["hw_font_folder"])
-    hw_font_names = set()  # to prevent duplications
-    for filename in os.listdir(font_path):
-        hw_font_names.add(filename.split(s.PROPS_GEN["fname_separator"])[0])
-    return list(hw_font_names)
+    return hw_font_bundle.get_hw_font_names(font_path)
 
 
 def show_hw_fonts(
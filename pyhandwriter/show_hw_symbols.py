@@ -9,9 +9,11 @@ import os
 import pygame as pg
 from . import text_utils as tu
 from . import colours
+from . import hw_font_bundle
 from .natural_sort import natural_keys
 from .patch import Patch
 from .handwriter import HandWriter
+from .enums import Flag
 from . import settings as s
 
 HELP_TEXT = "LEFT/RIGHT ARROW FOR NEXT/PREVIOUS PAGE, CLICK TO SELECT, ESC OR CLOSE WINDOW TO FINISH"
@@ -21,6 +23,11 @@ def get_hw_symbol_names():
     font_path = os.path.join(os.path.dirname(__file__), s.PROPS_GEN["hw_symbol_folder"])
     hw_symbol_names = set()  # to prevent duplications
     for filename in os.listdir(font_path):
+        if filename.endswith(hw_font_bundle.BUNDLE_EXT):
+            result = hw_font_bundle.read_index(os.path.join(font_path, filename))
+            if result is not Flag.FAIL:
+                hw_symbol_names.update(result[0]["glyphs"])
+            continue
         name = filename.split(s.PROPS_GEN["fname_separator"])[1].split(".")[0]
         hw_symbol_names.add(name)
     return list(hw_symbol_names)
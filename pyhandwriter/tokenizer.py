@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:02:47 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Single pass tokenizer for the text passed to write_text.
+
+In one left to right scan it
+    - checks that every escaped token is legal,
+    - extracts the latex ($...$ and £...£) and symbol (`...`) spans, leaving
+      the escaped delimiter (e.g. \\$) in their place,
+    - puts a space before every \\t,
+    - removes the style tokens (e.g. \\bold{...}) and records which styles
+      each char is written in as runs.
+
+This gives the same results as the parsers it replaces (now kept in
+benchmarks/legacy_parser): get_illegal_index, then delimiter_parse for each
+delimiter, then parse, which between them scanned the text many times over,
+except that
+    - backslashes inside latex and symbol spans are no longer rejected as
+      illegal tokens,
+    - a span with no closing delimiter runs to the end of the text (it was
+      dropped unless it started the text),
+    - spans are taken in the order they start, so e.g. a $ inside a £...£
+      span is just part of that span.
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from . import settings as s
+from .style_tokens import STYLE_TOKENS
+
+# parsed_text is a ParsedText. The lists are of the contents of the spans in
+# order, or None if there were no spans of that kind.
+TokenizedText = namedtuple(
+    "TokenizedText",
+    ["parsed_text", "latex_inline_list", "latex_newline_list", "symbol_list"],
+)
+
+ESC_CHAR = "\\"
+OPEN_BRACK = "{"
+CLOSE_BRACK = "}"
+LATEX_INLINE_DELIMITER, LATEX_NEWLINE_DELIMITER = s.LATEX_ESC_CHARS
+DELIMITERS = (LATEX_INLINE_DELIMITER, LATEX_NEWLINE_DELIMITER, s.SYMBOL_ESC_CHAR)
+
+# the chars that need any attention, everything else is copied straight over
+SPECIAL_RE = re.compile(
+    "[" + re.escape(ESC_CHAR + CLOSE_BRACK + "".join(DELIMITERS)) + "]"
+)
+
+# what may follow an escape char: a style token (which must come first, so
+# that e.g. \navy{ is the colour navy and not \n followed by avy{), an escape
+# char, or a space. With a token for every colour, this takes long enough to
+# compile that it is only compiled when first needed, see get_escape_re.
+ESCAPE_PATTERN = (
+    re.escape(ESC_CHAR)
+    + "(?:(?P<style>"
+    + "|".join(re.escape(token[1:]) for token in STYLE_TOKENS.values())
+    + ")"
+    + re.escape(OPEN_BRACK)
+    + "|(?P<esc>["
+    + re.escape("".join(s.ESC_CHARS) + " ")
+    + "]))"
+)
+_escape_re = None
+
+# a space is put before each of these
+TAB = ESC_CHAR + "t"
+
+STYLE_NAMES = {token[1:]: name for name, token in STYLE_TOKENS.items()}
+
+
+def get_escape_re():
+    global _escape_re
+    if _escape_re is None:
+        _escape_re = re.compile(ESCAPE_PATTERN)
+    return _escape_re
+
+
+def tokenize(text):
+    """
+    Returns the TokenizedText of text.
+    Raises an Exception if text contains an illegal escaped token or an
+    unpaired close bracket.
+    """
+    out = []  # pieces of the tokenized text
+    length = 0  # of the tokenized text so far
+    styles = []
+    style_runs = [(0, frozenset())]
+    spans = {delimiter: None for delimiter in DELIMITERS}
+    unpaired = False
+
+    style_sets = {}  # so that runs of the same styles share one style_set
+    escape_re = get_escape_re()
+
+    def set_styles():
+        style_set = frozenset(styles)
+        style_set = style_sets.setdefault(style_set, style_set)
+        if style_runs[-1][0] == length:
+            # no chars in the last run, so replace it
+            style_runs.pop()
+        if not style_runs or style_runs[-1][1] != style_set:
+            style_runs.append((length, style_set))
+
+    pos = 0
+    while True:
+        match = SPECIAL_RE.search(text, pos)
+        end = len(text) if match is None else match.start()
+        out.append(text[pos:end])
+        length += end - pos
+        if match is None:
+            break
+        char = match.group()
+
+        if char == ESC_CHAR:
+            escape = escape_re.match(text, end)
+            if escape is None:
+                raise Exception(
+                    f"Unrecognised Esc token at index position {end + 1} in text!"
+                )
+            token = escape.group("style") or escape.group("esc")
+            if (ESC_CHAR + token).startswith(TAB):
+                out.append(" ")
+                length += 1
+            if escape.group("style") is not None:
+                styles.append(STYLE_NAMES[token])
+                set_styles()
+            else:
+                out.append(ESC_CHAR + token)
+                length += 2
+            pos = escape.end()
+
+        elif char == CLOSE_BRACK and end == 0:
+            # as parse did, a close bracket starting the text is a regular char
+            out.append(char)
+            length += 1
+            pos = 1
+
+        elif char == CLOSE_BRACK:
+            if styles:
+                styles.pop()
+                set_styles()
+            else:
+                # only raised at the end, as illegal tokens take precedence
+                unpaired = True
+            pos = end + 1
+
+        else:
+            # latex or symbol span
+            if spans[char] is None:
+                spans[char] = []
+            close = text.find(char, end + 1)
+            if close == -1:
+                # no closing delimiter, so the span runs to the end of the text
+                close = len(text)
+            spans[char].append(text[end + 1 : close])
+            out.append(ESC_CHAR + char)
+            length += 2
+            pos = close + 1
+
+    if unpaired:
+        raise Exception(
+            "Error parsing text. Check that all curly brackets are paired "
+            "and that all Escaped tokens are legal, especially those "
+            f"starting with {s.ESC_CHARS}"
+        )
+    if len(style_runs) > 1 and style_runs[-1][0] == length:
+        style_runs.pop()  # empty last run
+    return TokenizedText(
+        ParsedText("".join(out), style_runs),
+        spans[LATEX_INLINE_DELIMITER],
+        spans[LATEX_NEWLINE_DELIMITER],
+        spans[s.SYMBOL_ESC_CHAR],
+    )
+
+
+class ParsedText:
+    """
+    The chars of tokenized text and the styles they are written in.
+    Rather than a (style_set, char) tuple per char, as the legacy parse
+    returned, this holds the chars as a str plus the runs of chars of the
+    same style_set. Iterating over it still gives (style_set, char) for each
+    char in turn.
+    style_runs is a list of (start, style_set) where style_set, a frozenset
+    of style names, applies to the chars from start up to the start of the
+    next run.
+    """
+
+    __slots__ = ("text", "run_starts", "run_styles")
+
+    def __init__(self, text, style_runs):
+        self.text = text
+        self.run_starts = array("q", [start for start, _ in style_runs])
+        self.run_styles = [style_set for _, style_set in style_runs]
+
+    def __len__(self):
+        return len(self.text)
+
+    def __iter__(self):
+        run_ends = self.run_starts[1:] + array("q", [len(self.text)])
+        for start, end, style_set in zip(self.run_starts, run_ends, self.run_styles):
+            for char in self.text[start:end]:
+                yield style_set, char
+
+    def char(self, i):
+        return self.text[i]
+
+    def style_set(self, i):
+        """
+        Returns the style_set of the char at index i
+        """
+        return self.run_styles[bisect_right(self.run_starts, i) - 1]
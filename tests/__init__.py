@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:05:12 2026
+
+@author: NerdyTurkey
+"""
+
+# Tests of pyhandwriter. Run from the repository root with: python -m pytest
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:05:40 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Set up shared by the tests: pygame runs headless, unless SDL_VIDEODRIVER is
+already set, so the tests can run without a display.
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame as pg
+
+
+@pytest.fixture(scope="session")
+def screen():
+    """
+    The display surface, which HandWriterGen needs to load its cursors.
+    """
+    pg.init()
+    yield pg.display.set_mode((800, 600))
+    pg.quit()
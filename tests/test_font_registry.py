@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:48:02 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of the font registry: reference counting, pinning, eviction and
+reloading of shared hw fonts, and glyphs that fail to load.
+"""
+
+from pyhandwriter import font_registry
+from pyhandwriter import glyph_cache
+from pyhandwriter import settings as s
+from pyhandwriter.buffer_smooth import BufferSmooth
+from pyhandwriter.enums import Flag
+from pyhandwriter.handwriter_gen import HandWriterGen
+from pyhandwriter.lazy_mapping import LazyMapping
+
+HW_FONT = "futurama_"
+BROKEN_KEY = "97"  # a
+
+
+def test_ref_counts():
+    registry = font_registry.FontRegistry()
+    font = registry.acquire(HW_FONT)
+    assert registry.acquire(HW_FONT) is font
+    assert registry.ref_count(HW_FONT) == 2
+
+    registry.release(HW_FONT)
+    assert HW_FONT in registry
+    registry.release(HW_FONT)
+    assert HW_FONT not in registry
+    assert registry.ref_count(HW_FONT) == 0
+
+    # releasing too often does no harm
+    registry.release(HW_FONT)
+    assert registry.ref_count(HW_FONT) == 0
+
+
+def test_preload_and_evict():
+    registry = font_registry.FontRegistry()
+    registry.preload([HW_FONT])
+    assert HW_FONT in registry
+    assert s.PROPS_GEN["default_hw_font"] in registry
+
+    registry.acquire(HW_FONT)
+    registry.evict([HW_FONT])
+    # still referenced
+    assert HW_FONT in registry
+    registry.release(HW_FONT)
+    assert HW_FONT not in registry
+
+    registry.evict()
+    assert s.PROPS_GEN["default_hw_font"] not in registry
+
+
+def test_reload():
+    registry = font_registry.FontRegistry()
+    old_font = registry.acquire(HW_FONT)
+    registry.reload(HW_FONT)
+    new_font = registry.acquire(HW_FONT)
+    assert new_font is not old_font
+    assert new_font.generation != old_font.generation
+
+
+def test_reload_keeps_old_glyphs_apart(screen):
+    bs = BufferSmooth(5)
+    old_hw = HandWriterGen(screen, HW_FONT)
+    old_key, _ = old_hw._get_smoothed_paths("97", bs)
+
+    font_registry.reload(HW_FONT)
+    assert old_key not in glyph_cache.smoothed_glyphs
+    new_hw = HandWriterGen(screen, HW_FONT)
+    new_key, new_paths = new_hw._get_smoothed_paths("97", bs)
+    assert new_key[0] == old_key[0] == HW_FONT
+    assert new_key != old_key
+
+    # the instance holding the old font caches under its own key, so does
+    # not replace what the reloaded font cached
+    assert old_hw._get_smoothed_paths("97", bs)[0] == old_key
+    assert glyph_cache.smoothed_glyphs.get(new_key) is new_paths
+    old_hw.close()
+    new_hw.close()
+
+
+def get_broken_glyphs(glyphs):
+    """
+    Returns glyphs with the glyph for BROKEN_KEY failing to load
+    """
+    return LazyMapping(
+        list(glyphs), lambda key: Flag.FAIL if key == BROKEN_KEY else glyphs[key]
+    )
+
+
+def test_broken_glyph_dropped_from_metrics():
+    glyphs, metrics = font_registry.load_glyphs(
+        HW_FONT, font_registry.get_font_path(HW_FONT)
+    )
+    font = font_registry.SharedFont(HW_FONT, get_broken_glyphs(glyphs), metrics)
+    assert BROKEN_KEY in font.metrics
+    assert not font.has_glyph(BROKEN_KEY)
+    for mapping in (font.glyphs, font.metrics, font.char_sizes):
+        assert BROKEN_KEY not in mapping
+        assert BROKEN_KEY not in list(mapping)
+    assert font.has_glyph("98")
+    assert "98" in font.char_sizes
+
+
+def test_broken_glyph_falls_back_to_default_font(screen, monkeypatch):
+    load_glyphs = font_registry.load_glyphs
+
+    def load_broken_glyphs(hw_font, path):
+        glyphs, metrics = load_glyphs(hw_font, path)
+        if hw_font == HW_FONT:
+            return get_broken_glyphs(glyphs), None
+        return glyphs, metrics
+
+    monkeypatch.setattr(font_registry, "load_glyphs", load_broken_glyphs)
+    monkeypatch.setattr(font_registry, "registry", font_registry.FontRegistry())
+    glyph_cache.invalidate_font(None)
+    hw = HandWriterGen(screen, HW_FONT)
+    default_font, user_font, _ = hw._hw_fonts
+    assert BROKEN_KEY in user_font.metrics
+
+    font, char_key, paths = hw._get_paths(BROKEN_KEY)
+    assert font is default_font
+    assert char_key == BROKEN_KEY
+    assert paths is default_font.glyphs[BROKEN_KEY]
+    assert BROKEN_KEY not in user_font.metrics
+    assert hw.get_glyph_metrics(BROKEN_KEY) is default_font.metrics[BROKEN_KEY]
+    assert hw.get_glyph_advance(BROKEN_KEY, BufferSmooth(5)) is not None
+    hw.close()
+    glyph_cache.invalidate_font(None)
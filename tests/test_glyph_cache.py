@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:02:19 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of the LRU caches shared by the writers, and of invalidating the
+surfaces cached by HandWriter.render_text.
+"""
+
+import pytest
+
+from pyhandwriter import font_registry
+from pyhandwriter import glyph_cache
+from pyhandwriter import settings as s
+from pyhandwriter.handwriter import HandWriter
+
+
+def test_lru_eviction():
+    cache = glyph_cache.LRUCache(3)
+    for i in range(3):
+        cache.put(("font", i), i)
+    assert cache.get(("font", 0)) == 0
+    cache.put(("font", 3), 3)
+    # 1 was the least recently used
+    assert ("font", 1) not in cache
+    assert len(cache) == 3
+    assert cache.cache_info() == glyph_cache.CacheInfo(1, 0, 3, 3)
+
+
+def test_lru_size_of():
+    cache = glyph_cache.LRUCache(10, size_of=len)
+    cache.put(("font", "a"), "x" * 6)
+    cache.put(("font", "b"), "x" * 6)
+    assert ("font", "a") not in cache
+    # too big to cache at all
+    cache.put(("font", "c"), "x" * 11)
+    assert ("font", "c") not in cache
+    assert cache.size == 6
+
+
+def test_lru_invalidate():
+    cache = glyph_cache.LRUCache(10)
+    cache.put(("a", 1, "97"), 1)
+    cache.put(("b", 1, "97"), 2)
+    cache.put((("a", "c"), (1, 1), "text"), 3)
+    cache.put((("b", "c"), (1, 1), "text"), 4)
+
+    cache.invalidate("c")
+    assert len(cache) == 2
+    cache.invalidate("a")
+    assert list(cache._items) == [("b", 1, "97")]
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+@pytest.fixture
+def hw(screen):
+    glyph_cache.invalidate_rendered_text()
+    return HandWriter(screen, "futurama_")
+
+
+@pytest.mark.parametrize(
+    "hw_font",
+    ["futurama_", s.PROPS_GEN["default_hw_font"], s.PROPS_GEN["hw_symbol_fname"]],
+)
+def test_render_cache_reload(hw, hw_font):
+    text = "Hi `happy`"
+    surf = hw.render_text(text, (300, 100))
+    assert hw.render_text(text, (300, 100)) is surf
+
+    # any of the fonts the text may be drawn from
+    font_registry.reload(hw_font)
+    assert hw.render_text(text, (300, 100)) is not surf
+
+
+def test_render_cache_set_glyph(hw):
+    surf = hw.render_text("Hi", (300, 100))
+    hw.hw.set_glyph("72", [])
+    assert hw.render_text("Hi", (300, 100)) is not surf
+    hw.hw.revert_glyphs()
+    assert hw.render_text("Hi", (300, 100)) is surf
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:31:47 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of glyph metrics, for paths as recorded and as glyph_store arrays.
+"""
+
+import pytest
+
+from pyhandwriter import glyph_metrics
+from pyhandwriter import glyph_store
+
+PATHS = [
+    [],
+    [
+        {"pos": (0.0, 0.0), "time": 0.0},
+        {"pos": (3.0, 4.0), "time": 10.0},
+        {"pos": (3.0, -2.0), "time": 30.0},
+    ],
+    [],
+    [{"pos": (-1.0, 5.0), "time": 40.0}, {"pos": (-1.0, 6.0), "time": 45.0}],
+    [{"pos": (8.0, 1.0), "time": 50.0}],
+]
+
+
+def test_glyph_metrics():
+    metrics = glyph_metrics.get_glyph_metrics(PATHS)
+    assert metrics == glyph_metrics.GlyphMetrics(
+        -1.0, -2.0, 8.0, 6.0, 8.0, 5, 12.0, 35.0
+    )
+    assert glyph_metrics.get_char_size(metrics) == (9.0, 8.0)
+
+
+def test_no_samples():
+    assert glyph_metrics.get_glyph_metrics([[], []]) == (0, 0, 0, 0, 0, 2, 0, 0)
+
+
+@pytest.mark.skipif(glyph_store.np is None, reason="numpy could not be imported")
+@pytest.mark.parametrize("paths", [PATHS, PATHS[1:], PATHS[:2], [[], []]])
+def test_array_glyph_metrics(paths):
+    glyph = glyph_store.Glyph.from_paths(paths)
+    assert glyph_metrics.get_glyph_metrics(glyph) == pytest.approx(
+        glyph_metrics.get_glyph_metrics(paths)
+    )
+
+
+@pytest.mark.skipif(glyph_store.np is None, reason="numpy could not be imported")
+def test_path_extent():
+    glyph = glyph_store.Glyph.from_paths(PATHS)
+    assert glyph_store.path_extent(glyph[1]) == (0.0, -2.0, 3.0, 4.0)
+    assert glyph_store.path_extent(PATHS[1]) == (0.0, -2.0, 3.0, 4.0)
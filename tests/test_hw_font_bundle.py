@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:06:18 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of writing, reading and updating hw font bundles.
+"""
+
+from pyhandwriter import glyph_metrics
+from pyhandwriter import hw_font_bundle
+from pyhandwriter.enums import Flag
+
+HW_DICT = {
+    "97": [
+        [
+            {"pos": (1.0, 2.0), "time": 0.0},
+            {"pos": (3.5, -1.25), "time": 10.0},
+        ],
+        [{"pos": (4.0, 4.0), "time": 25.0}],
+    ],
+    "98": [[{"pos": (0.0, 0.0), "time": 0.0}, {"pos": (2.0, 6.0), "time": 5.0}]],
+    "32": [],
+}
+
+
+def read_glyph(fname, char_key):
+    index, data_offset = hw_font_bundle.read_index(fname)
+    spans = index["glyphs"][char_key]
+    data = hw_font_bundle.read_samples(fname, data_offset, spans)
+    first = spans[0][0] if spans else 0
+    return hw_font_bundle.unpack_paths(data, spans, first)
+
+
+def test_round_trip(tmp_path):
+    fname = hw_font_bundle.get_bundle_fname("test_font", tmp_path)
+    assert hw_font_bundle.save_bundle(HW_DICT, fname)
+
+    index, data_offset = hw_font_bundle.read_index(fname)
+    assert data_offset % 8 == 0
+    assert set(index["glyphs"]) == set(HW_DICT)
+    for char_key, paths in HW_DICT.items():
+        assert read_glyph(fname, char_key) == paths
+    assert hw_font_bundle.get_index_metrics(index) == {
+        key: glyph_metrics.get_glyph_metrics(paths) for key, paths in HW_DICT.items()
+    }
+    assert hw_font_bundle.get_hw_font_names(tmp_path) == ["test_font"]
+
+
+def test_read_bad_bundle(tmp_path):
+    fname = tmp_path / "bad.hwb"
+    fname.write_bytes(b"not a bundle")
+    assert hw_font_bundle.read_index(fname) is Flag.FAIL
+    assert hw_font_bundle.read_index(tmp_path / "missing.hwb") is Flag.FAIL
+
+
+def test_update_bundle(tmp_path):
+    fname = hw_font_bundle.get_bundle_fname("test_font", tmp_path)
+    hw_font_bundle.save_bundle(HW_DICT, fname)
+    new_paths = [[{"pos": (9.0, 8.0), "time": 0.0}, {"pos": (7.0, 6.0), "time": 1.0}]]
+
+    assert hw_font_bundle.update_bundle("test_font", tmp_path, "97", new_paths)
+    assert read_glyph(fname, "97") == new_paths
+    assert read_glyph(fname, "98") == HW_DICT["98"]
+    assert read_glyph(fname, "32") == []
+
+    # a new glyph is added
+    assert hw_font_bundle.update_bundle("test_font", tmp_path, "99", new_paths)
+    assert read_glyph(fname, "99") == new_paths
+    metrics = hw_font_bundle.get_index_metrics(hw_font_bundle.read_index(fname)[0])
+    assert metrics["99"] == glyph_metrics.get_glyph_metrics(new_paths)
+
+
+def test_update_missing_bundle(tmp_path):
+    assert not hw_font_bundle.update_bundle("test_font", tmp_path, "97", [])
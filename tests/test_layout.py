@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:18:33 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of laying text out: line breaking, the layout records and measuring
+and fitting text.
+"""
+
+import pygame as pg
+import pytest
+
+from pyhandwriter import glyph_cache
+from pyhandwriter import glyph_store
+from pyhandwriter import layout
+from pyhandwriter.buffer_smooth import BufferSmooth
+from pyhandwriter.handwriter_gen import HandWriterGen
+
+TEXT = (
+    "The quick brown fox jumps over the lazy dog, then the \\red{lazy} dog"
+    " jumps over the \\bigger{quick} brown fox."
+)
+TEXT_RECT = pg.Rect(0, 0, 400, 600)
+
+
+@pytest.fixture
+def hw(screen):
+    hw = HandWriterGen(screen)
+    yield hw
+    hw.close()
+
+
+def test_optimal_breaks():
+    # three words of 4 on lines of 10, with spaces of 1
+    assert layout.get_optimal_breaks([4, 4, 4], [0, 1, 1], 0, 0, 10) == [2]
+    # balanced rather than greedy: greedy would leave 4 on the first line and
+    # 7 on the second, rather than 6 and 5
+    breaks = layout.get_optimal_breaks([4, 1, 3, 6], [0, 1, 1, 1], 0, 0, 10)
+    assert breaks == [1, 3]
+    # a word too long for a line gets a line to itself
+    assert layout.get_optimal_breaks([3, 20, 3], [0, 1, 1], 0, 0, 10) == [1, 2]
+    assert layout.get_optimal_breaks([], [], 0, 0, 10) == []
+
+
+@pytest.mark.parametrize("buffer_size", [0, 5])
+def test_glyph_advance(hw, buffer_size):
+    bs = BufferSmooth(buffer_size)
+    for char in "Wi.`~":
+        char_key = layout.get_char_key(char)
+        _, smoothed_paths = hw._get_smoothed_paths(char_key, bs)
+        x_maxes = [
+            glyph_store.path_extent(path)[2] for path in smoothed_paths if len(path) > 1
+        ]
+        # the advance is where the smoothed ink that is drawn ends
+        assert hw.get_glyph_advance(char_key, bs) == max(x_maxes, default=None)
+
+
+def test_measure_does_not_smooth(hw):
+    glyph_cache.smoothed_glyphs.invalidate()
+    hw.measure_text(TEXT, text_rect=TEXT_RECT)
+    assert len(glyph_cache.smoothed_glyphs) == 0
+
+
+def test_records_laid_out_once(hw):
+    props, default_style = hw._init_text(TEXT, text_rect=TEXT_RECT, instantly=True)
+    text_layout = layout.TextLayout(hw, props, default_style)
+    records = text_layout.records()
+    assert text_layout.records() is records
+    assert list(text_layout) == records
+    glyphs = [record for record in records if isinstance(record, layout.GlyphRecord)]
+    assert len(glyphs) == len(TEXT.replace(" ", "")) - len("\\red{}\\bigger{}")
+
+
+@pytest.mark.parametrize("line_breaking", ["greedy", "optimal"])
+def test_lines_fit(hw, line_breaking):
+    measurement = hw.measure_text(
+        TEXT, text_rect=TEXT_RECT, line_breaking=line_breaking
+    )
+    assert len(measurement.line_rects) > 1
+    assert not measurement.overflow
+    for line_rect in measurement.line_rects:
+        assert line_rect.right <= TEXT_RECT.right
+
+
+def test_measure_matches_drawing(hw):
+    surf = pg.Surface(TEXT_RECT.size, pg.SRCALPHA)
+    hw.change_surf(surf)
+    for _ in hw.write_text(
+        TEXT, text_rect=TEXT_RECT, instantly=True, update_display=False
+    ):
+        pass
+    drawn = surf.get_bounding_rect()
+    assert drawn.width > 0
+    measured = hw.measure_text(TEXT, text_rect=TEXT_RECT).rect
+    # the measurement is from the metrics padded by the pen, so bounds the ink
+    assert measured.inflate(2, 2).contains(drawn)
+
+
+def test_fit_text(hw):
+    text_rect = pg.Rect(0, 0, 300, 200)
+    fit = hw.fit_text(TEXT, text_rect=text_rect, min_pt_size=8, max_pt_size=80)
+    assert not fit.measurement.overflow
+    assert text_rect.contains(fit.measurement.rect)
+    bigger = hw.measure_text(TEXT, text_rect=text_rect, pt_size=fit.pt_size + 1)
+    assert bigger.overflow or not text_rect.contains(bigger.rect)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:51:36 2026
+
+@author: NerdyTurkey
+"""
+
+"""
+Tests of the single pass tokenizer against the legacy parsers it replaced
+(see benchmarks/legacy_parser).
+"""
+
+import pytest
+
+from benchmarks.bench_tokenizer import (
+    PARAGRAPH,
+    get_demo_strings,
+    new_pipeline,
+    old_pipeline,
+)
+from pyhandwriter.tokenizer import tokenize
+
+DEMO_STRINGS = [
+    string for string in get_demo_strings() if old_pipeline(string) is not None
+]
+
+
+def test_demo_strings_found():
+    assert len(DEMO_STRINGS) > 10
+
+
+@pytest.mark.parametrize("string", DEMO_STRINGS + [PARAGRAPH * 3])
+def test_matches_legacy_parser(string):
+    assert new_pipeline(string) == old_pipeline(string)
+
+
+def test_parsed_text():
+    parsed_text = tokenize(r"a\bold{b\red{c}}d").parsed_text
+    assert parsed_text.text == "abcd"
+    assert list(parsed_text) == [
+        (frozenset(), "a"),
+        (frozenset({"bold"}), "b"),
+        (frozenset({"bold", "red"}), "c"),
+        (frozenset(), "d"),
+    ]
+    assert parsed_text.char(2) == "c"
+    assert parsed_text.style_set(2) == frozenset({"bold", "red"})
+
+
+def test_spans():
+    tokenized_text = tokenize(r"x $a^2$ and £b£ with `happy`")
+    assert tokenized_text.latex_inline_list == ["a^2"]
+    assert tokenized_text.latex_newline_list == ["b"]
+    assert tokenized_text.symbol_list == ["happy"]
+    assert tokenized_text.parsed_text.text == "x \\$ and \\£ with \\`"